@@ -1,34 +1,119 @@
-from typing import Any
+import json
+import os
+import time
+from concurrent.futures import Future
+from typing import Any, Dict, Optional
+from uuid import uuid4
 
 import streamlit as st
 
-from src.llmmodels.defaultllmmodel import BaseLLMModel, DefaultLLMModel
-from src.repositoryadapters.defaultadapter import DefaultRepositoryAdapter
+from src import config
+from src.pipeline import (
+    generate_readme_job,
+    get_readme_job_key,
+    get_repo_adapter_config,
+)
+from src.repositoryadapters.gitobjectsadapter import GitObjectsRepositoryAdapter
+from src.utils.jobs import Job, JobManager
+from src.utils.metrics import format_prometheus, get_run_summary
 
 REQUIRED_STATE_VARS = (
     "readme_text",
+    "source_commit",
     "readme_submited",
+    "readme_upload",
     "repo_url",
-    "repo_path",
     "has_readme",
     "info",
     "repo_adapter",
-    "llm_model",
+    "job_id",
+    "run_report",
 )
 
+JOB_WORKERS = 2
+JOB_POLL_INTERVAL = 1.0
+
+
+@st.cache_resource
+def get_job_manager() -> JobManager:
+    # Shared by every session served by this process
+    return JobManager(max_workers=JOB_WORKERS)
+
 
 def init_required_vars(force: bool = False) -> None:
     for var in REQUIRED_STATE_VARS:
         if force or var not in st.session_state:
             st.session_state[var] = None
+    if "session_id" not in st.session_state:
+        st.session_state.session_id = uuid4().hex
 
 
-def generate_readme(llm_model: BaseLLMModel) -> str:
-    output = llm_model.generate_readme()
+def start_readme_job(repo_url: str) -> None:
+    job_id = get_job_manager().submit(
+        generate_readme_job,
+        repo_url,
+        # Every worker process gets its share of the LLM quotas
+        JOB_WORKERS,
+        key=get_readme_job_key(repo_url),
+        subscriber=st.session_state.session_id,
+    )
+    set_var("job_id", job_id)
 
-    set_var("readme_text", output)
 
-    return output
+def cancel_readme_job() -> None:
+    get_job_manager().cancel(
+        st.session_state.job_id, subscriber=st.session_state.session_id
+    )
+    set_var("job_id", None)
+
+
+def show_readme_job(job: Job) -> None:
+    progress = None
+    sections_texts = {}
+    for event in job.events:
+        if event.type == "progress":
+            progress = event
+        elif event.type == "token":
+            sections_texts[event.section] = (
+                sections_texts.get(event.section, "") + event.text
+            )
+        elif event.type == "section":
+            sections_texts[event.section] = event.text
+
+    if progress is None:
+        st.progress(0.0, text=f"README generation {job.status}")
+    else:
+        text = progress.text
+        if progress.total:
+            text += f" ({progress.completed}/{progress.total})"
+        value = progress.completed / progress.total if progress.total else 0.0
+        st.progress(min(value, 1.0), text=text)
+    st.button("Cancel", on_click=cancel_readme_job)
+    for text in sections_texts.values():
+        st.markdown(text)
+
+
+def poll_readme_job() -> None:
+    job = get_job_manager().get(st.session_state.job_id)
+    if job is None:
+        set_var("job_id", None)
+        st.error("README generation job not found")
+    elif job.status == "done":
+        set_var("readme_text", job.result["readme_text"])
+        set_var("source_commit", job.result["source_commit"])
+        set_var("run_report", job.result["metrics"])
+        set_var("job_id", None)
+        st.rerun()
+    elif job.status == "failed":
+        set_var("job_id", None)
+        st.error(f"README generation failed:\n{job.error}")
+    elif job.status == "cancelled":
+        set_var("job_id", None)
+        st.warning("README generation cancelled")
+    else:
+        show_readme_job(job)
+        time.sleep(JOB_POLL_INTERVAL)
+        st.rerun()
 
 
 def set_var(var_name: str, var_value: Any) -> None:
@@ -36,10 +121,77 @@ def set_var(var_name: str, var_value: Any) -> None:
 
 
 def upload_readme():
-    st.session_state.repo_adapter.upload_readme(st.session_state.readme_text, force=True)
+    # The job may have seen a newer commit than the session adapter, whose
+    # head was resolved when the repository was analyzed
+    upload = st.session_state.repo_adapter.upload_readme(
+        st.session_state.readme_text,
+        force=True,
+        parent=st.session_state.source_commit,
+    )
+    set_var("readme_upload", upload)
     set_var("readme_submited", True)
 
 
+def show_upload_status(upload: Optional[Future]) -> None:
+    if upload is None:
+        return
+    if not upload.done():
+        st.info("Pushing README branch in the background...")
+        st.button("Refresh upload status")
+    elif upload.exception() is not None:
+        st.error(f"Failed to push README:\n{upload.exception()}")
+    else:
+        st.success(f"README pushed to branch {upload.result()}")
+
+
+def format_labels(labels: Dict[str, str]) -> str:
+    return ", ".join(f"{name}={value}" for name, value in labels.items())
+
+
+def show_run_report(report: Optional[Dict[str, Any]]) -> None:
+    if report is None:
+        return
+    summary = get_run_summary(report)
+    with st.expander("Run summary"):
+        col1, col2, col3 = st.columns(3)
+        col1.metric("Wall time", f"{summary['wall_seconds']:.1f} s")
+        col2.metric("LLM requests", int(summary["llm_requests"]))
+        col3.metric("LLM retries", int(summary["llm_retries"]))
+        col1.metric("Prompt tokens", int(summary["prompt_tokens"]))
+        col2.metric("Completion tokens", int(summary["completion_tokens"]))
+        col3.metric("Summary cache hit rate", f"{summary['cache_hit_rate']:.0%}")
+
+        spans = sorted(report["spans"], key=lambda span: -span["total_seconds"])
+        st.dataframe(
+            [
+                {
+                    "Stage": span["name"],
+                    "Labels": format_labels(span["labels"]),
+                    "Calls": span["count"],
+                    "Total (s)": round(span["total_seconds"], 3),
+                    "Max (s)": round(span["max_seconds"], 3),
+                }
+                for span in spans
+            ],
+            use_container_width=True,
+        )
+        col1, col2 = st.columns(2)
+        col1.download_button(
+            "Download JSON report",
+            json.dumps(report, indent=2),
+            file_name="readmaker-run.json",
+            mime="application/json",
+            use_container_width=True,
+        )
+        col2.download_button(
+            "Download Prometheus metrics",
+            format_prometheus(report),
+            file_name="readmaker-run.prom",
+            mime="text/plain",
+            use_container_width=True,
+        )
+
+
 def main():
     st.set_page_config(page_title="ReadMaker: README Generator for Git Repositories")
 
@@ -53,39 +205,36 @@ def main():
             "Enter the remote Git repository URL",
             value=st.session_state.repo_url or "",
         )
-        repo_path = st.text_input(
-            "Enter the local system path to clone the repository",
-            value=st.session_state.repo_path or "",
-        )
 
         analyze_button = st.button("Analyze repository")
-        if analyze_button and not (repo_url and repo_path):
-            st.write(":red[Enter the repository URL and local path]")
+        if analyze_button and not repo_url:
+            st.write(":red[Enter the repository URL]")
 
-        if analyze_button and repo_url and repo_path:
+        if analyze_button and repo_url:
             set_var("repo_url", repo_url)
-            set_var("repo_path", repo_path)
-            repo_adapter = DefaultRepositoryAdapter(
-                repo_url=repo_url, base_dir=repo_path
+            # Reads the shared mirror's object database, so sessions hold no
+            # worktree that would keep the mirror from being evicted. README
+            # generation jobs check out their own worktree. Nothing is written
+            # to base_dir, it only roots the paths of the repository files
+            repo_adapter = GitObjectsRepositoryAdapter(
+                repo_url=repo_url,
+                base_dir=os.path.join(
+                    config.CACHE_DIR, "sessions", st.session_state.session_id
+                ),
+                config=get_repo_adapter_config(),
             )
-            llm_model = DefaultLLMModel(repo_adapter)
             set_var("repo_adapter", repo_adapter)
-            set_var("llm_model", llm_model)
             set_var("has_readme", bool(repo_adapter.readme()))
 
     if st.session_state.has_readme:
         st.subheader(":red[WARNING: The selected repository already contains a README]")
 
-    if (
-        st.session_state.repo_url
-        and st.session_state.repo_path
-        and not st.session_state.readme_text
-    ):
-        st.button(
-            "Generate README",
-            on_click=generate_readme,
-            args=[st.session_state.llm_model],
-        )
+    if st.session_state.repo_url and not st.session_state.readme_text:
+        if st.session_state.job_id:
+            poll_readme_job()
+        elif st.button("Generate README"):
+            start_readme_job(st.session_state.repo_url)
+            st.rerun()
 
     elif st.session_state.readme_text:
         text_area_text = st.text_area(
@@ -121,13 +270,13 @@ def main():
             set_var("info", "README submited")
         if info := st.session_state.info:
             st.info(info)
+        show_upload_status(st.session_state.readme_upload)
+        show_run_report(st.session_state.run_report)
 
         with st.expander("README Preview", expanded=True):
             st.markdown(st.session_state.readme_text)
     else:
-        st.subheader(
-            "Enter the repository URL and local path in the siderbar input fields"
-        )
+        st.subheader("Enter the repository URL in the siderbar input field")
 
 
 if __name__ == "__main__":
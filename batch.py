@@ -0,0 +1,258 @@
+import argparse
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+from src.configs.llmmodels.defaultllmmodel import DefaultLLMModelConfig
+from src.configs.repositoryadapters.defaultadapter import (
+    DefaultRepositoryAdapterConfig,
+)
+from src.llmmodels.defaultllmmodel import DefaultLLMModel
+from src.repositoryadapters.defaultadapter import DefaultRepositoryAdapter
+from src.utils.batch import BatchJournal, clone_repository, read_manifest
+from src.utils.files import create_local_file
+from src.utils.metrics import Metrics, set_metrics
+from src.utils.prompt import set_request_scheduler
+from src.utils.repository import get_repo_slug
+
+
+def parse_args(args: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Generate README files for every repository in a manifest."
+    )
+    parser.add_argument(
+        "manifest", help="Text file with one repository URL per line ('#' comments)"
+    )
+    parser.add_argument(
+        "--clones-dir", required=True, help="Folder where repositories are cloned"
+    )
+    parser.add_argument(
+        "--output-dir", help="Folder where the generated README files are written"
+    )
+    parser.add_argument(
+        "--push",
+        action="store_true",
+        help="Push each README to a new branch of its repository",
+    )
+    parser.add_argument(
+        "--journal",
+        help="Journal used to resume the batch (default: <output-dir>/journal.jsonl)",
+    )
+    parser.add_argument(
+        "--clone-workers",
+        type=int,
+        default=4,
+        help="Processes used to clone and read the repositories files",
+    )
+    parser.add_argument(
+        "--repo-workers",
+        type=int,
+        default=4,
+        help="Repositories whose READMEs are generated at the same time",
+    )
+    parser.add_argument(
+        "--max-llm-calls",
+        type=int,
+        default=16,
+        help="LLM calls in flight across all repositories",
+    )
+    parser.add_argument(
+        "--requests-per-minute",
+        type=float,
+        help="LLM requests per minute quota (default: the LLM config quota)",
+    )
+    parser.add_argument(
+        "--tokens-per-minute",
+        type=float,
+        help="LLM prompt tokens per minute quota (default: the LLM config quota)",
+    )
+    parser.add_argument(
+        "--metrics-report", help="JSON file where the run metrics are written"
+    )
+    parser.add_argument(
+        "--metrics-prometheus",
+        help="File where the run metrics are written in Prometheus text format",
+    )
+    parsed_args = parser.parse_args(args)
+    if not (parsed_args.output_dir or parsed_args.push):
+        parser.error("Set --output-dir, --push or both")
+    if not (parsed_args.journal or parsed_args.output_dir):
+        parser.error("Set --journal when not using --output-dir")
+    return parsed_args
+
+
+def prepare_repository(
+    repo_url: str,
+    repo_dir: str,
+    clone_options: Dict[str, Any],
+    adapter_config: DefaultRepositoryAdapterConfig,
+) -> Dict[str, Optional[str]]:
+    """Clones the repository and reads the files selected for ingestion. Runs
+    in a worker process, as detecting and decoding text files is CPU bound."""
+    clone_repository(repo_url, repo_dir, **clone_options)
+    repo_adapter = DefaultRepositoryAdapter(
+        repo_url=repo_url, base_dir=repo_dir, config=adapter_config
+    )
+    return repo_adapter.read_ingested_files()
+
+
+def generate_repository_readme(
+    repo_url: str,
+    repo_dir: str,
+    output_dir: Optional[str],
+    push: bool,
+    llm_config: DefaultLLMModelConfig,
+    adapter_config: Optional[DefaultRepositoryAdapterConfig] = None,
+    files_contents: Optional[Dict[str, Optional[str]]] = None,
+) -> Optional[str]:
+    repo_adapter = DefaultRepositoryAdapter(
+        repo_url=repo_url, base_dir=repo_dir, config=adapter_config
+    )
+    if files_contents is not None:
+        repo_adapter.preload_files_contents(files_contents)
+    llm_model = DefaultLLMModel(repo_adapter, llm_config)
+    readme_text = llm_model.generate_readme()
+
+    readme_path = None
+    if output_dir:
+        readme_path = os.path.join(output_dir, get_repo_slug(repo_url), "README.md")
+        os.makedirs(os.path.dirname(readme_path), exist_ok=True)
+        create_local_file(readme_path, readme_text, force=True)
+    if push:
+        repo_adapter.upload_readme(readme_text, force=True).result()
+    return readme_path
+
+
+def run_batch(
+    repo_urls: List[str],
+    clones_dir: str,
+    journal: BatchJournal,
+    output_dir: Optional[str] = None,
+    push: bool = False,
+    clone_workers: int = 4,
+    repo_workers: int = 4,
+    max_llm_calls: int = 16,
+    requests_per_minute: Optional[float] = None,
+    tokens_per_minute: Optional[float] = None,
+) -> None:
+    completed = journal.completed()
+    pending = [repo_url for repo_url in repo_urls if repo_url not in completed]
+    print(
+        f"{len(repo_urls) - len(pending)} repositories already done, "
+        f"{len(pending)} pending"
+    )
+
+    llm_config = DefaultLLMModelConfig.get_default_config()
+    if requests_per_minute is not None:
+        llm_config.requests_per_minute = requests_per_minute
+    if tokens_per_minute is not None:
+        llm_config.tokens_per_minute = tokens_per_minute
+    llm_config.request_max_concurrency = max_llm_calls
+    adapter_config = DefaultRepositoryAdapterConfig.get_default_config()
+    # Repositories cloned by a previous run are fetched again
+    clone_options = {**adapter_config.get_clone_options(), "update": True}
+
+    # Bounds the repositories read but not yet generated, whose files
+    # contents are held in memory
+    max_in_flight = max(1, clone_workers) + max(1, repo_workers)
+    in_flight = threading.Semaphore(max_in_flight)
+
+    def generate(
+        repo_url: str, repo_dir: str, files_contents: Dict[str, Optional[str]]
+    ) -> None:
+        try:
+            readme_path = generate_repository_readme(
+                repo_url,
+                repo_dir,
+                output_dir,
+                push,
+                llm_config,
+                adapter_config,
+                files_contents=files_contents,
+            )
+        except Exception as e:
+            print(f"Failed to generate README for {repo_url}\nError:\n{e}")
+            journal.record(repo_url, "failed", error=str(e))
+            return
+        journal.record(repo_url, "done", readme_path=readme_path)
+        print(f"README generated for {repo_url}")
+
+    def generate_and_release(
+        repo_url: str, repo_dir: str, files_contents: Dict[str, Optional[str]]
+    ) -> None:
+        try:
+            generate(repo_url, repo_dir, files_contents)
+        finally:
+            in_flight.release()
+
+    previous_scheduler = set_request_scheduler(llm_config.get_request_scheduler())
+    try:
+        with ProcessPoolExecutor(max_workers=max(1, clone_workers)) as clone_executor:
+            with ThreadPoolExecutor(max_workers=max(1, repo_workers)) as repo_executor:
+
+                def on_prepared(repo_url: str, repo_dir: str, future: Future) -> None:
+                    try:
+                        files_contents = future.result()
+                    except Exception as e:
+                        print(f"Failed to clone or read {repo_url}\nError:\n{e}")
+                        journal.record(repo_url, "failed", error=str(e))
+                        in_flight.release()
+                        return
+                    repo_executor.submit(
+                        generate_and_release, repo_url, repo_dir, files_contents
+                    )
+
+                for repo_url in pending:
+                    in_flight.acquire()
+                    repo_dir = os.path.join(clones_dir, get_repo_slug(repo_url))
+                    future = clone_executor.submit(
+                        prepare_repository,
+                        repo_url,
+                        repo_dir,
+                        clone_options,
+                        adapter_config,
+                    )
+                    future.add_done_callback(
+                        lambda future, repo_url=repo_url, repo_dir=repo_dir: (
+                            on_prepared(repo_url, repo_dir, future)
+                        )
+                    )
+                # Every repository is done once all the slots are free again
+                for _ in range(max_in_flight):
+                    in_flight.acquire()
+    finally:
+        set_request_scheduler(previous_scheduler)
+
+
+def main(args: Optional[List[str]] = None) -> None:
+    parsed_args = parse_args(args)
+    journal = BatchJournal(
+        parsed_args.journal or os.path.join(parsed_args.output_dir, "journal.jsonl")
+    )
+    metrics = Metrics()
+    previous_metrics = set_metrics(metrics)
+    try:
+        run_batch(
+            read_manifest(parsed_args.manifest),
+            parsed_args.clones_dir,
+            journal,
+            output_dir=parsed_args.output_dir,
+            push=parsed_args.push,
+            clone_workers=parsed_args.clone_workers,
+            repo_workers=parsed_args.repo_workers,
+            max_llm_calls=parsed_args.max_llm_calls,
+            requests_per_minute=parsed_args.requests_per_minute,
+            tokens_per_minute=parsed_args.tokens_per_minute,
+        )
+    finally:
+        set_metrics(previous_metrics)
+        if parsed_args.metrics_report:
+            metrics.save_report(parsed_args.metrics_report)
+        if parsed_args.metrics_prometheus:
+            with open(parsed_args.metrics_prometheus, "w") as f:
+                f.write(metrics.to_prometheus())
+
+
+if __name__ == "__main__":
+    main()
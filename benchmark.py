@@ -0,0 +1,115 @@
+import argparse
+import json
+import os
+import sys
+from typing import Any, Dict, List, Optional
+
+from src import config
+from src.benchmarks.runner import (
+    DEFAULT_SCENARIOS,
+    DEFAULT_TOLERANCE,
+    SCENARIOS,
+    compare_with_baseline,
+    load_baseline,
+    run_isolated_scenario,
+    save_baseline,
+)
+from src.benchmarks.startup import run_startup_benchmark
+
+# Import time and model construction, run with the "startup" scenario
+STARTUP_SCENARIO = "startup"
+
+DEFAULT_BASELINE_PATH = os.path.join(
+    config.RESOURCES_DIR, "benchmarks", "baseline.json"
+)
+
+
+def parse_args(args: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Benchmark README generation on synthetic repositories "
+        "with a fake LLM."
+    )
+    parser.add_argument(
+        "scenarios",
+        nargs="*",
+        help=f"Scenarios to run, out of {', '.join(SCENARIOS)} "
+        f"or {STARTUP_SCENARIO} "
+        f"(default: {' '.join(DEFAULT_SCENARIOS)})",
+    )
+    parser.add_argument(
+        "--latency", type=float, default=0.0, help="Fake LLM latency in seconds"
+    )
+    parser.add_argument(
+        "--baseline", default=DEFAULT_BASELINE_PATH, help="Baseline JSON file"
+    )
+    parser.add_argument(
+        "--update-baseline",
+        action="store_true",
+        help="Store the results as the new baseline instead of comparing",
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=DEFAULT_TOLERANCE,
+        help="Allowed slowdown over the baseline (default: %(default)s)",
+    )
+    parser.add_argument("--output", help="JSON file where the full results are written")
+    parsed_args = parser.parse_args(args)
+    parsed_args.scenarios = parsed_args.scenarios or DEFAULT_SCENARIOS
+    unknown_scenarios = set(parsed_args.scenarios) - set(SCENARIOS) - {STARTUP_SCENARIO}
+    if unknown_scenarios:
+        parser.error(f"Unknown scenarios: {', '.join(sorted(unknown_scenarios))}")
+    return parsed_args
+
+
+def print_result(result: Dict[str, Any]) -> None:
+    if "stages_seconds" not in result:
+        print(f"{result['scenario']}: {result['wall_seconds']:.3f}s")
+        return
+    print(
+        f"{result['scenario']}: {result['wall_seconds']:.2f}s "
+        f"({result['files_per_second']:.0f} files/s), "
+        f"peak RSS {result['peak_rss_mb']:.0f} MB, {result['llm_calls']} LLM calls"
+    )
+    for stage, seconds in sorted(
+        result["stages_seconds"].items(), key=lambda item: -item[1]
+    ):
+        print(f"    {stage}: {seconds:.3f}s")
+
+
+def main(args: Optional[List[str]] = None) -> int:
+    parsed_args = parse_args(args)
+    results = []
+    for scenario_name in parsed_args.scenarios:
+        print(f"Running scenario {scenario_name}")
+        if scenario_name == STARTUP_SCENARIO:
+            scenario_results = run_startup_benchmark()
+        else:
+            scenario_results = [
+                run_isolated_scenario(scenario_name, latency=parsed_args.latency)
+            ]
+        for result in scenario_results:
+            print_result(result)
+        results.extend(scenario_results)
+
+    if parsed_args.output:
+        with open(parsed_args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if parsed_args.update_baseline:
+        save_baseline(parsed_args.baseline, results)
+        print(f"Baseline updated: {parsed_args.baseline}")
+        return 0
+
+    baseline = load_baseline(parsed_args.baseline)
+    if not baseline:
+        print(f"No baseline found at {parsed_args.baseline}")
+        return 0
+    regressions = compare_with_baseline(results, baseline, parsed_args.tolerance)
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
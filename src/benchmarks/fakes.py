@@ -0,0 +1,77 @@
+import re
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+_file_header_regex = re.compile(r"^### File: (.+)$", re.MULTILINE)
+_calls_lock = threading.Lock()
+
+
+class FakeRateLimitError(Exception):
+    status_code = 429
+
+
+class FakeChatModel(BaseChatModel):
+    """Chat model that echoes the last message after a delay, failing the first
+    `rate_limited_calls` calls with a 429 error. Batched file summary prompts
+    get one summary per file header, like the real model. Without `echo`, it
+    answers with a short summary instead, so runs don't grow with the
+    prompts."""
+
+    latency: float = 0.0
+    echo: bool = True
+    rate_limited_calls: int = 0
+    max_concurrency: Optional[int] = None
+    calls: Dict[str, int] = {}
+
+    def __init__(self, **kwargs: Any) -> None:
+        super().__init__(**kwargs)
+        self.calls = {"total": 0, "rate_limited": 0, "in_flight": 0, "max_in_flight": 0}
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-chat-model"
+
+    def _get_reply(self, prompt: str) -> str:
+        files = _file_header_regex.findall(prompt)
+        if files:
+            return "\n".join(
+                f"### File: {file}\nSynthetic summary of {file}." for file in files
+            )
+        if self.echo:
+            return f"Echo: {prompt}"
+        return f"Synthetic summary of a {len(prompt)} characters prompt."
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        with _calls_lock:
+            self.calls["total"] += 1
+            rate_limited = self.calls["total"] <= self.rate_limited_calls or (
+                self.max_concurrency is not None
+                and self.calls["in_flight"] >= self.max_concurrency
+            )
+            if rate_limited:
+                self.calls["rate_limited"] += 1
+            else:
+                self.calls["in_flight"] += 1
+                self.calls["max_in_flight"] = max(
+                    self.calls["max_in_flight"], self.calls["in_flight"]
+                )
+        if rate_limited:
+            raise FakeRateLimitError("Rate limit reached")
+
+        try:
+            time.sleep(self.latency)
+        finally:
+            with _calls_lock:
+                self.calls["in_flight"] -= 1
+        message = AIMessage(content=self._get_reply(messages[-1].content))
+        return ChatResult(generations=[ChatGeneration(message=message)])
@@ -0,0 +1,175 @@
+import json
+import os
+import resource
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, NamedTuple, Optional
+
+from langchain.chat_models.base import BaseChatModel
+
+from src.configs.llmmodels.defaultllmmodel import DefaultLLMModelConfig
+from src.llmmodels.defaultllmmodel import DefaultLLMModel
+from src.repositoryadapters.baseadapter import BaseRepositoryAdapter
+from src.repositoryadapters.defaultadapter import DefaultRepositoryAdapter
+from src.utils.metrics import Metrics, set_metrics
+from src.utils.prompt import set_request_scheduler
+
+from .fakes import FakeChatModel
+from .synthetic import SyntheticRepoSpec, create_synthetic_repo
+
+
+class Scenario(NamedTuple):
+    name: str
+    spec: SyntheticRepoSpec
+
+
+SCENARIOS = {
+    scenario.name: scenario
+    for scenario in [
+        Scenario("1k", SyntheticRepoSpec(1_000)),
+        Scenario("1k-large-files", SyntheticRepoSpec(1_000, "large")),
+        Scenario("10k", SyntheticRepoSpec(10_000)),
+        Scenario("10k-uniform", SyntheticRepoSpec(10_000, "uniform")),
+        Scenario("100k", SyntheticRepoSpec(100_000)),
+    ]
+}
+
+DEFAULT_SCENARIOS = ["1k", "1k-large-files", "10k"]
+
+# Slower runs within this fraction of the baseline are not regressions
+DEFAULT_TOLERANCE = 0.25
+
+_BASELINE_KEYS = ("llm_latency", "wall_seconds", "peak_rss_mb", "llm_calls")
+
+
+class BenchmarkLLMModel(DefaultLLMModel):
+    def __init__(
+        self,
+        repo: BaseRepositoryAdapter,
+        config: DefaultLLMModelConfig,
+        latency: float = 0.0,
+    ) -> None:
+        self.latency = latency
+        super().__init__(repo, config)
+
+    def _get_llm(self) -> BaseChatModel:
+        return FakeChatModel(latency=self.latency, echo=False)
+
+
+def get_benchmark_llm_config() -> DefaultLLMModelConfig:
+    llm_config = DefaultLLMModelConfig.get_default_config()
+    # Every run must summarize everything to be comparable
+    llm_config.summary_cache_path = None
+    llm_config.incremental_generation = False
+    llm_config.retrieval_index_dir = None
+    # The fake LLM has no quotas to respect
+    llm_config.requests_per_minute = None
+    llm_config.tokens_per_minute = None
+    return llm_config
+
+
+def get_peak_rss_mb() -> float:
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak_rss / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+
+def get_stages_seconds(report: Dict[str, Any]) -> Dict[str, float]:
+    stages: Dict[str, float] = {}
+    for span in report["spans"]:
+        stages[span["name"]] = stages.get(span["name"], 0.0) + span["total_seconds"]
+    return stages
+
+
+def run_scenario(scenario_name: str, work_dir: str, latency: float = 0.0) -> Dict:
+    scenario = SCENARIOS[scenario_name]
+    remote_path = os.path.join(work_dir, "remote", scenario.name)
+    create_synthetic_repo(remote_path, scenario.spec)
+    llm_config = get_benchmark_llm_config()
+
+    metrics = Metrics()
+    previous_metrics = set_metrics(metrics)
+    previous_scheduler = set_request_scheduler(llm_config.get_request_scheduler())
+    started = time.perf_counter()
+    try:
+        repo_adapter = DefaultRepositoryAdapter(
+            repo_url=remote_path, base_dir=os.path.join(work_dir, "clones")
+        )
+        llm_model = BenchmarkLLMModel(repo_adapter, llm_config, latency)
+        llm_model.generate_readme()
+    finally:
+        set_request_scheduler(previous_scheduler)
+        set_metrics(previous_metrics)
+    wall_seconds = time.perf_counter() - started
+
+    report = metrics.report()
+    return {
+        "scenario": scenario.name,
+        "num_files": scenario.spec.num_files,
+        "size_distribution": scenario.spec.size_distribution,
+        "llm_latency": latency,
+        "wall_seconds": wall_seconds,
+        "files_per_second": scenario.spec.num_files / wall_seconds,
+        "peak_rss_mb": get_peak_rss_mb(),
+        "llm_calls": llm_model.llm.calls["total"],
+        "stages_seconds": get_stages_seconds(report),
+        "metrics": report,
+    }
+
+
+def run_isolated_scenario(scenario_name: str, latency: float = 0.0) -> Dict:
+    # A fresh process per scenario keeps peak RSS from leaking between them
+    with tempfile.TemporaryDirectory(prefix="readmaker-benchmark-") as work_dir:
+        with ProcessPoolExecutor(max_workers=1) as executor:
+            return executor.submit(
+                run_scenario, scenario_name, work_dir, latency
+            ).result()
+
+
+def load_baseline(baseline_path: str) -> Dict[str, Dict[str, float]]:
+    if not os.path.exists(baseline_path):
+        return {}
+    with open(baseline_path, "r") as f:
+        return json.load(f)
+
+
+def save_baseline(baseline_path: str, results: List[Dict[str, Any]]) -> None:
+    baseline = load_baseline(baseline_path)
+    for result in results:
+        baseline[result["scenario"]] = {
+            key: result[key] for key in _BASELINE_KEYS if key in result
+        }
+    os.makedirs(os.path.dirname(baseline_path) or ".", exist_ok=True)
+    with open(baseline_path, "w") as f:
+        json.dump(baseline, f, indent=2, sort_keys=True)
+        f.write("\n")
+
+
+def compare_with_baseline(
+    results: List[Dict[str, Any]],
+    baseline: Dict[str, Dict[str, float]],
+    tolerance: float = DEFAULT_TOLERANCE,
+) -> List[str]:
+    regressions = []
+    for result in results:
+        expected: Optional[Dict[str, float]] = baseline.get(result["scenario"])
+        # Runs with another fake LLM latency aren't comparable
+        if expected is None or expected.get("llm_latency") != result.get("llm_latency"):
+            continue
+        for key in ("wall_seconds", "peak_rss_mb"):
+            if key not in expected or key not in result:
+                continue
+            if result[key] > expected[key] * (1 + tolerance):
+                regressions.append(
+                    f"{result['scenario']}: {key} {result[key]:.2f} exceeds the "
+                    f"baseline {expected[key]:.2f} by more than {tolerance:.0%}"
+                )
+        # The fake model is deterministic, so any extra call is a regression
+        if result.get("llm_calls", 0) > expected.get("llm_calls", float("inf")):
+            regressions.append(
+                f"{result['scenario']}: {result['llm_calls']} LLM calls, "
+                f"baseline {expected['llm_calls']}"
+            )
+    return regressions
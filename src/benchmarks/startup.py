@@ -0,0 +1,71 @@
+import os
+import statistics
+import subprocess
+import sys
+from typing import Any, Dict, List
+
+from src import config
+
+STARTUP_MODULES = ["app", "src.pipeline", "src.llmmodels.defaultllmmodel"]
+
+_IMPORT_SCRIPT = """
+import time
+started = time.perf_counter()
+import {module}
+print(time.perf_counter() - started)
+"""
+
+_CONSTRUCTION_SCRIPT = """
+import time
+from unittest.mock import MagicMock
+from src.llmmodels.defaultllmmodel import DefaultLLMModel
+timings = []
+for _ in range({repeat}):
+    started = time.perf_counter()
+    DefaultLLMModel(MagicMock())
+    timings.append(time.perf_counter() - started)
+print(timings[0], sum(timings[1:]) / max(1, len(timings) - 1))
+"""
+
+
+def _run_python(script: str) -> List[float]:
+    # Every measurement runs in a fresh interpreter, so nothing is imported yet
+    output = subprocess.run(
+        [sys.executable, "-c", script],
+        cwd=config.ROOT_DIR,
+        capture_output=True,
+        text=True,
+        check=True,
+        env={"OPENAI_API_KEY": "benchmark", **os.environ},
+    ).stdout
+    return [float(value) for value in output.split()]
+
+
+def measure_import_seconds(module: str, repeat: int = 5) -> float:
+    return statistics.median(
+        _run_python(_IMPORT_SCRIPT.format(module=module))[0] for _ in range(repeat)
+    )
+
+
+def measure_model_construction_seconds(repeat: int = 5) -> Dict[str, float]:
+    first, warm = _run_python(_CONSTRUCTION_SCRIPT.format(repeat=repeat))
+    return {"first_seconds": first, "warm_seconds": warm}
+
+
+def run_startup_benchmark(repeat: int = 5) -> List[Dict[str, Any]]:
+    results = [
+        {
+            "scenario": f"import:{module}",
+            "wall_seconds": measure_import_seconds(module, repeat),
+        }
+        for module in STARTUP_MODULES
+    ]
+    construction = measure_model_construction_seconds(repeat)
+    results.append(
+        {
+            "scenario": "construct:DefaultLLMModel",
+            "wall_seconds": construction["warm_seconds"],
+            "first_seconds": construction["first_seconds"],
+        }
+    )
+    return results
@@ -0,0 +1,100 @@
+import os
+import random
+from typing import Callable, Dict, List, NamedTuple
+
+from git import Repo
+
+_TEXT_EXTENSIONS = ["py", "py", "py", "md", "json", "txt", "yaml", "js"]
+_BINARY_EXTENSIONS = ["png", "bin", "so"]
+_FILES_PER_DIRECTORY = 20
+_DIRECTORIES_PER_LEVEL = 8
+
+
+class SyntheticRepoSpec(NamedTuple):
+    num_files: int
+    # One of the keys of SIZE_DISTRIBUTIONS
+    size_distribution: str = "lognormal"
+    binary_ratio: float = 0.05
+    # Every n-th directory gets its own .gitignore with ignored files in it
+    gitignore_every: int = 10
+    seed: int = 0
+
+
+SIZE_DISTRIBUTIONS: Dict[str, Callable[[random.Random], int]] = {
+    # Mostly small source files with a long tail, like most repositories
+    "lognormal": lambda rng: int(min(rng.lognormvariate(7.0, 1.0), 500_000)),
+    "uniform": lambda rng: rng.randint(200, 8_000),
+    # Few files big enough to go through the chunked summarization
+    "large": lambda rng: int(min(rng.paretovariate(1.2) * 20_000, 2_000_000)),
+}
+
+
+def get_synthetic_directory(index: int) -> str:
+    parts = []
+    index //= _FILES_PER_DIRECTORY
+    while index:
+        index, part = divmod(index - 1, _DIRECTORIES_PER_LEVEL)
+        parts.append(f"pkg{part}")
+    return "/".join(reversed(parts))
+
+
+def get_text_contents(rng: random.Random, extension: str, size: int) -> str:
+    lines, length = [], 0
+    while length < size:
+        i = rng.randint(0, 1_000_000)
+        if extension == "py":
+            line = f"def function_{i}(value):\n    return value * {i % 97}\n"
+        elif extension == "json":
+            line = f'{{"key_{i}": {i}}}\n'
+        else:
+            line = f"Line {i} of the synthetic {extension} file.\n"
+        lines.append(line)
+        length += len(line)
+    return "".join(lines)
+
+
+def _write_file(path: str, contents: bytes) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(contents)
+
+
+def create_synthetic_repo(repo_path: str, spec: SyntheticRepoSpec) -> List[str]:
+    """Creates a committed git repository with `spec.num_files` synthetic files
+    and a LICENSE, and returns the synthetic files paths. Ignored files are
+    written too, but not returned."""
+    rng = random.Random(spec.seed)
+    get_size = SIZE_DISTRIBUTIONS[spec.size_distribution]
+    files = []
+    directories = []
+    for index in range(spec.num_files):
+        directory = get_synthetic_directory(index)
+        if not directories or directories[-1] != directory:
+            directories.append(directory)
+        size = get_size(rng)
+        if rng.random() < spec.binary_ratio:
+            extension = rng.choice(_BINARY_EXTENSIONS)
+            contents = b"\0" + rng.randbytes(max(0, size - 1))
+        else:
+            extension = rng.choice(_TEXT_EXTENSIONS)
+            contents = get_text_contents(rng, extension, size).encode("utf-8")
+        file = "/".join(filter(None, [directory, f"file{index}.{extension}"]))
+        _write_file(os.path.join(repo_path, file), contents)
+        files.append(file)
+
+    for directory in directories[:: max(1, spec.gitignore_every)]:
+        directory_path = os.path.join(repo_path, directory)
+        _write_file(os.path.join(directory_path, ".gitignore"), b"*.log\nbuild/\n")
+        _write_file(os.path.join(directory_path, "debug.log"), b"ignored\n")
+        _write_file(os.path.join(directory_path, "build", "output.txt"), b"ignored\n")
+
+    # The README license section expects a LICENSE file in the root
+    _write_file(os.path.join(repo_path, "LICENSE"), b"MIT License\n")
+
+    repo = Repo.init(repo_path, initial_branch="main")
+    with repo.config_writer() as config:
+        config.set_value("user", "name", "Benchmark")
+        config.set_value("user", "email", "benchmark@example.com")
+    repo.git.add("-A")
+    repo.git.commit("-q", "-m", "Synthetic repository")
+    return files
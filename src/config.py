@@ -2,3 +2,4 @@ import os
 
 ROOT_DIR = os.path.split(os.path.split(os.path.abspath(__file__))[0])[0]
 RESOURCES_DIR = os.path.join(ROOT_DIR, "resources")
+CACHE_DIR = os.path.join(ROOT_DIR, ".cache")
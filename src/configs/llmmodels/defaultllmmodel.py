@@ -1,27 +1,132 @@
 from __future__ import annotations
 
 import os
+import threading
+from functools import lru_cache
+from typing import Dict, Optional, Tuple
 
 from src import config
-from src.utils.files import get_file_contents, get_files_list
+from src.utils.ratelimit import RequestScheduler
+
+FolderSignature = Tuple[Tuple[str, int, int], ...]
+
+_request_scheduler_lock = threading.Lock()
+
+
+def _get_folder_signature(folder_path: str) -> FolderSignature:
+    with os.scandir(folder_path) as entries:
+        return tuple(
+            sorted(
+                (entry.name, entry.stat().st_mtime_ns, entry.stat().st_size)
+                for entry in entries
+                if entry.is_file() and not entry.name.startswith(".")
+            )
+        )
+
+
+@lru_cache(maxsize=8)
+def _load_prompt_templates(
+    folder_path: str, signature: FolderSignature
+) -> Dict[str, str]:
+    templates = {}
+    for file_name, _, _ in signature:
+        with open(os.path.join(folder_path, file_name), "r") as f:
+            templates[os.path.splitext(file_name)[0]] = f.read()
+    return templates
+
+
+def load_prompt_templates(folder_path: str) -> Dict[str, str]:
+    """Reads the prompt templates in a folder, keyed by file name without
+    extension. Templates are cached until a file in the folder changes."""
+    if not os.path.isdir(folder_path):
+        raise ValueError(f"No such folder: {folder_path}")
+    return _load_prompt_templates(folder_path, _get_folder_signature(folder_path))
 
 
 class DefaultLLMModelConfig:
+    def __init__(self) -> None:
+        self.directories_only_in_file_structure = False
+        self.file_structure_max_depth: Optional[int] = None
+        self.file_structure_max_entries: Optional[int] = 500
+        self.max_concurrency = 8
+        self.summary_window_files = 256
+        self.model_name = "gpt-3.5-turbo-1106"
+        self.request_timeout: Optional[float] = 60
+        # Quotas of the lowest OpenAI usage tier, raise them up to the account
+        # limits. None disables the quota
+        self.requests_per_minute: Optional[float] = 3_500
+        self.tokens_per_minute: Optional[float] = 60_000
+        # LLM calls in flight across every model sharing this config
+        self.request_max_concurrency = 16
+        self._request_scheduler: Optional[RequestScheduler] = None
+        self.summary_cache_path: Optional[str] = os.path.join(
+            config.CACHE_DIR, "summaries.sqlite3"
+        )
+        self.summary_cache_max_entries: Optional[int] = 100_000
+        self.summary_cache_max_age: Optional[float] = 30 * 24 * 60 * 60
+        self.batch_token_budget: Optional[int] = 2_000
+        self.batch_small_file_tokens = 400
+        self.batch_max_files = 20
+        # Files with a static summary of at least this many words, like
+        # documented Python modules and manifests, skip the LLM. Static
+        # summaries are shorter than the LLM ones, so they are opt-in. None
+        # summarizes every file with the LLM
+        self.static_summary_min_words: Optional[int] = None
+        self.chunk_threshold_tokens: Optional[int] = 12_000
+        self.chunk_size_tokens = 3_000
+        self.chunk_overlap_tokens = 200
+        self.chunk_max_count: Optional[int] = 64
+        self.incremental_generation = False
+        # Lists files with the same contents in a single summary entry
+        self.collapse_duplicate_summaries = False
+        self.summaries_token_budget: Optional[int] = 8_000
+        self.directory_summary_tokens = 3_000
+        self.readme_state_dir = os.path.join(config.CACHE_DIR, "readmes")
+        # Sections listed here get the summaries and contents chunks most
+        # relevant to their query once all summaries exceed the budget
+        self.retrieval_token_budget: Optional[int] = 3_000
+        self.retrieval_queries: Dict[str, str] = {
+            "introduction": "project purpose main features application usage "
+            "entry point main module command line interface",
+            "installation": "install installation setup dependencies requirements "
+            "package packages version python pip npm conda docker dockerfile "
+            "compose makefile build environment variables configuration ci "
+            "workflow setup.py setup.cfg pyproject.toml requirements.txt "
+            "package.json",
+            "repository_overview": "module package directory component "
+            "architecture main source code classes functions api",
+        }
+        self.retrieval_top_k = 64
+        self.retrieval_chunk_tokens = 300
+        self.retrieval_max_file_chunks: Optional[int] = 8
+        self.retrieval_index_dir: Optional[str] = os.path.join(
+            config.CACHE_DIR, "retrieval"
+        )
+
     def load_prompts_from_folder(self, folder_path: str) -> None:
-        files_list = get_files_list(folder_path)
-        files_contents = {}
-        for file in files_list:
-            file_base_name = os.path.basename(file)
-            base_name_without_ext = os.path.splitext(file_base_name)[0]
-            contents = "\n".join(d.page_content for d in get_file_contents(file))
-            files_contents[base_name_without_ext] = contents
+        files_contents = load_prompt_templates(folder_path)
 
         self.file_summary_prompt_template = files_contents["file_summary"]
+        self.files_batch_summary_prompt_template = files_contents["files_batch_summary"]
+        self.file_chunk_summary_prompt_template = files_contents["file_chunk_summary"]
+        self.file_chunks_reduce_prompt_template = files_contents["file_chunks_reduce"]
+        self.directory_summary_prompt_template = files_contents["directory_summary"]
         self.introduction_prompt_template = files_contents["introduction"]
         self.installation_prompt_template = files_contents["installation"]
         self.repository_overview_prompt_template = files_contents["repository_overview"]
 
-        self.directories_only_in_file_structure = False
+    def get_request_scheduler(self) -> RequestScheduler:
+        """Returns the scheduler of this config, built on first use, so models
+        sharing the config share its quotas."""
+        with _request_scheduler_lock:
+            if self._request_scheduler is None:
+                self._request_scheduler = RequestScheduler(
+                    requests_per_minute=self.requests_per_minute,
+                    tokens_per_minute=self.tokens_per_minute,
+                    max_concurrency=self.request_max_concurrency,
+                    model_name=self.model_name,
+                )
+            return self._request_scheduler
 
     @classmethod
     def get_default_config(cls) -> DefaultLLMModelConfig:
@@ -0,0 +1,38 @@
+from __future__ import annotations
+
+from typing import Any, Dict, List, Optional
+
+
+class DefaultRepositoryAdapterConfig:
+    def __init__(self) -> None:
+        self.max_workers = 8
+        self.max_files_in_flight = 32
+        self.max_file_size: Optional[int] = 1_000_000
+        self.max_total_bytes: Optional[int] = 50_000_000
+        self.max_files: Optional[int] = None
+        self.include_patterns: List[str] = []
+        self.exclude_patterns: List[str] = []
+        self.use_default_deny_patterns = True
+        self.clone_depth: Optional[int] = None
+        self.clone_single_branch = True
+        # Partial clones, like "blob:none", fetch the files contents lazily
+        self.clone_filter: Optional[str] = None
+        self.sparse_checkout_patterns: Optional[List[str]] = None
+        # Fetches the remote into a clone left by a previous run, which is
+        # otherwise read as is
+        self.update_existing_clone = False
+        self.mirror_cache_dir: Optional[str] = None
+        self.mirror_cache_max_bytes: Optional[int] = 10_000_000_000
+
+    def get_clone_options(self) -> Dict[str, Any]:
+        return dict(
+            depth=self.clone_depth,
+            single_branch=self.clone_single_branch,
+            filter_spec=self.clone_filter,
+            sparse_patterns=self.sparse_checkout_patterns,
+            update=self.update_existing_clone,
+        )
+
+    @classmethod
+    def get_default_config(cls) -> DefaultRepositoryAdapterConfig:
+        return cls()
@@ -1,6 +1,22 @@
-from typing import Protocol
+from typing import Iterator, NamedTuple, Optional, Protocol
+
+
+class ReadmeGenerationCancelled(Exception):
+    pass
+
+
+class ReadmeEvent(NamedTuple):
+    # One of "progress", "token", "section" or "done"
+    type: str
+    text: str = ""
+    section: Optional[str] = None
+    completed: int = 0
+    total: int = 0
 
 
 class BaseLLMModel(Protocol):
     def generate_readme(self) -> str:
         pass
+
+    def stream_readme(self) -> Iterator[ReadmeEvent]:
+        pass
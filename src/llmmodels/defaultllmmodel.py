@@ -1,60 +1,172 @@
-from typing import Dict
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
 
 from langchain.chat_models import ChatOpenAI
-from langchain.prompts import BaseChatPromptTemplate, ChatPromptTemplate
+from langchain.chat_models.base import BaseChatModel
+from langchain.prompts import BaseChatPromptTemplate
 from langchain.schema import StrOutputParser
+from langchain.schema.runnable import Runnable
 
 from src.configs.llmmodels.defaultllmmodel import DefaultLLMModelConfig
 from src.repositoryadapters.baseadapter import BaseRepositoryAdapter
+from src.utils.cache import SummaryCache
+from src.utils.chunks import group_texts, iter_batches, iter_file_chunks
+from src.utils.extraction import get_static_summary, get_summary_information
+from src.utils.hierarchy import (
+    get_directories_entries,
+    get_directories_levels,
+    get_hierarchy_summaries_text,
+    get_overview_summaries_text,
+    get_summary_entry,
+)
+from src.utils.ingestion import get_unique_contents
+from src.utils.metrics import get_metrics, timed
 from src.utils.preprocess import remove_markdown_tags
 from src.utils.prompt import (
-    execute_prompt,
+    count_tokens,
+    execute_prompts,
+    execute_prompts_list,
+    execute_prompts_parallel,
+    get_chat_prompt_template,
+    get_file_batch_entry,
+    get_files_batch_text,
     get_files_structure_text,
     get_files_summaries_text,
+    pack_files,
+    parse_files_batch_summaries,
+    set_request_scheduler,
+)
+from src.utils.retrieval import (
+    RetrievalDocument,
+    RetrievalIndex,
+    get_retrieval_index_path,
+    get_retrieved_summaries_text,
 )
+from src.utils.state import ReadmeState, get_inputs_hash, get_readme_state_path
+
+from .basellmmodel import BaseLLMModel, ReadmeEvent, ReadmeGenerationCancelled
+
 
-from .basellmmodel import BaseLLMModel
+@lru_cache(maxsize=8)
+def get_chat_model(model_name: str, request_timeout: Optional[float]) -> ChatOpenAI:
+    # Creating the OpenAI client is slow, so models with the same settings
+    # share one. Retries are handled by the request scheduler in
+    # src.utils.prompt
+    return ChatOpenAI(
+        temperature=0,
+        model_name=model_name,
+        request_timeout=request_timeout,
+        max_retries=0,
+    )
 
 
 class DefaultLLMModel(BaseLLMModel):
     def __init__(
         self,
         repo: BaseRepositoryAdapter,
-        config: DefaultLLMModelConfig = DefaultLLMModelConfig.get_default_config(),
+        config: Optional[DefaultLLMModelConfig] = None,
     ):
-        self.config = config
+        self.config = config or DefaultLLMModelConfig.get_default_config()
         self.repo = repo
-        self.llm = ChatOpenAI(temperature=0, model_name="gpt-3.5-turbo-1106")
-        self.file_summary_chain = (
-            self._get_file_summary_prompt() | self.llm | StrOutputParser()
+        # Requests are throttled and their tokens counted for this config
+        set_request_scheduler(self.config.get_request_scheduler())
+        self.files_summaries_errors: Dict[str, Exception] = {}
+        # Maps every file to an earlier file with the same contents
+        self.files_duplicates: Dict[str, str] = {}
+        self._event_callback: Optional[Callable[[ReadmeEvent], None]] = None
+        self.llm = self._get_llm()
+        self.summary_cache = self._get_summary_cache()
+        self.file_summary_chain = self._create_chain(
+            self._get_file_summary_prompt(), "file_summary"
+        )
+        self.files_batch_summary_chain = self._create_chain(
+            self._get_files_batch_summary_prompt(), "files_batch_summary"
+        )
+        self.file_chunk_summary_chain = self._create_chain(
+            self._get_file_chunk_summary_prompt(), "file_chunk_summary"
+        )
+        self.file_chunks_reduce_chain = self._create_chain(
+            self._get_file_chunks_reduce_prompt(), "file_chunks_reduce"
+        )
+        self.directory_summary_chain = self._create_chain(
+            self._get_directory_summary_prompt(), "directory_summary"
         )
-        self.introduction_chain = (
-            self._get_introduction_prompt() | self.llm | StrOutputParser()
+        self.introduction_chain = self._create_chain(
+            self._get_introduction_prompt(), "introduction"
         )
-        self.installation_chain = (
-            self._get_installation_prompt() | self.llm | StrOutputParser()
+        self.installation_chain = self._create_chain(
+            self._get_installation_prompt(), "installation"
         )
-        self.repository_overview_chain = (
-            self._get_repository_overview_prompt() | self.llm | StrOutputParser()
+        self.repository_overview_chain = self._create_chain(
+            self._get_repository_overview_prompt(), "repository_overview"
+        )
+
+    def _get_llm(self) -> BaseChatModel:
+        return get_chat_model(self.config.model_name, self.config.request_timeout)
+
+    def _emit(self, event: ReadmeEvent) -> None:
+        if self._event_callback is not None:
+            self._event_callback(event)
+
+    def _get_summary_cache(self) -> Optional[SummaryCache]:
+        if not self.config.summary_cache_path:
+            return None
+        return SummaryCache(
+            self.config.summary_cache_path,
+            max_entries=self.config.summary_cache_max_entries,
+            max_age=self.config.summary_cache_max_age,
         )
 
     def _create_prompt(self, template_file_path: str) -> BaseChatPromptTemplate:
-        prompt = ChatPromptTemplate.from_template(template_file_path)
+        prompt = get_chat_prompt_template(template_file_path)
         return prompt
 
+    def _create_chain(self, prompt: BaseChatPromptTemplate, name: str) -> Runnable:
+        # The run name labels the chain in metrics and LangChain callbacks
+        return (prompt | self.llm | StrOutputParser()).with_config(run_name=name)
+
     def _get_file_summary_prompt(self) -> BaseChatPromptTemplate:
         return self._create_prompt(self.config.file_summary_prompt_template)
 
+    def _get_files_batch_summary_prompt(self) -> BaseChatPromptTemplate:
+        return self._create_prompt(self.config.files_batch_summary_prompt_template)
+
+    def _get_file_chunk_summary_prompt(self) -> BaseChatPromptTemplate:
+        return self._create_prompt(self.config.file_chunk_summary_prompt_template)
+
+    def _get_file_chunks_reduce_prompt(self) -> BaseChatPromptTemplate:
+        return self._create_prompt(self.config.file_chunks_reduce_prompt_template)
+
+    def _get_directory_summary_prompt(self) -> BaseChatPromptTemplate:
+        return self._create_prompt(self.config.directory_summary_prompt_template)
+
     def _get_introduction_prompt(self) -> BaseChatPromptTemplate:
         return self._create_prompt(self.config.introduction_prompt_template)
 
     def _get_file_structure_from_repo(self) -> str:
         file_structure = self.repo.repo_structure(
-            directories_only=self.config.directories_only_in_file_structure
+            directories_only=self.config.directories_only_in_file_structure,
+            max_depth=self.config.file_structure_max_depth,
+            max_entries=self.config.file_structure_max_entries,
         )
         output_text = f"# File Structure\n\n```\n{file_structure}\n```"
         return output_text
 
+    def _get_files_structure_text(self, files_list: List[str]) -> str:
+        max_entries = self.config.file_structure_max_entries
+        if max_entries is None or len(files_list) <= max_entries:
+            return get_files_structure_text(files_list)
+        # Listing every file of large repositories would fill the prompts
+        file_structure = self.repo.repo_structure(
+            directories_only=False,
+            max_depth=self.config.file_structure_max_depth,
+            max_entries=max_entries,
+        )
+        return f"Project file structure:\n{file_structure}"
+
     def _get_installation_prompt(self) -> BaseChatPromptTemplate:
         return self._create_prompt(self.config.installation_prompt_template)
 
@@ -66,42 +178,691 @@ class DefaultLLMModel(BaseLLMModel):
         output_text = f"# License\n\n[{license_type}]({license_link})"
         return output_text
 
-    def _get_files_summaries(self, files_contents: Dict[str, str]) -> Dict[str, str]:
+    def _count_tokens(self, text: str) -> int:
+        return count_tokens(text, self.config.model_name)
+
+    def _get_summary_cache_key(self, contents: str) -> str:
+        prompt_template = self.config.file_summary_prompt_template
+        if self.config.batch_token_budget:
+            prompt_template += self.config.files_batch_summary_prompt_template
+        if self.config.chunk_threshold_tokens:
+            prompt_template += self.config.file_chunk_summary_prompt_template
+            prompt_template += self.config.file_chunks_reduce_prompt_template
+        return SummaryCache.make_key(contents, prompt_template, self.config.model_name)
+
+    def _get_cached_summaries(
+        self, files_contents: Dict[str, str]
+    ) -> Tuple[Dict[str, str], Dict[str, str]]:
+        files_summaries, cache_keys = {}, {}
+        if self.summary_cache is None:
+            return files_summaries, cache_keys
+        for file, contents in files_contents.items():
+            key = self._get_summary_cache_key(contents)
+            summary = self.summary_cache.get(key)
+            if summary is None:
+                cache_keys[file] = key
+            else:
+                files_summaries[file] = summary
+        return files_summaries, cache_keys
+
+    def _get_static_summaries(self, files_contents: Dict[str, str]) -> Dict[str, str]:
+        min_words = self.config.static_summary_min_words
+        if min_words is None:
+            return {}
         files_summaries = {}
         for file, contents in files_contents.items():
-            print(f"Summarizing file: {file}")
-            summary = execute_prompt(self.file_summary_chain, file_contents=contents)
+            summary = get_static_summary(file, contents)
+            if summary is not None and get_summary_information(summary) >= min_words:
+                files_summaries[file] = summary
+        return files_summaries
+
+    def _get_files_tokens(self, files_contents: Dict[str, str]) -> Dict[str, int]:
+        if not (self.config.batch_token_budget or self.config.chunk_threshold_tokens):
+            return {}
+        return {
+            file: self._count_tokens(get_file_batch_entry(file, contents))
+            for file, contents in files_contents.items()
+        }
+
+    def _get_summary_batches(
+        self, files: List[str], files_tokens: Dict[str, int]
+    ) -> List[List[str]]:
+        if not self.config.batch_token_budget:
+            return [[file] for file in files]
+        return pack_files(
+            {file: files_tokens[file] for file in files},
+            self.config.batch_token_budget,
+            self.config.batch_small_file_tokens,
+            max_files=self.config.batch_max_files,
+        )
+
+    def _get_summary_prompt(
+        self, files_contents: Dict[str, str], batch: List[str]
+    ) -> Tuple[Any, Dict[str, Any]]:
+        if len(batch) == 1:
+            return self.file_summary_chain, {"file_contents": files_contents[batch[0]]}
+        batch_contents = {file: files_contents[file] for file in batch}
+        return self.files_batch_summary_chain, {
+            "files_contents": get_files_batch_text(batch_contents)
+        }
+
+    def _summarize_small_files(
+        self, files_contents: Dict[str, str], files_tokens: Dict[str, int]
+    ) -> Tuple[Dict[str, str], Dict[str, Exception]]:
+        batches = self._get_summary_batches(list(files_contents), files_tokens)
+        print(f"Summarizing {len(files_contents)} files in {len(batches)} prompts")
+        outputs = execute_prompts_list(
+            [self._get_summary_prompt(files_contents, batch) for batch in batches],
+            max_concurrency=self.config.max_concurrency,
+        )
+
+        files_summaries, errors, unparsed = {}, {}, []
+        for batch, output in zip(batches, outputs):
+            if len(batch) == 1:
+                if isinstance(output, Exception):
+                    errors[batch[0]] = output
+                else:
+                    files_summaries[batch[0]] = output
+                continue
+            parsed = (
+                {}
+                if isinstance(output, Exception)
+                else parse_files_batch_summaries(output, batch)
+            )
+            files_summaries.update(parsed)
+            unparsed.extend(file for file in batch if file not in parsed)
+
+        if unparsed:
+            print(f"Summarizing {len(unparsed)} files missing from batched summaries")
+            outputs = execute_prompts(
+                self.file_summary_chain,
+                [{"file_contents": files_contents[file]} for file in unparsed],
+                max_concurrency=self.config.max_concurrency,
+            )
+            for file, output in zip(unparsed, outputs):
+                if isinstance(output, Exception):
+                    errors[file] = output
+                else:
+                    files_summaries[file] = output
+        return files_summaries, errors
+
+    def _reduce_chunks_summaries(self, file: str, chunks_summaries: List[str]) -> str:
+        while len(chunks_summaries) > 1:
+            groups = group_texts(
+                chunks_summaries, self.config.chunk_size_tokens, self._count_tokens
+            )
+            if len(groups) == len(chunks_summaries):
+                groups = [chunks_summaries]
+            outputs = execute_prompts(
+                self.file_chunks_reduce_chain,
+                [
+                    {"file_path": file, "chunks_summaries": "\n\n".join(group)}
+                    for group in groups
+                ],
+                max_concurrency=self.config.max_concurrency,
+            )
+            for output in outputs:
+                if isinstance(output, Exception):
+                    raise output
+            chunks_summaries = outputs
+        return chunks_summaries[0]
+
+    def _summarize_large_file(self, file: str, contents: str) -> str:
+        chunks = iter_file_chunks(
+            file,
+            contents,
+            self.config.chunk_size_tokens,
+            self.config.chunk_overlap_tokens,
+            length_function=self._count_tokens,
+            max_chunks=self.config.chunk_max_count,
+        )
+        outputs = execute_prompts(
+            self.file_chunk_summary_chain,
+            [{"file_path": file, "chunk_contents": chunk} for chunk in chunks],
+            max_concurrency=self.config.max_concurrency,
+        )
+        print(f"Summarized file {file} in {len(outputs)} chunks")
+        for output in outputs:
+            if isinstance(output, Exception):
+                raise output
+        return self._reduce_chunks_summaries(file, outputs)
+
+    def _summarize_files(
+        self, files_contents: Dict[str, str]
+    ) -> Tuple[Dict[str, str], Dict[str, Exception]]:
+        files_tokens = self._get_files_tokens(files_contents)
+        threshold = self.config.chunk_threshold_tokens
+        large_files = [
+            file
+            for file, tokens in files_tokens.items()
+            if threshold and tokens > threshold
+        ]
+
+        files_summaries, errors = self._summarize_small_files(
+            {
+                file: contents
+                for file, contents in files_contents.items()
+                if file not in large_files
+            },
+            files_tokens,
+        )
+        for file in large_files:
+            try:
+                files_summaries[file] = self._summarize_large_file(
+                    file, files_contents[file]
+                )
+            except Exception as e:
+                errors[file] = e
+        return files_summaries, errors
+
+    def _get_files_summaries(self, files_contents: Dict[str, str]) -> Dict[str, str]:
+        unique_contents, duplicates = get_unique_contents(files_contents)
+        get_metrics().increment("duplicate_files_total", len(duplicates))
+        self.files_duplicates.update(duplicates)
+        unique_summaries = self._get_unique_files_summaries(unique_contents)
+        for file, original in duplicates.items():
+            if original in unique_summaries:
+                unique_summaries[file] = unique_summaries[original]
+            elif original in self.files_summaries_errors:
+                self.files_summaries_errors[file] = self.files_summaries_errors[
+                    original
+                ]
+
+        return {
+            file: unique_summaries[file]
+            for file in files_contents
+            if file in unique_summaries
+        }
+
+    def _get_unique_files_summaries(
+        self, files_contents: Dict[str, str]
+    ) -> Dict[str, str]:
+        files_summaries = self._get_static_summaries(files_contents)
+        if files_summaries:
+            print(f"{len(files_summaries)} files summarized statically")
+            get_metrics().increment(
+                "files_static_summaries_total", len(files_summaries)
+            )
+        cached_summaries, cache_keys = self._get_cached_summaries(
+            {
+                file: contents
+                for file, contents in files_contents.items()
+                if file not in files_summaries
+            }
+        )
+        if cached_summaries:
+            print(f"{len(cached_summaries)} summaries loaded from cache")
+        files_summaries.update(cached_summaries)
+        new_summaries, self.files_summaries_errors = self._summarize_files(
+            {
+                file: contents
+                for file, contents in files_contents.items()
+                if file not in files_summaries
+            }
+        )
+
+        for file, error in self.files_summaries_errors.items():
+            print(f"Failed to summarize file: {file}\nError:\n{error}")
+        metrics = get_metrics()
+        metrics.increment("files_summarized_total", len(new_summaries))
+        metrics.increment(
+            "files_summary_errors_total", len(self.files_summaries_errors)
+        )
+        for file, summary in new_summaries.items():
             files_summaries[file] = summary
+            if file in cache_keys:
+                self.summary_cache.set(cache_keys[file], summary)
+
+        if self.summary_cache is not None:
+            self.summary_cache.evict()
+
         return files_summaries
 
-    def generate_readme(self) -> str:
-        files_structure_text = get_files_structure_text(self.repo.repo_list())
+    @timed("summarize_files")
+    def _stream_files_summaries(
+        self, files_contents: Iterable[Tuple[str, str]], total: int = 0
+    ) -> Dict[str, str]:
+        files_summaries, errors = {}, {}
+        completed = 0
+        self.files_duplicates = {}
+        self._emit(ReadmeEvent("progress", "Summarizing files", total=total))
+        for window in iter_batches(files_contents, self.config.summary_window_files):
+            files_summaries.update(self._get_files_summaries(dict(window)))
+            errors.update(self.files_summaries_errors)
+            completed += len(window)
+            self._emit(
+                ReadmeEvent(
+                    "progress",
+                    "Summarizing files",
+                    completed=completed,
+                    total=max(total, completed),
+                )
+            )
+        self.files_summaries_errors = errors
+        return files_summaries
 
-        files_summaries = self._get_files_summaries(self.repo.repo_files_contents())
-        files_summaries_text = get_files_summaries_text(files_summaries)
+    def _get_readme_state_path(self) -> str:
+        return get_readme_state_path(self.config.readme_state_dir, self.repo.repo_url)
 
-        print("Generating README.md")
-        readme_text = "\n\n".join(
-            remove_markdown_tags(text)
-            for text in (
-                execute_prompt(
-                    self.introduction_chain,
+    def _load_readme_state(self) -> ReadmeState:
+        return ReadmeState.load(self._get_readme_state_path()) or ReadmeState()
+
+    def _get_updated_files_summaries(
+        self, files_list: List[str], state: Optional[ReadmeState]
+    ) -> Dict[str, str]:
+        if state is None or state.commit is None:
+            return self._stream_files_summaries(
+                self.repo.iter_files_contents(), len(self.repo.ingested_files())
+            )
+
+        try:
+            changed, deleted = self.repo.changed_files(state.commit)
+        except ValueError as e:
+            print(f"Falling back to a full regeneration.\nError:\n{e}")
+            return self._stream_files_summaries(
+                self.repo.iter_files_contents(), len(self.repo.ingested_files())
+            )
+
+        stale = set(changed) | set(deleted)
+        previous_summaries = {
+            file: summary
+            for file, summary in state.files_summaries.items()
+            if file not in stale
+        }
+        files_to_summarize = [f for f in files_list if f not in previous_summaries]
+        print(
+            f"{len(changed)} files changed and {len(deleted)} files deleted "
+            f"since commit {state.commit}"
+        )
+        new_summaries = self._stream_files_summaries(
+            self.repo.iter_files_contents(files=files_to_summarize),
+            len(self.repo.ingested_files(files_to_summarize)),
+        )
+        return {**previous_summaries, **new_summaries}
+
+    def _get_incremental_files_summaries(
+        self, files_list: List[str], state: Optional[ReadmeState]
+    ) -> Dict[str, str]:
+        files_summaries = self._get_updated_files_summaries(files_list, state)
+        return {
+            file: files_summaries[file]
+            for file in files_list
+            if file in files_summaries
+        }
+
+    def _summarize_directory(self, directory: str, entries: List[str]) -> str:
+        texts = entries
+        while True:
+            groups = group_texts(
+                texts, self.config.directory_summary_tokens, self._count_tokens
+            )
+            if len(texts) > 1 and len(groups) == len(texts):
+                groups = [texts]
+            outputs = execute_prompts(
+                self.directory_summary_chain,
+                [
+                    {
+                        "directory_path": directory or "/",
+                        "entries_summaries": "\n\n".join(group),
+                    }
+                    for group in groups
+                ],
+                max_concurrency=self.config.max_concurrency,
+            )
+            for output in outputs:
+                if isinstance(output, Exception):
+                    raise output
+            if len(outputs) == 1:
+                return outputs[0]
+            texts = outputs
+
+    def _get_directory_summary(self, directory: str, entries: List[str]) -> str:
+        if self.summary_cache is None:
+            return self._summarize_directory(directory, entries)
+        key = SummaryCache.make_key(
+            "\n\n".join(entries),
+            self.config.directory_summary_prompt_template,
+            self.config.model_name,
+        )
+        summary = self.summary_cache.get(key)
+        if summary is None:
+            summary = self._summarize_directory(directory, entries)
+            self.summary_cache.set(key, summary)
+        return summary
+
+    @timed("summarize_directories")
+    def _get_directories_summaries(
+        self, files_summaries: Dict[str, str]
+    ) -> Dict[str, str]:
+        directories_entries = get_directories_entries(list(files_summaries))
+        directories_summaries: Dict[str, str] = {}
+
+        def summarize(directory: str) -> Optional[str]:
+            children = [
+                child
+                for child in directories_entries[directory]
+                if child in directories_summaries or child in files_summaries
+            ]
+            # Directories with a single child add nothing to its summary
+            if len(children) == 1:
+                child = children[0]
+                return directories_summaries.get(child, files_summaries.get(child))
+            entries = [
+                (
+                    get_summary_entry(child, directories_summaries[child], True)
+                    if child in directories_summaries
+                    else get_summary_entry(child, files_summaries[child])
+                )
+                for child in children
+            ]
+            if not entries:
+                return None
+            try:
+                return self._get_directory_summary(directory, entries)
+            except Exception as e:
+                print(f"Failed to summarize directory {directory}.\nError:\n{e}")
+                return None
+
+        completed, total = 0, len(directories_entries)
+        self._emit(ReadmeEvent("progress", "Summarizing directories", total=total))
+        # Subdirectories are summarized before their parents, siblings in parallel
+        for level in get_directories_levels(list(directories_entries)):
+            with ThreadPoolExecutor(
+                max_workers=max(1, self.config.max_concurrency)
+            ) as executor:
+                summaries = list(executor.map(summarize, level))
+            for directory, summary in zip(level, summaries):
+                if summary is not None:
+                    directories_summaries[directory] = summary
+            completed += len(level)
+            self._emit(
+                ReadmeEvent(
+                    "progress",
+                    "Summarizing directories",
+                    completed=completed,
+                    total=total,
+                )
+            )
+        return directories_summaries
+
+    def _get_summaries_duplicates(self) -> Optional[Dict[str, str]]:
+        if not self.config.collapse_duplicate_summaries:
+            return None
+        return self.files_duplicates
+
+    def _get_files_summaries_text(
+        self,
+        files_summaries: Dict[str, str],
+        directories_summaries: Optional[Dict[str, str]] = None,
+    ) -> str:
+        files_summaries_text = get_files_summaries_text(
+            files_summaries,
+            duplicates=self._get_summaries_duplicates(),
+        )
+        token_budget = self.config.summaries_token_budget
+        if token_budget is None:
+            return files_summaries_text
+        if self._count_tokens(files_summaries_text) <= token_budget:
+            return files_summaries_text
+
+        if directories_summaries is None:
+            print("Files summaries exceed the token budget, summarizing directories")
+            directories_summaries = self._get_directories_summaries(files_summaries)
+        return get_hierarchy_summaries_text(
+            files_summaries, directories_summaries, token_budget, self._count_tokens
+        )
+
+    def _get_retrieval_documents(
+        self, files_summaries: Dict[str, str]
+    ) -> List[RetrievalDocument]:
+        documents = [
+            RetrievalDocument(file, summary)
+            for file, summary in files_summaries.items()
+        ]
+        max_chunks = self.config.retrieval_max_file_chunks
+        # Chunks are sized in characters, at about 4 per token, as counting
+        # tokens while splitting every file is slow. Retrieved entries are
+        # still counted against the sections budgets
+        chunk_size = self.config.retrieval_chunk_tokens * 4
+        for file, contents in self.repo.iter_files_contents(
+            files=list(files_summaries)
+        ):
+            if max_chunks is not None:
+                # Splitting only needs the beginning of large files
+                contents = contents[: max_chunks * chunk_size * 2]
+            documents.extend(
+                RetrievalDocument(file, chunk, kind="chunk")
+                for chunk in iter_file_chunks(
+                    file, contents, chunk_size, 0, max_chunks=max_chunks
+                )
+            )
+        return documents
+
+    @timed("build_retrieval_index")
+    def _get_retrieval_index(self, files_summaries: Dict[str, str]) -> RetrievalIndex:
+        index_path = None
+        if self.config.retrieval_index_dir:
+            # Summaries change with the prompts and model even on the same commit
+            inputs_hash = get_inputs_hash(
+                dict(
+                    files_summaries=files_summaries,
+                    chunk_tokens=self.config.retrieval_chunk_tokens,
+                    max_file_chunks=self.config.retrieval_max_file_chunks,
+                )
+            )
+            index_path = get_retrieval_index_path(
+                self.config.retrieval_index_dir,
+                self.repo.repo_url,
+                self.repo.head_commit(),
+                inputs_hash,
+            )
+            if (index := RetrievalIndex.load(index_path)) is not None:
+                print(f"Reusing retrieval index {index_path}")
+                return index
+
+        print("Building retrieval index")
+        self._emit(ReadmeEvent("progress", "Indexing repository"))
+        index = RetrievalIndex.build(self._get_retrieval_documents(files_summaries))
+        if index_path is not None:
+            index.save(index_path)
+        return index
+
+    def _get_sections_summaries_texts(
+        self, files_summaries: Dict[str, str]
+    ) -> Dict[str, str]:
+        sections = ("introduction", "installation", "repository_overview")
+        files_summaries_tokens = self._count_tokens(
+            get_files_summaries_text(
+                files_summaries,
+                duplicates=self._get_summaries_duplicates(),
+            )
+        )
+        # Summarized once, for the sections rendering the whole hierarchy and
+        # for the overview leading the retrieved contexts
+        directories_summaries = None
+        summaries_token_budget = self.config.summaries_token_budget
+        if (
+            summaries_token_budget is not None
+            and files_summaries_tokens > summaries_token_budget
+        ):
+            print("Files summaries exceed the token budget, summarizing directories")
+            directories_summaries = self._get_directories_summaries(files_summaries)
+
+        token_budget = self.config.retrieval_token_budget
+        retrieval_sections = []
+        if token_budget is not None and files_summaries_tokens > token_budget:
+            retrieval_sections = [
+                name for name in sections if name in self.config.retrieval_queries
+            ]
+
+        summaries_texts = {}
+        if len(retrieval_sections) < len(sections):
+            files_summaries_text = self._get_files_summaries_text(
+                files_summaries, directories_summaries
+            )
+            for name in sections:
+                summaries_texts[name] = files_summaries_text
+        if retrieval_sections:
+            overview_text = ""
+            if directories_summaries is not None:
+                # Leaves at least half of the budget to the retrieved entries
+                overview_text = get_overview_summaries_text(
+                    directories_summaries, token_budget // 2, self._count_tokens
+                )
+            index = self._get_retrieval_index(files_summaries)
+            for name in retrieval_sections:
+                results = index.search(
+                    self.config.retrieval_queries[name], self.config.retrieval_top_k
+                )
+                summaries_texts[name] = get_retrieved_summaries_text(
+                    results, token_budget, self._count_tokens, overview_text
+                )
+        return summaries_texts
+
+    def _get_sections_prompts(
+        self, files_structure_text: str, summaries_texts: Dict[str, str]
+    ) -> Dict[str, Tuple[Any, Dict[str, Any]]]:
+        return {
+            "introduction": (
+                self.introduction_chain,
+                dict(
                     files_structure=files_structure_text,
-                    files_summaries=files_summaries_text,
+                    files_summaries=summaries_texts["introduction"],
                 ),
-                self._get_file_structure_from_repo(),
-                execute_prompt(
-                    self.installation_chain,
-                    files_summaries=files_summaries_text,
+            ),
+            "installation": (
+                self.installation_chain,
+                dict(
+                    files_summaries=summaries_texts["installation"],
                     repository_url=self.repo.repo_url,
                 ),
-                execute_prompt(
-                    self.repository_overview_chain,
+            ),
+            "repository_overview": (
+                self.repository_overview_chain,
+                dict(
                     files_structure=files_structure_text,
-                    files_summaries=files_summaries_text,
+                    files_summaries=summaries_texts["repository_overview"],
+                ),
+            ),
+        }
+
+    @timed("generate_sections")
+    def _get_sections(
+        self,
+        sections_prompts: Dict[str, Tuple[Any, Dict[str, Any]]],
+        state: Optional[ReadmeState],
+    ) -> Dict[str, str]:
+        inputs_hashes = {
+            name: get_inputs_hash(kwargs)
+            for name, (_, kwargs) in sections_prompts.items()
+        }
+        sections = {}
+        if state is not None:
+            for name, inputs_hash in inputs_hashes.items():
+                if (text := state.get_section(name, inputs_hash)) is not None:
+                    sections[name] = text
+            if sections:
+                print(f"Reusing unchanged sections: {', '.join(sections)}")
+
+        sections.update(
+            execute_prompts_parallel(
+                {
+                    name: prompt
+                    for name, prompt in sections_prompts.items()
+                    if name not in sections
+                },
+                max_concurrency=self.config.max_concurrency,
+                on_token=(
+                    None
+                    if self._event_callback is None
+                    else lambda name, token: self._emit(
+                        ReadmeEvent("token", token, section=name)
+                    )
                 ),
-                self._get_license_from_repo(),
             )
         )
+
+        if state is not None:
+            for name, inputs_hash in inputs_hashes.items():
+                state.set_section(name, inputs_hash, sections[name])
+        return sections
+
+    @timed("generate_readme")
+    def _generate_readme(self) -> str:
+        state = None
+        if self.config.incremental_generation:
+            head_commit = self.repo.head_commit()
+            state = self._load_readme_state()
+
+        self._emit(ReadmeEvent("progress", "Scanning repository"))
+        self.repo.scan()
+        files_list = self.repo.repo_list()
+        files_structure_text = self._get_files_structure_text(files_list)
+
+        files_summaries = self._get_incremental_files_summaries(files_list, state)
+        summaries_texts = self._get_sections_summaries_texts(files_summaries)
+
+        print("Generating README.md")
+        self._emit(ReadmeEvent("progress", "Generating README sections"))
+        sections = {
+            name: remove_markdown_tags(text)
+            for name, text in self._get_sections(
+                self._get_sections_prompts(files_structure_text, summaries_texts),
+                state,
+            ).items()
+        }
+        sections["file_structure"] = self._get_file_structure_from_repo()
+        sections["license"] = self._get_license_from_repo()
+        for name, text in sections.items():
+            self._emit(ReadmeEvent("section", text, section=name))
+
+        readme_text = "\n\n".join(
+            sections[name]
+            for name in (
+                "introduction",
+                "file_structure",
+                "installation",
+                "repository_overview",
+                "license",
+            )
+        )
+
+        if state is not None:
+            state.commit = head_commit
+            state.files_summaries = files_summaries
+            state.save(self._get_readme_state_path())
+
         print("README.md generated")
         return readme_text
+
+    def generate_readme(self) -> str:
+        self._event_callback = None
+        return self._generate_readme()
+
+    def stream_readme(self) -> Iterator[ReadmeEvent]:
+        events = queue.Queue()
+        cancelled = threading.Event()
+
+        def emit(event: ReadmeEvent) -> None:
+            if cancelled.is_set():
+                raise ReadmeGenerationCancelled("README generation cancelled")
+            events.put(event)
+
+        def generate() -> None:
+            try:
+                events.put(ReadmeEvent("done", self._generate_readme()))
+            except BaseException as e:
+                events.put(e)
+
+        self._event_callback = emit
+        threading.Thread(target=generate, daemon=True).start()
+        try:
+            while True:
+                event = events.get()
+                if isinstance(event, BaseException):
+                    raise event
+                yield event
+                if event.type == "done":
+                    return
+        finally:
+            cancelled.set()
@@ -0,0 +1,71 @@
+import os
+import shutil
+from functools import lru_cache
+from typing import Any, Dict, Optional, Tuple
+
+from src import config
+from src.configs.llmmodels.defaultllmmodel import DefaultLLMModelConfig
+from src.configs.repositoryadapters.defaultadapter import (
+    DefaultRepositoryAdapterConfig,
+)
+from src.utils.jobs import JobContext
+from src.utils.metrics import Metrics, set_metrics
+from src.utils.repository import get_remote_head
+
+
+def get_repo_adapter_config() -> DefaultRepositoryAdapterConfig:
+    adapter_config = DefaultRepositoryAdapterConfig.get_default_config()
+    # Sessions and jobs analyzing the same repository share one local mirror
+    adapter_config.mirror_cache_dir = os.path.join(config.CACHE_DIR, "git")
+    return adapter_config
+
+
+@lru_cache(maxsize=None)
+def get_llm_config(workers: int = 1) -> DefaultLLMModelConfig:
+    """Returns the LLM config shared by the jobs of a worker process. Each of
+    the worker processes throttles its own requests, so they get an equal
+    share of the quotas, which then apply to the whole deployment."""
+    llm_config = DefaultLLMModelConfig.get_default_config()
+    if llm_config.requests_per_minute:
+        llm_config.requests_per_minute /= workers
+    if llm_config.tokens_per_minute:
+        llm_config.tokens_per_minute /= workers
+    return llm_config
+
+
+def get_readme_job_key(repo_url: str) -> Tuple[str, Optional[str]]:
+    return repo_url, get_remote_head(repo_url)
+
+
+def generate_readme_job(
+    context: JobContext, repo_url: str, workers: int = 1
+) -> Dict[str, Any]:
+    # Only job workers need LangChain and the OpenAI client
+    from src.llmmodels.defaultllmmodel import DefaultLLMModel
+    from src.repositoryadapters.defaultadapter import DefaultRepositoryAdapter
+
+    base_dir = os.path.join(config.CACHE_DIR, "jobs", context.job_id)
+    metrics = Metrics()
+    previous_metrics = set_metrics(metrics)
+    repo_adapter = None
+    try:
+        repo_adapter = DefaultRepositoryAdapter(
+            repo_url=repo_url, base_dir=base_dir, config=get_repo_adapter_config()
+        )
+        llm_model = DefaultLLMModel(repo_adapter, get_llm_config(workers))
+        readme_text = ""
+        for event in llm_model.stream_readme():
+            context.emit(event)
+            if event.type == "done":
+                readme_text = event.text
+        return {
+            "readme_text": readme_text,
+            # The README is committed on top of the commit it describes
+            "source_commit": repo_adapter.head_commit(),
+            "metrics": metrics.report(),
+        }
+    finally:
+        if repo_adapter is not None:
+            repo_adapter.close()
+        shutil.rmtree(base_dir, ignore_errors=True)
+        set_metrics(previous_metrics)
@@ -1,13 +1,31 @@
-from typing import Any, Dict, List, Optional, Protocol, Tuple
+from concurrent.futures import Future
+from typing import Any, Dict, Iterator, List, Optional, Protocol, Tuple
 
 
 class BaseRepositoryAdapter(Protocol):
     repo_url: str
 
+    def scan(self) -> Any:
+        pass
+
     def repo_list(self) -> List[str]:
         pass
 
-    def repo_files_contents(self) -> Dict[str, str]:
+    def repo_files_contents(self, files: Optional[List[str]] = None) -> Dict[str, str]:
+        pass
+
+    def ingested_files(self, files: Optional[List[str]] = None) -> List[str]:
+        pass
+
+    def iter_files_contents(
+        self, files: Optional[List[str]] = None
+    ) -> Iterator[Tuple[str, str]]:
+        pass
+
+    def head_commit(self) -> str:
+        pass
+
+    def changed_files(self, since_commit: str) -> Tuple[List[str], List[str]]:
         pass
 
     def repo_structure(
@@ -21,5 +39,7 @@ class BaseRepositoryAdapter(Protocol):
     def readme(self) -> Optional[str]:
         pass
 
-    def upload_readme(self, readme_text: str, force: bool = False) -> None:
+    def upload_readme(
+        self, readme_text: str, force: bool = False, parent: Optional[str] = None
+    ) -> Future:
         pass
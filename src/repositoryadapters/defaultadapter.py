@@ -1,41 +1,99 @@
 import os
-from typing import Dict, List, Optional, Tuple
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from itertools import islice
+from typing import Dict, Iterator, List, Optional, Tuple
 
+from git import Repo
+
+from src.configs.repositoryadapters.defaultadapter import (
+    DefaultRepositoryAdapterConfig,
+)
 from src.utils.files import (
-    get_file_contents,
-    get_files_list,
     get_folder_structure_str,
     get_relative_path,
+    load_text_file,
 )
+from src.utils.ingestion import DEFAULT_DENY_PATTERNS, select_files
+from src.utils.metrics import get_metrics, timed
+from src.utils.mirrors import MirrorPool
 from src.utils.repository import (
-    create_local_branch_commit_push,
+    UNPUSHED_REFS_PREFIX,
+    commit_file_to_branch,
     create_random_branch_name,
+    delete_ref,
+    get_changed_files,
+    get_head_commit,
     get_license_type_from_file,
     get_readme_file,
     get_repo,
     get_repo_license_file,
     get_repo_name_from_url,
-    get_repo_non_ignored,
+    push_branch,
 )
+from src.utils.scanner import RepositorySnapshot, scan_repository
 
 from .baseadapter import BaseRepositoryAdapter
 
+# Pushes run in the background so uploads return as soon as the commit exists
+_push_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="readme-push")
+
 
 class DefaultRepositoryAdapter(BaseRepositoryAdapter):
-    def __init__(self, repo_url: str, base_dir: str) -> None:
+    def __init__(
+        self,
+        repo_url: str,
+        base_dir: str,
+        config: Optional[DefaultRepositoryAdapterConfig] = None,
+    ) -> None:
         super().__init__()
+        self.config = config or DefaultRepositoryAdapterConfig.get_default_config()
         self.repo_url = repo_url
         self.base_dir = base_dir
         self.repo_name = get_repo_name_from_url(self.repo_url)
         self.repo_path = os.path.join(base_dir, self.repo_name)
-        self.repo = get_repo(self.repo_url, self.repo_path)
+        self.mirror_pool = self._get_mirror_pool()
+        self.repo = self._get_repo()
+        self._snapshot: Optional[RepositorySnapshot] = None
+        self._preloaded_contents: Dict[str, Optional[str]] = {}
+
+    def _get_mirror_pool(self) -> Optional[MirrorPool]:
+        if not self.config.mirror_cache_dir:
+            return None
+        return MirrorPool(
+            self.config.mirror_cache_dir,
+            max_bytes=self.config.mirror_cache_max_bytes,
+            **self.config.get_clone_options(),
+        )
+
+    @timed("clone")
+    def _get_repo(self) -> Repo:
+        if self.mirror_pool is not None:
+            return self.mirror_pool.add_worktree(self.repo_url, self.repo_path)
+        return get_repo(
+            self.repo_url, self.repo_path, **self.config.get_clone_options()
+        )
+
+    def close(self) -> None:
+        if self.mirror_pool is not None:
+            self.mirror_pool.remove_worktree(self.repo_url, self.repo_path)
 
     def _get_repo_relative_paths(self, repo_list: List[str]) -> List[str]:
         return [get_relative_path(p, self.base_dir) for p in repo_list]
 
+    @timed("scan")
+    def scan(self) -> RepositorySnapshot:
+        self._snapshot = scan_repository(self.repo_path, self.repo)
+        return self._snapshot
+
+    @property
+    def snapshot(self) -> RepositorySnapshot:
+        if self._snapshot is None:
+            return self.scan()
+        return self._snapshot
+
     def repo_list(self, absolute: bool = False) -> List[str]:
-        raw_files_list = get_files_list(self.repo_path, include_hidden=False)
-        raw_files_list[:] = get_repo_non_ignored(self.repo, raw_files_list)
+        raw_files_list = self.snapshot.absolute_paths()
         files_list = (
             raw_files_list
             if absolute
@@ -43,36 +101,145 @@ class DefaultRepositoryAdapter(BaseRepositoryAdapter):
         )
         return files_list
 
-    def repo_files_contents(self) -> Dict[str, str]:
-        files_list = self.repo_list(absolute=True)
-        contents_map = {}
-        for file in files_list:
-            try:
-                contents = get_file_contents(file)
-                contents_map[get_relative_path(file, self.base_dir)] = contents
-            except ValueError:
-                continue
-            except Exception as e:
-                raise RuntimeError(f"Failed to get files contents.\nError:\n{e}")
-        return contents_map
+    def _get_selected_files(self) -> List[str]:
+        snapshot = self.snapshot
+        if snapshot.selected_files is None:
+            exclude_patterns = self.config.exclude_patterns
+            if self.config.use_default_deny_patterns:
+                exclude_patterns = DEFAULT_DENY_PATTERNS + exclude_patterns
+            snapshot.selected_files = select_files(
+                snapshot.files_sizes,
+                max_file_size=self.config.max_file_size,
+                max_total_bytes=self.config.max_total_bytes,
+                max_files=self.config.max_files,
+                include_patterns=self.config.include_patterns,
+                exclude_patterns=exclude_patterns,
+            )
+            skipped = len(snapshot.files_sizes) - len(snapshot.selected_files)
+            if skipped:
+                print(f"Skipping {skipped} files excluded by the ingestion policy")
+        return snapshot.selected_files
+
+    def ingested_files(
+        self, files: Optional[List[str]] = None, absolute: bool = False
+    ) -> List[str]:
+        # Filtering the selection of the whole repository keeps the files
+        # budgets from applying to every subset separately
+        selected_files = self._get_selected_files()
+        if files is not None:
+            requested = {
+                os.path.relpath(os.path.join(self.base_dir, file), self.repo_path)
+                for file in files
+            }
+            selected_files = [file for file in selected_files if file in requested]
 
+        selected_files = [self.snapshot.absolute_path(file) for file in selected_files]
+        return (
+            selected_files
+            if absolute
+            else self._get_repo_relative_paths(selected_files)
+        )
+
+    def _load_file(self, file: str) -> Optional[str]:
+        metrics = get_metrics()
+        try:
+            with metrics.span("load_file", item=file):
+                contents = load_text_file(file)
+        except ValueError:
+            metrics.increment("files_skipped_total")
+            return None
+        except Exception as e:
+            raise RuntimeError(f"Failed to get files contents.\nError:\n{e}")
+        metrics.increment("files_loaded_total")
+        metrics.increment("files_loaded_bytes_total", len(contents))
+        return contents
+
+    def read_ingested_files(self) -> Dict[str, Optional[str]]:
+        """Reads every ingested file, keyed by absolute path, with None for the
+        files that aren't text. Lets another process do the reading for
+        preload_files_contents."""
+        return {
+            file: self._load_file(file) for file in self.ingested_files(absolute=True)
+        }
+
+    def preload_files_contents(self, files_contents: Dict[str, Optional[str]]) -> None:
+        self._preloaded_contents = files_contents
+
+    def _get_file_contents(self, file: str) -> Optional[str]:
+        if file not in self._preloaded_contents:
+            return self._load_file(file)
+        contents = self._preloaded_contents[file]
+        metrics = get_metrics()
+        if contents is None:
+            metrics.increment("files_skipped_total")
+        else:
+            metrics.increment("files_loaded_total")
+            metrics.increment("files_loaded_bytes_total", len(contents))
+        return contents
+
+    def iter_files_contents(
+        self, files: Optional[List[str]] = None
+    ) -> Iterator[Tuple[str, str]]:
+        files_list = iter(self.ingested_files(files, absolute=True))
+        with ThreadPoolExecutor(max_workers=self.config.max_workers) as executor:
+            pending = deque(
+                (file, executor.submit(self._get_file_contents, file))
+                for file in islice(files_list, self.config.max_files_in_flight)
+            )
+            while pending:
+                file, future = pending.popleft()
+                for next_file in islice(files_list, 1):
+                    pending.append(
+                        (
+                            next_file,
+                            executor.submit(self._get_file_contents, next_file),
+                        )
+                    )
+                contents = future.result()
+                if contents is not None:
+                    yield get_relative_path(file, self.base_dir), contents
+
+    def repo_files_contents(self, files: Optional[List[str]] = None) -> Dict[str, str]:
+        return dict(self.iter_files_contents(files))
+
+    def head_commit(self) -> str:
+        return get_head_commit(self.repo)
+
+    def changed_files(self, since_commit: str) -> Tuple[List[str], List[str]]:
+        changed, deleted = get_changed_files(self.repo, since_commit)
+        return (
+            self._get_repo_relative_paths(
+                [os.path.join(self.repo_path, p) for p in changed]
+            ),
+            self._get_repo_relative_paths(
+                [os.path.join(self.repo_path, p) for p in deleted]
+            ),
+        )
+
+    @timed("tree")
     def repo_structure(
         self,
         directories_only: bool = True,
         use_gitignore: bool = True,
         exclude_patterns: Optional[List[str]] = ["__pycache__"],
+        max_depth: Optional[int] = None,
+        max_entries: Optional[int] = None,
     ) -> str:
         file_structure_lines = get_folder_structure_str(
             self.repo_path,
             directories_only=directories_only,
             use_gitignore=use_gitignore,
             exclude_patterns=exclude_patterns,
+            files=self.snapshot.files if use_gitignore else None,
+            max_depth=max_depth,
+            max_entries=max_entries,
         ).split("\n")
         processed_tree_output = (
             self.repo_name + "\n" + "\n".join(file_structure_lines[1:])
         )
         return processed_tree_output
 
+    @timed("license")
     def license(self) -> Tuple[str, str]:
         license_path = get_repo_license_file(self.repo)
         license_type = get_license_type_from_file(license_path)
@@ -84,15 +251,27 @@ class DefaultRepositoryAdapter(BaseRepositoryAdapter):
     def readme(self) -> Optional[str]:
         return get_readme_file(self.repo)
 
-    def upload_readme(self, readme_text: str, force: bool = False) -> None:
+    def upload_readme(
+        self, readme_text: str, force: bool = False, parent: Optional[str] = None
+    ) -> Future:
+        """Commits the README on top of parent, the commit the README was
+        generated from, which defaults to the adapter's head commit."""
         branch_name = create_random_branch_name(prefix="feature/crate-readme")
         print("Uploading README.md file")
-        create_local_branch_commit_push(
+        commit_file_to_branch(
             self.repo,
             branch_name,
             "README.md",
             readme_text,
             "Generate README.md file",
-            force=True,
+            force=force,
+            parent=parent or self.head_commit(),
+            refs_prefix=UNPUSHED_REFS_PREFIX,
         )
-        print("README.md UPLOADED")
+        return _push_executor.submit(self._push_readme_branch, branch_name)
+
+    def _push_readme_branch(self, branch_name: str) -> str:
+        push_branch(self.repo, branch_name, refs_prefix=UNPUSHED_REFS_PREFIX)
+        delete_ref(self.repo, f"{UNPUSHED_REFS_PREFIX}{branch_name}")
+        print(f"README.md UPLOADED to branch {branch_name}")
+        return branch_name
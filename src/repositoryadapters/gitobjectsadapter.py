@@ -0,0 +1,125 @@
+import os
+import threading
+from typing import List, Optional, Tuple
+
+from git import Repo
+
+from src.configs.repositoryadapters.defaultadapter import (
+    DefaultRepositoryAdapterConfig,
+)
+from src.utils.files import load_text_data, render_tree
+from src.utils.metrics import get_metrics, timed
+from src.utils.repository import (
+    get_changed_files,
+    get_head_commit,
+    get_repo,
+    get_tree_files_sizes,
+    read_blob,
+)
+from src.utils.scanner import RepositorySnapshot
+
+from .defaultadapter import DefaultRepositoryAdapter
+
+
+class GitObjectsRepositoryAdapter(DefaultRepositoryAdapter):
+    """Adapter that lists and reads files from the commit at `ref` in the git
+    object database, so it works on bare and partial clones."""
+
+    def __init__(
+        self,
+        repo_url: str,
+        base_dir: str,
+        config: Optional[DefaultRepositoryAdapterConfig] = None,
+        ref: str = "HEAD",
+    ) -> None:
+        self.ref = ref
+        self._local = threading.local()
+        super().__init__(repo_url, base_dir, config)
+        self.commit = get_head_commit(self.repo, self.ref)
+
+    @timed("clone")
+    def _get_repo(self) -> Repo:
+        if self.mirror_pool is not None:
+            return self.mirror_pool.get_mirror(self.repo_url)
+        return get_repo(
+            self.repo_url,
+            self.repo_path,
+            **self.config.get_clone_options(),
+            bare=True,
+        )
+
+    def _get_thread_repo(self) -> Repo:
+        # GitPython object readers are not thread safe, so each loader thread
+        # gets its own
+        if not hasattr(self._local, "repo"):
+            self._local.repo = Repo(self.repo.git_dir)
+        return self._local.repo
+
+    def _get_tree_path(self, file: str) -> str:
+        return os.path.relpath(file, self.repo_path).replace(os.sep, "/")
+
+    @timed("scan")
+    def scan(self) -> RepositorySnapshot:
+        self._snapshot = RepositorySnapshot(
+            self.repo_path, get_tree_files_sizes(self.repo, self.commit)
+        )
+        return self._snapshot
+
+    def _load_file(self, file: str) -> Optional[str]:
+        path = self._get_tree_path(file)
+        metrics = get_metrics()
+        with metrics.span("load_file", item=file):
+            try:
+                data = read_blob(self._get_thread_repo(), path, self.commit)
+            except Exception as e:
+                raise RuntimeError(f"Failed to get files contents.\nError:\n{e}")
+            contents = load_text_data(path, data)
+        if contents is None:
+            metrics.increment("files_skipped_total")
+            return None
+        metrics.increment("files_loaded_total")
+        metrics.increment("files_loaded_bytes_total", len(contents))
+        return contents
+
+    def head_commit(self) -> str:
+        return self.commit
+
+    def changed_files(self, since_commit: str) -> Tuple[List[str], List[str]]:
+        changed, deleted = get_changed_files(self.repo, since_commit, self.commit)
+        return (
+            [f"{self.repo_name}/{path}" for path in changed],
+            [f"{self.repo_name}/{path}" for path in deleted],
+        )
+
+    @timed("tree")
+    def repo_structure(
+        self,
+        directories_only: bool = True,
+        use_gitignore: bool = True,
+        exclude_patterns: Optional[List[str]] = ["__pycache__"],
+        max_depth: Optional[int] = None,
+        max_entries: Optional[int] = None,
+    ) -> str:
+        return render_tree(
+            self.repo_name,
+            self.snapshot.files,
+            directories_only=directories_only,
+            exclude_patterns=exclude_patterns,
+            max_depth=max_depth,
+            max_entries=max_entries,
+        )
+
+    @timed("license")
+    def license(self) -> Tuple[str, str]:
+        if "LICENSE" not in self.snapshot.files_sizes:
+            raise ValueError(f"No LICENSE file in {self.repo_url}")
+        license_text = read_blob(self.repo, "LICENSE", self.commit).decode(
+            "utf-8", errors="replace"
+        )
+        license_type = license_text.split("\n", 1)[0].strip()
+        return license_type, f"{self.repo_url}/blob/main/LICENSE"
+
+    def readme(self) -> Optional[str]:
+        if "README.md" in self.snapshot.files_sizes:
+            return self.snapshot.absolute_path("README.md")
+        return None
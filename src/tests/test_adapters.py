@@ -1,7 +1,17 @@
+import json
+import os
+import tempfile
 import unittest
 from unittest.mock import patch
 
+from src.configs.repositoryadapters.defaultadapter import (
+    DefaultRepositoryAdapterConfig,
+)
 from src.repositoryadapters.defaultadapter import DefaultRepositoryAdapter
+from src.repositoryadapters.gitobjectsadapter import GitObjectsRepositoryAdapter
+from src.tests.utils import create_git_repo, write_files
+from src.utils.ingestion import select_files
+from src.utils.scanner import RepositorySnapshot
 
 
 class TestDefaultAdapter(unittest.TestCase):
@@ -14,6 +24,11 @@ class TestDefaultAdapter(unittest.TestCase):
         )
         self.assertEquals(adapter.repo_name, "TestRepo")
 
+    def test_default_clone_options(self):
+        clone_options = DefaultRepositoryAdapterConfig().get_clone_options()
+        self.assertIsNone(clone_options["filter_spec"])
+        self.assertFalse(clone_options["update"])
+
     def test_error_cloning(self):
         with self.assertRaises(RuntimeError):
             DefaultRepositoryAdapter(
@@ -30,9 +45,8 @@ class TestDefaultAdapter(unittest.TestCase):
             )
 
     @patch("src.repositoryadapters.defaultadapter.get_repo")
-    @patch("src.repositoryadapters.defaultadapter.get_files_list")
-    @patch("src.utils.repository.get_repo_ignored")
-    def test_repo_list(self, mock_get_repo_ignored, mock_get_files_list, mock_get_repo):
+    @patch("src.repositoryadapters.defaultadapter.scan_repository")
+    def test_repo_list(self, mock_scan_repository, mock_get_repo):
         expected_result1 = [
             "/home/workspace/TestRepo/file1.py",
             "/home/workspace/TestRepo/file2.py",
@@ -43,8 +57,9 @@ class TestDefaultAdapter(unittest.TestCase):
         ]
 
         mock_get_repo.return_value = "mocked repo"
-        mock_get_files_list.return_value = expected_result1
-        mock_get_repo_ignored.return_value = []
+        mock_scan_repository.return_value = RepositorySnapshot(
+            "/home/workspace/TestRepo", {"file2.py": 20, "file1.py": 10}
+        )
 
         adapter = DefaultRepositoryAdapter(
             "https://git-provider/owner/TestRepo", "/home/workspace"
@@ -54,14 +69,12 @@ class TestDefaultAdapter(unittest.TestCase):
         self.assertListEqual(adapter.repo_list(absolute=False), expected_result2)
 
     @patch("src.repositoryadapters.defaultadapter.get_repo")
-    @patch("src.repositoryadapters.defaultadapter.get_files_list")
-    @patch("src.repositoryadapters.defaultadapter.get_file_contents")
-    @patch("src.utils.repository.get_repo_ignored")
+    @patch("src.repositoryadapters.defaultadapter.scan_repository")
+    @patch("src.repositoryadapters.defaultadapter.load_text_file")
     def test_repo_files_contents(
         self,
-        mock_get_repo_ignored,
-        mock_get_file_contents,
-        mock_get_files_list,
+        mock_load_text_file,
+        mock_scan_repository,
         mock_get_repo,
     ):
         files_contents = {
@@ -72,16 +85,14 @@ class TestDefaultAdapter(unittest.TestCase):
             k.replace("/home/workspace/", ""): v for k, v in files_contents.items()
         }
 
-        def get_file_contents_side_effect(file):
+        def load_text_file_side_effect(file):
             return files_contents[file]
 
         mock_get_repo.return_value = "mocked repo"
-        mock_get_files_list.return_value = [
-            "/home/workspace/TestRepo/file1.py",
-            "/home/workspace/TestRepo/file2.py",
-        ]
-        mock_get_file_contents.side_effect = get_file_contents_side_effect
-        mock_get_repo_ignored.return_value = []
+        mock_scan_repository.return_value = RepositorySnapshot(
+            "/home/workspace/TestRepo", {"file1.py": 10, "file2.py": 20}
+        )
+        mock_load_text_file.side_effect = load_text_file_side_effect
 
         adapter = DefaultRepositoryAdapter(
             "https://git-provider/owner/TestRepo", "/home/workspace"
@@ -123,6 +134,302 @@ class TestDefaultAdapter(unittest.TestCase):
 
         self.assertEqual(adapter.repo_url, "https://git-provider/owner/TestRepo")
 
+    def test_changed_files(self):
+        with tempfile.TemporaryDirectory() as base_dir:
+            repo_path = os.path.join(base_dir, "TestRepo")
+            repo = create_git_repo(
+                repo_path,
+                {
+                    file: f"# {file}\n"
+                    for file in ("kept.py", "modified.py", "deleted.py")
+                },
+            )
+            first_commit = repo.head.commit.hexsha
+
+            with open(os.path.join(repo_path, "modified.py"), "a") as f:
+                f.write("print('modified')\n")
+            with open(os.path.join(repo_path, "added.py"), "w") as f:
+                f.write("# added.py\n")
+            repo.index.add(["modified.py", "added.py"])
+            repo.index.remove(["deleted.py"], working_tree=True)
+            second_commit = repo.index.commit("Second commit").hexsha
+
+            adapter = DefaultRepositoryAdapter(
+                "https://git-provider/owner/TestRepo", base_dir
+            )
+            changed, deleted = adapter.changed_files(first_commit)
+
+            self.assertEqual(adapter.head_commit(), second_commit)
+            self.assertCountEqual(
+                changed, ["TestRepo/modified.py", "TestRepo/added.py"]
+            )
+            self.assertListEqual(deleted, ["TestRepo/deleted.py"])
+            with self.assertRaises(ValueError):
+                adapter.changed_files("0" * 40)
+
+    def test_mirror_worktree(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            origin_path = os.path.join(tmp_dir, "origin", "TestRepo")
+            create_git_repo(origin_path, {"main.py": "print('hello')\n"})
+            config = DefaultRepositoryAdapterConfig()
+            config.mirror_cache_dir = os.path.join(tmp_dir, "cache")
+            base_dir = os.path.join(tmp_dir, "session")
+
+            adapter = DefaultRepositoryAdapter(origin_path, base_dir, config)
+            self.assertListEqual(adapter.repo_list(), ["TestRepo/main.py"])
+            self.assertEqual(len(adapter.mirror_pool.mirrors()), 1)
+
+            adapter.close()
+            self.assertFalse(os.path.exists(adapter.repo_path))
+
+    def test_repo_files_contents_skips_non_text_files(self):
+        with tempfile.TemporaryDirectory() as base_dir:
+            create_git_repo(
+                os.path.join(base_dir, "TestRepo"),
+                {
+                    "main.py": "print('main')\n",
+                    "empty.py": "",
+                    "logo.png": "not really an image",
+                    "docs/notes.txt": "Some notes\n",
+                },
+            )
+            config = DefaultRepositoryAdapterConfig()
+            config.max_workers = 2
+            adapter = DefaultRepositoryAdapter(
+                "https://git-provider/owner/TestRepo", base_dir, config
+            )
+
+            self.assertDictEqual(
+                adapter.repo_files_contents(),
+                {
+                    "TestRepo/docs/notes.txt": "Some notes\n",
+                    "TestRepo/main.py": "print('main')\n",
+                },
+            )
+
+    @patch("src.repositoryadapters.defaultadapter.get_repo")
+    @patch("src.repositoryadapters.defaultadapter.scan_repository")
+    @patch("src.repositoryadapters.defaultadapter.load_text_file")
+    def test_iter_files_contents_is_lazy(
+        self, mock_load_text_file, mock_scan_repository, mock_get_repo
+    ):
+        mock_get_repo.return_value = "mocked repo"
+        mock_scan_repository.return_value = RepositorySnapshot(
+            "/home/workspace/TestRepo", {f"file{i}.py": 10 for i in range(10)}
+        )
+        mock_load_text_file.side_effect = lambda file: f"Contents of {file}"
+        config = DefaultRepositoryAdapterConfig()
+        config.max_files_in_flight = 2
+
+        adapter = DefaultRepositoryAdapter(
+            "https://git-provider/owner/TestRepo", "/home/workspace", config
+        )
+        files_contents = adapter.iter_files_contents()
+
+        self.assertEqual(
+            next(files_contents),
+            ("TestRepo/file0.py", "Contents of /home/workspace/TestRepo/file0.py"),
+        )
+        self.assertLessEqual(mock_load_text_file.call_count, 3)
+        self.assertEqual(len(list(files_contents)), 9)
+
+    @patch("src.repositoryadapters.defaultadapter.get_repo")
+    @patch("src.repositoryadapters.defaultadapter.scan_repository")
+    def test_ingested_files(self, mock_scan_repository, mock_get_repo):
+        mock_get_repo.return_value = "mocked repo"
+        mock_scan_repository.side_effect = lambda *args: RepositorySnapshot(
+            "/home/workspace/TestRepo",
+            {
+                "setup.py": 10,
+                "src/module.py": 10,
+                "src/big_data.py": 10_000,
+                "yarn.lock": 10,
+            },
+        )
+        config = DefaultRepositoryAdapterConfig()
+        config.max_file_size = 1_000
+
+        adapter = DefaultRepositoryAdapter(
+            "https://git-provider/owner/TestRepo", "/home/workspace", config
+        )
+
+        with patch(
+            "src.repositoryadapters.defaultadapter.select_files", wraps=select_files
+        ) as mock_select_files:
+            self.assertListEqual(
+                adapter.ingested_files(),
+                ["TestRepo/setup.py", "TestRepo/src/module.py"],
+            )
+            self.assertListEqual(
+                adapter.ingested_files(
+                    ["TestRepo/src/module.py", "TestRepo/yarn.lock"]
+                ),
+                ["TestRepo/src/module.py"],
+            )
+            # The selection is computed once per scan
+            mock_select_files.assert_called_once()
+            adapter.scan()
+            adapter.ingested_files()
+            self.assertEqual(mock_select_files.call_count, 2)
+
+    @patch("src.repositoryadapters.defaultadapter.get_repo")
+    @patch("src.repositoryadapters.defaultadapter.scan_repository")
+    @patch("src.repositoryadapters.defaultadapter.load_text_file")
+    def test_preloaded_files_contents(
+        self, mock_load_text_file, mock_scan_repository, mock_get_repo
+    ):
+        mock_get_repo.return_value = "mocked repo"
+        mock_scan_repository.return_value = RepositorySnapshot(
+            "/home/workspace/TestRepo", {"main.py": 10, "logo.py": 10}
+        )
+        mock_load_text_file.side_effect = lambda file: f"Contents of {file}"
+        adapter = DefaultRepositoryAdapter(
+            "https://git-provider/owner/TestRepo", "/home/workspace"
+        )
+        files_contents = adapter.read_ingested_files()
+        self.assertEqual(mock_load_text_file.call_count, 2)
+
+        files_contents["/home/workspace/TestRepo/logo.py"] = None
+        adapter.preload_files_contents(files_contents)
+        self.assertDictEqual(
+            adapter.repo_files_contents(),
+            {"TestRepo/main.py": "Contents of /home/workspace/TestRepo/main.py"},
+        )
+        self.assertEqual(mock_load_text_file.call_count, 2)
+
+
+class TestGitObjectsAdapter(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.origin_path = os.path.join(self.tmp_dir.name, "origin", "TestRepo")
+        self.origin = create_git_repo(
+            self.origin_path,
+            {
+                "LICENSE": "MIT License\n\nCopyright\n",
+                "main.py": "print('hello')\n",
+                "notebook.ipynb": json.dumps(
+                    {
+                        "cells": [
+                            {
+                                "cell_type": "code",
+                                "source": ["import os\n", "os.getcwd()"],
+                            }
+                        ]
+                    }
+                ),
+                "src/utils.py": "VALUE = 1\n",
+            },
+        )
+        with open(os.path.join(self.origin_path, "image.png"), "wb") as f:
+            f.write(b"\x89PNG\r\n\x1a\n\0\0")
+        self.origin.index.add(["image.png"])
+        self.first_commit = self.origin.index.commit("Add image").hexsha
+        self.base_dir = os.path.join(self.tmp_dir.name, "clones")
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_reads_from_object_database(self):
+        adapter = GitObjectsRepositoryAdapter(self.origin_path, self.base_dir)
+
+        self.assertTrue(adapter.repo.bare)
+        self.assertFalse(os.path.exists(os.path.join(adapter.repo_path, "main.py")))
+        self.assertListEqual(
+            adapter.repo_list(),
+            [
+                "TestRepo/LICENSE",
+                "TestRepo/image.png",
+                "TestRepo/main.py",
+                "TestRepo/notebook.ipynb",
+                "TestRepo/src/utils.py",
+            ],
+        )
+        self.assertDictEqual(
+            adapter.repo_files_contents(),
+            {
+                "TestRepo/LICENSE": "MIT License\n\nCopyright\n",
+                "TestRepo/main.py": "print('hello')\n",
+                "TestRepo/notebook.ipynb": "'code' cell: 'import os\nos.getcwd()'\n\n",
+                "TestRepo/src/utils.py": "VALUE = 1\n",
+            },
+        )
+        self.assertEqual(adapter.license()[0], "MIT License")
+        self.assertIsNone(adapter.readme())
+        self.assertIn("└── utils.py", adapter.repo_structure(directories_only=False))
+
+    def test_changed_files_at_ref(self):
+        write_files(self.origin_path, {"main.py": "print('bye')\n"})
+        self.origin.index.add(["main.py"])
+        self.origin.index.remove(["src/utils.py"], working_tree=True)
+        second_commit = self.origin.index.commit("Update").hexsha
+
+        adapter = GitObjectsRepositoryAdapter(self.origin_path, self.base_dir)
+        self.assertEqual(adapter.head_commit(), second_commit)
+        self.assertTupleEqual(
+            adapter.changed_files(self.first_commit),
+            (["TestRepo/main.py"], ["TestRepo/src/utils.py"]),
+        )
+
+        pinned = GitObjectsRepositoryAdapter(
+            self.origin_path, self.base_dir, ref=self.first_commit
+        )
+        self.assertEqual(pinned.head_commit(), self.first_commit)
+        self.assertEqual(
+            pinned.repo_files_contents(["TestRepo/main.py"]),
+            {"TestRepo/main.py": "print('hello')\n"},
+        )
+
+    def test_upload_readme_from_bare_clone(self):
+        adapter = GitObjectsRepositoryAdapter(self.origin_path, self.base_dir)
+        with adapter.repo.config_writer() as writer:
+            writer.set_value("user", "name", "Test")
+            writer.set_value("user", "email", "test@example.com")
+
+        branch = adapter.upload_readme("# TestRepo\n", force=True).result(timeout=30)
+
+        readme = self.origin.commit(branch).tree / "README.md"
+        self.assertEqual(readme.data_stream.read(), b"# TestRepo\n")
+        self.assertEqual(
+            self.origin.commit(branch).parents[0].hexsha, self.first_commit
+        )
+
+    def test_upload_readme_from_mirror_without_worktree(self):
+        config = DefaultRepositoryAdapterConfig()
+        config.mirror_cache_dir = os.path.join(self.tmp_dir.name, "cache")
+        adapter = GitObjectsRepositoryAdapter(self.origin_path, self.base_dir, config)
+
+        self.assertIsNone(adapter.readme())
+        branch = adapter.upload_readme("# TestRepo\n", force=True).result(timeout=30)
+        readme = self.origin.commit(branch).tree / "README.md"
+        self.assertEqual(readme.data_stream.read(), b"# TestRepo\n")
+
+        # Without a worktree the mirror stays evictable
+        adapter.mirror_pool.max_bytes = 0
+        self.assertListEqual(
+            adapter.mirror_pool.evict(),
+            [adapter.mirror_pool.mirror_path(self.origin_path)],
+        )
+
+    def test_upload_readme_on_generated_commit(self):
+        config = DefaultRepositoryAdapterConfig()
+        config.mirror_cache_dir = os.path.join(self.tmp_dir.name, "cache")
+        session_adapter = GitObjectsRepositoryAdapter(
+            self.origin_path, self.base_dir, config
+        )
+        write_files(self.origin_path, {"main.py": "print('bye')\n"})
+        self.origin.index.add(["main.py"])
+        second_commit = self.origin.index.commit("Update main").hexsha
+        # The README job fetches the new commit into the shared mirror
+        job_adapter = GitObjectsRepositoryAdapter(
+            self.origin_path, os.path.join(self.tmp_dir.name, "job"), config
+        )
+        self.assertEqual(job_adapter.head_commit(), second_commit)
+
+        branch = session_adapter.upload_readme(
+            "# TestRepo\n", force=True, parent=job_adapter.head_commit()
+        ).result(timeout=30)
+        self.assertEqual(self.origin.commit(branch).parents[0].hexsha, second_commit)
+
 
 if __name__ == "__main__":
     unittest.main()
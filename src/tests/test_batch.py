@@ -0,0 +1,121 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import batch
+from src.tests.utils import create_git_repo
+from src.utils.batch import BatchJournal, clone_repository, read_manifest
+
+
+class TestBatchUtils(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_read_manifest(self):
+        manifest_path = os.path.join(self.tmp_dir.name, "repos.txt")
+        with open(manifest_path, "w") as f:
+            f.write(
+                "# Repositories\n"
+                "https://github.com/user/first\n"
+                "\n"
+                "https://github.com/user/second  # trailing comment\n"
+                "https://github.com/user/first\n"
+            )
+        self.assertListEqual(
+            read_manifest(manifest_path),
+            ["https://github.com/user/first", "https://github.com/user/second"],
+        )
+
+    def test_journal_completed(self):
+        journal = BatchJournal(os.path.join(self.tmp_dir.name, "journal.jsonl"))
+        journal.record("first", "failed", error="boom")
+        journal.record("second", "done", readme_path="second/README.md")
+        journal.record("first", "done", readme_path="first/README.md")
+        journal.record("third", "failed", error="boom")
+        with open(journal.journal_path, "a") as f:
+            f.write('{"repo_url": "fourth", "sta')
+
+        self.assertSetEqual(journal.completed(), {"first", "second"})
+        self.assertEqual(len(journal.entries()), 4)
+
+    def test_clone_repository(self):
+        origin_path = os.path.join(self.tmp_dir.name, "origin", "project")
+        create_git_repo(origin_path, {"main.py": "print('hello')\n"})
+
+        repo_path = clone_repository(origin_path, os.path.join(self.tmp_dir.name, "x"))
+        self.assertTrue(os.path.isfile(os.path.join(repo_path, "main.py")))
+
+
+class TestRunBatch(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.repo_urls = []
+        for name in ("first", "second", "third"):
+            repo_path = os.path.join(self.tmp_dir.name, "origin", name)
+            create_git_repo(repo_path, {"main.py": f"print('{name}')\n"})
+            self.repo_urls.append(repo_path)
+        self.clones_dir = os.path.join(self.tmp_dir.name, "clones")
+        self.journal = BatchJournal(os.path.join(self.tmp_dir.name, "journal.jsonl"))
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    @patch("batch.generate_repository_readme")
+    def test_resume_skips_finished_repositories(self, generate_mock):
+        def generate(repo_url, repo_dir, *args, files_contents=None):
+            # The worker processes read the files ahead of the generation
+            self.assertDictEqual(
+                files_contents,
+                {
+                    os.path.join(repo_dir, os.path.basename(repo_url), "main.py"): (
+                        f"print('{os.path.basename(repo_url)}')\n"
+                    )
+                },
+            )
+            if repo_url.endswith("second"):
+                raise RuntimeError("LLM unavailable")
+            return f"{repo_url}/README.md"
+
+        generate_mock.side_effect = generate
+        self.journal.record(self.repo_urls[0], "done")
+
+        batch.run_batch(self.repo_urls, self.clones_dir, self.journal, clone_workers=2)
+
+        generated = [call.args[0] for call in generate_mock.call_args_list]
+        self.assertCountEqual(generated, self.repo_urls[1:])
+        self.assertSetEqual(
+            self.journal.completed(), {self.repo_urls[0], self.repo_urls[2]}
+        )
+
+        generate_mock.reset_mock()
+        generate_mock.side_effect = None
+        generate_mock.return_value = None
+        batch.run_batch(self.repo_urls, self.clones_dir, self.journal)
+        generate_mock.assert_called_once()
+        self.assertEqual(generate_mock.call_args.args[0], self.repo_urls[1])
+        self.assertSetEqual(self.journal.completed(), set(self.repo_urls))
+
+    @patch("batch.generate_repository_readme")
+    def test_failed_clone_is_recorded(self, generate_mock):
+        generate_mock.return_value = None
+        missing_url = os.path.join(self.tmp_dir.name, "origin", "missing")
+
+        batch.run_batch(
+            [missing_url, self.repo_urls[0]],
+            self.clones_dir,
+            self.journal,
+            clone_workers=1,
+            repo_workers=1,
+        )
+
+        generate_mock.assert_called_once()
+        statuses = {
+            entry["repo_url"]: entry["status"] for entry in self.journal.entries()
+        }
+        self.assertDictEqual(
+            statuses, {missing_url: "failed", self.repo_urls[0]: "done"}
+        )
@@ -0,0 +1,73 @@
+import os
+import tempfile
+import unittest
+
+from git import Repo
+
+from src.benchmarks.fakes import FakeChatModel
+from src.benchmarks.runner import compare_with_baseline
+from src.benchmarks.synthetic import SyntheticRepoSpec, create_synthetic_repo
+
+
+class TestSyntheticRepo(unittest.TestCase):
+    def test_create_synthetic_repo(self):
+        spec = SyntheticRepoSpec(100, binary_ratio=0.2, gitignore_every=1)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            repo_path = os.path.join(tmp_dir, "repo")
+            files = create_synthetic_repo(repo_path, spec)
+            tracked = Repo(repo_path).git.ls_files().split("\n")
+            self.assertEqual(files, create_synthetic_repo(tmp_dir + "/copy", spec))
+
+        self.assertEqual(len(files), 100)
+        self.assertTrue(set(files) < set(tracked))
+        self.assertIn("LICENSE", tracked)
+        self.assertFalse(any(file.endswith("debug.log") for file in tracked))
+        self.assertTrue(any("/" in file for file in files))
+        self.assertTrue(any(file.endswith((".png", ".bin", ".so")) for file in files))
+
+
+class TestFakeChatModel(unittest.TestCase):
+    def test_batched_summaries(self):
+        llm = FakeChatModel(echo=False)
+        output = llm.invoke("### File: a.py\nx = 1\n### File: b.py\ny = 2").content
+        self.assertIn("### File: a.py\n", output)
+        self.assertIn("### File: b.py\n", output)
+        self.assertEqual(llm.calls["total"], 1)
+
+        output = llm.invoke("x = 1").content
+        self.assertEqual(output, "Synthetic summary of a 5 characters prompt.")
+
+
+class TestBaseline(unittest.TestCase):
+    def setUp(self):
+        self.baseline = {
+            "1k": {
+                "llm_latency": 0.0,
+                "wall_seconds": 10.0,
+                "peak_rss_mb": 100.0,
+                "llm_calls": 50,
+            }
+        }
+
+    def get_result(self, **kwargs):
+        result = {"scenario": "1k", **self.baseline["1k"]}
+        result.update(kwargs)
+        return result
+
+    def test_within_tolerance(self):
+        results = [self.get_result(wall_seconds=12.0, peak_rss_mb=110.0)]
+        self.assertListEqual(compare_with_baseline(results, self.baseline, 0.25), [])
+
+    def test_regressions(self):
+        results = [self.get_result(wall_seconds=13.0, llm_calls=51)]
+        regressions = compare_with_baseline(results, self.baseline, 0.25)
+        self.assertEqual(len(regressions), 2)
+        self.assertTrue(regressions[0].startswith("1k: wall_seconds"))
+
+    def test_other_latency_is_not_compared(self):
+        results = [self.get_result(wall_seconds=100.0, llm_latency=0.1)]
+        self.assertListEqual(compare_with_baseline(results, self.baseline), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,71 @@
+import os
+import tempfile
+import time
+import unittest
+
+from src.utils.cache import SummaryCache, get_blob_sha
+
+
+class TestSummaryCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.cache_path = os.path.join(self.tmp_dir.name, "summaries.sqlite3")
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_blob_sha(self):
+        # Same value as `echo -n "hello" | git hash-object --stdin`
+        self.assertEqual(
+            get_blob_sha("hello"), "b6fc4c620b67d95f953a5c1c1230aaab5db5a1b0"
+        )
+
+    def test_key_depends_on_contents_template_and_model(self):
+        key = SummaryCache.make_key("contents", "template", "model")
+        self.assertEqual(key, SummaryCache.make_key("contents", "template", "model"))
+        self.assertNotEqual(key, SummaryCache.make_key("other", "template", "model"))
+        self.assertNotEqual(key, SummaryCache.make_key("contents", "other", "model"))
+        self.assertNotEqual(key, SummaryCache.make_key("contents", "template", "other"))
+
+    def test_hits_and_misses(self):
+        cache = SummaryCache(self.cache_path)
+        self.assertIsNone(cache.get("key"))
+        cache.set("key", "summary")
+        self.assertEqual(cache.get("key"), "summary")
+        self.assertDictEqual(cache.stats(), {"hits": 1, "misses": 1, "entries": 1})
+        cache.close()
+
+    def test_persistence(self):
+        cache = SummaryCache(self.cache_path)
+        cache.set("key", "summary")
+        cache.close()
+
+        cache = SummaryCache(self.cache_path)
+        self.assertEqual(cache.get("key"), "summary")
+        cache.close()
+
+    def test_evict_by_entries(self):
+        cache = SummaryCache(self.cache_path, max_entries=2)
+        for key in ("first", "second", "third"):
+            cache.set(key, "summary")
+            time.sleep(0.01)
+        cache.get("first")
+
+        self.assertEqual(cache.evict(), 1)
+        self.assertIsNone(cache.get("second"))
+        self.assertEqual(cache.get("first"), "summary")
+        cache.close()
+
+    def test_evict_by_age(self):
+        cache = SummaryCache(self.cache_path, max_age=0.01)
+        cache.set("key", "summary")
+        time.sleep(0.02)
+
+        self.assertIsNone(cache.get("key"))
+        self.assertEqual(cache.evict(), 1)
+        self.assertEqual(len(cache), 0)
+        cache.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
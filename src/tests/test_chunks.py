@@ -0,0 +1,48 @@
+import unittest
+
+from src.utils.chunks import group_texts, iter_batches, iter_file_chunks
+
+
+class TestChunks(unittest.TestCase):
+    def test_python_chunks_on_definitions(self):
+        contents = "\n".join(f"def function_{i}():\n    return {i}\n" for i in range(4))
+        chunks = list(iter_file_chunks("module.py", contents, 40, 0))
+        self.assertEqual(len(chunks), 4)
+        for i, chunk in enumerate(chunks):
+            self.assertTrue(chunk.startswith(f"def function_{i}():"))
+
+    def test_notebook_chunks_on_cells(self):
+        contents = (
+            "'markdown' cell: '['# Title']'\n\n"
+            "'code' cell: '['import os']'\n\n"
+            "'code' cell: '['print(os.getcwd())']'\n\n"
+        )
+        chunks = list(iter_file_chunks("notebook.ipynb", contents, 40, 0))
+        self.assertListEqual(
+            chunks,
+            [
+                "'markdown' cell: '['# Title']'",
+                "'code' cell: '['import os']'",
+                "'code' cell: '['print(os.getcwd())']'",
+            ],
+        )
+
+    def test_max_chunks(self):
+        contents = "\n".join(f"line {i}" for i in range(100))
+        chunks = list(iter_file_chunks("file.txt", contents, 10, 0, max_chunks=5))
+        self.assertEqual(len(chunks), 5)
+
+    def test_group_texts(self):
+        self.assertListEqual(
+            group_texts(["aaa", "bb", "cccc", "d"], token_budget=5),
+            [["aaa", "bb"], ["cccc", "d"]],
+        )
+
+    def test_iter_batches(self):
+        self.assertListEqual(
+            list(iter_batches(iter(range(5)), 2)), [[0, 1], [2, 3], [4]]
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,110 @@
+import unittest
+from unittest.mock import patch
+
+from src.utils import extraction
+from src.utils.extraction import (
+    get_static_summary,
+    get_summary_information,
+    register_static_extractor,
+)
+
+PYTHON_MODULE = '''"""Helpers to load the project settings.
+
+Settings are read from the environment.
+"""
+import os
+from typing import Dict
+
+from .defaults import DEFAULTS
+
+
+class Settings:
+    """Holds the project settings. Immutable."""
+
+
+def load_settings() -> Dict[str, str]:
+    """Reads the settings from the environment."""
+    return dict(os.environ)
+
+
+def _helper():
+    pass
+
+
+if __name__ == "__main__":
+    print(load_settings())
+'''
+
+
+class TestStaticExtraction(unittest.TestCase):
+    def test_python_summary(self):
+        self.assertEqual(
+            get_static_summary("pkg/settings.py", PYTHON_MODULE),
+            "Python module. Helpers to load the project settings. "
+            "Classes: Settings (Holds the project settings). "
+            "Functions: load_settings (Reads the settings from the environment). "
+            "Imports: os, typing. Runs as a script.",
+        )
+
+    def test_python_summary_undocumented(self):
+        self.assertIsNone(get_static_summary("main.py", "def main():\n    pass\n"))
+        self.assertIsNone(get_static_summary("broken.py", "def main(:\n"))
+
+    def test_requirements_summary(self):
+        contents = "-r base.txt\n# Web\nflask==3.0.0  # server\nrequests[socks]>=2\n"
+        self.assertEqual(
+            get_static_summary("requirements-dev.txt", contents),
+            "Requirements file listing the Python dependencies of the project: "
+            "flask, requests.",
+        )
+        self.assertIsNone(get_static_summary("requirements.txt", "# Empty\n"))
+
+    def test_pyproject_summary(self):
+        contents = (
+            '[project]\nname = "tool"\ndescription = "Formats code"\n'
+            'requires-python = ">=3.8"\ndependencies = ["click>=8", "rich"]\n'
+            '[project.scripts]\ntool = "tool.cli:main"\n'
+            '[build-system]\nbuild-backend = "hatchling.build"\n'
+        )
+        self.assertEqual(
+            get_static_summary("pyproject.toml", contents),
+            "Python project configuration (pyproject.toml). Python project tool: "
+            "Formats code. Requires Python >=3.8. Dependencies: click, rich. "
+            "Command line scripts: tool. Built with hatchling.build.",
+        )
+        self.assertIsNone(get_static_summary("pyproject.toml", "[project"))
+
+    def test_package_json_summary(self):
+        contents = (
+            '{"name": "web", "main": "index.js", "dependencies": {"react": "^18"},'
+            ' "scripts": {"build": "vite build", "test": "vitest"}}'
+        )
+        self.assertEqual(
+            get_static_summary("frontend/package.json", contents),
+            "Node.js package manifest (package.json). Node.js package web. "
+            "Entry point: index.js. Dependencies: react. npm scripts: build, test.",
+        )
+
+    def test_license_summary(self):
+        summary = get_static_summary("LICENSE", "\nApache License\nVersion 2.0\n")
+        self.assertEqual(
+            summary,
+            "License file of the project, which is distributed under the "
+            "Apache License.",
+        )
+        self.assertEqual(get_summary_information(summary), 12)
+
+    @patch.object(extraction, "_static_extractors", list(extraction._static_extractors))
+    def test_register_static_extractor(self):
+        self.assertIsNone(get_static_summary("Dockerfile", "FROM python:3.11"))
+        register_static_extractor(
+            "Dockerfile", lambda file, contents: f"Docker image {contents}"
+        )
+        self.assertEqual(
+            get_static_summary("docker/Dockerfile", "FROM python:3.11"),
+            "Docker image FROM python:3.11",
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
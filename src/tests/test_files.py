@@ -0,0 +1,178 @@
+import json
+import os
+import tempfile
+import threading
+import unittest
+from unittest.mock import patch
+
+from src.tests.utils import (
+    create_git_repo,
+    get_resource_path,
+    get_text_resource,
+    write_files,
+)
+from src.utils.chunks import iter_file_chunks
+from src.utils.files import (
+    _get_mime_detector,
+    get_folder_structure_str,
+    is_text_file,
+    load_text_data,
+    load_text_file,
+    render_tree,
+)
+
+
+class TestRenderTree(unittest.TestCase):
+    def setUp(self):
+        self.files = [
+            "app.py",
+            "LICENSE",
+            "README.md",
+            "resources/prompts/file_summary.txt",
+            "src/__pycache__/config.cpython-311.pyc",
+            "src/config.py",
+            "src/utils/files.py",
+            "src/utils/prompt.py",
+        ]
+
+    def test_full_tree(self):
+        expected_tree = get_text_resource(get_resource_path("expected_tree.txt"))
+        tree = render_tree("TestRepo", self.files, exclude_patterns=["__pycache__"])
+        self.assertEqual(tree, expected_tree)
+
+    def test_directories_only(self):
+        expected_tree = get_text_resource(get_resource_path("expected_tree.txt"))
+        tree = render_tree("TestRepo", self.files, directories_only=True)
+        self.assertEqual(tree, expected_tree)
+
+    def test_limits(self):
+        expected_tree = get_text_resource(get_resource_path("expected_tree.txt"))
+        tree = render_tree(
+            "TestRepo",
+            self.files,
+            exclude_patterns=["*.pyc|LICENSE"],
+            max_depth=2,
+            max_entries=6,
+        )
+        self.assertEqual(tree, expected_tree)
+
+    def test_folder_structure_gitignore(self):
+        with tempfile.TemporaryDirectory() as repo_path:
+            create_git_repo(repo_path, {".gitignore": "*.log\n", "main.py": ""})
+            write_files(repo_path, {"debug.log": "", "docs/index.md": ""})
+
+            tree = get_folder_structure_str(repo_path, use_gitignore=True)
+            self.assertEqual(
+                tree.split("\n")[1:],
+                [
+                    "├── docs",
+                    "│   └── index.md",
+                    "└── main.py",
+                    "",
+                    "1 directory, 2 files",
+                ],
+            )
+
+            tree = get_folder_structure_str(repo_path, use_gitignore=False)
+            self.assertIn("debug.log", tree)
+
+    def test_folder_structure_invalid_path(self):
+        with self.assertRaises(ValueError):
+            get_folder_structure_str(os.path.join("missing", "folder"))
+
+
+class TestIsTextFile(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def _write(self, name: str, contents: bytes) -> str:
+        file_path = os.path.join(self.tmp_dir.name, name)
+        with open(file_path, "wb") as f:
+            f.write(contents)
+        return file_path
+
+    @patch("src.utils.files._get_mime_detector")
+    def test_prefilter(self, mock_get_mime_detector):
+        self.assertTrue(is_text_file(self._write("module.py", b"print('hi')\n")))
+        self.assertFalse(is_text_file(self._write("image.png", b"not an image")))
+        self.assertFalse(is_text_file(self._write("data.txt", b"text\0binary")))
+        self.assertFalse(is_text_file(self._write("__init__.py", b"")))
+        mock_get_mime_detector.assert_not_called()
+
+    def test_unknown_extension(self):
+        self.assertTrue(is_text_file(self._write("Makefile", b"all:\n\techo 1\n")))
+        self.assertFalse(
+            is_text_file(
+                self._write("archive", b"\x1f\x8b\x08\x00" + bytes(range(1, 255)))
+            )
+        )
+
+    def test_detector_is_thread_local(self):
+        detectors = []
+        thread = threading.Thread(target=lambda: detectors.append(_get_mime_detector()))
+        thread.start()
+        thread.join()
+
+        self.assertIs(_get_mime_detector(), _get_mime_detector())
+        self.assertIsNot(detectors[0], _get_mime_detector())
+
+
+class TestLoadText(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def _assert_loaded(self, name: str, data: bytes, expected: str):
+        file_path = os.path.join(self.tmp_dir.name, name)
+        with open(file_path, "wb") as f:
+            f.write(data)
+        self.assertEqual(load_text_file(file_path), expected)
+        self.assertEqual(load_text_data(name, data), expected)
+
+    def _assert_skipped(self, name: str, data: bytes):
+        file_path = os.path.join(self.tmp_dir.name, name)
+        with open(file_path, "wb") as f:
+            f.write(data)
+        with self.assertRaises(ValueError):
+            load_text_file(file_path)
+        self.assertIsNone(load_text_data(name, data))
+
+    def test_text(self):
+        self._assert_loaded("notes.txt", b"first\r\nsecond\n", "first\nsecond\n")
+        self._assert_skipped("latin.txt", "café\n".encode("latin-1"))
+
+    def test_python_encoding_declaration(self):
+        self._assert_loaded(
+            "module.py",
+            "# -*- coding: latin-1 -*-\nNAME = 'café'\n".encode("latin-1"),
+            "# -*- coding: latin-1 -*-\nNAME = 'café'\n",
+        )
+        self._assert_skipped("module.py", "NAME = 'café'\n".encode("latin-1"))
+
+    def test_notebook_cells(self):
+        notebook = {
+            "cells": [
+                {"cell_type": "markdown", "source": ["# Title"]},
+                {"cell_type": "code", "source": ["import os\n", "os.getcwd()"]},
+            ]
+        }
+        expected = (
+            "'markdown' cell: '# Title'\n\n'code' cell: 'import os\nos.getcwd()'\n\n"
+        )
+        self._assert_loaded("notebook.ipynb", json.dumps(notebook).encode(), expected)
+        self.assertListEqual(
+            list(iter_file_chunks("notebook.ipynb", expected, 40, 0)),
+            ["'markdown' cell: '# Title'", "'code' cell: 'import os\nos.getcwd()'"],
+        )
+
+    def test_malformed_notebook(self):
+        self._assert_loaded("notebook.ipynb", b'{"cells": 1}', '{"cells": 1}')
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,68 @@
+import unittest
+
+from src.utils.hierarchy import (
+    get_directories_entries,
+    get_directories_levels,
+    get_hierarchy_summaries_text,
+    get_overview_summaries_text,
+)
+
+
+class TestHierarchy(unittest.TestCase):
+    def setUp(self):
+        self.files = ["repo/setup.py", "repo/src/app.py", "repo/src/utils/io.py"]
+
+    def test_directories_entries(self):
+        self.assertDictEqual(
+            get_directories_entries(self.files),
+            {
+                "": ["repo"],
+                "repo": ["repo/setup.py", "repo/src"],
+                "repo/src": ["repo/src/app.py", "repo/src/utils"],
+                "repo/src/utils": ["repo/src/utils/io.py"],
+            },
+        )
+
+    def test_directories_levels(self):
+        self.assertListEqual(
+            get_directories_levels(["", "repo", "repo/src", "repo/docs"]),
+            [["repo/src", "repo/docs"], ["repo"], [""]],
+        )
+
+    def test_hierarchy_summaries_text(self):
+        files_summaries = {file: "File summary" for file in self.files}
+        directories_summaries = {
+            "": "Repository summary",
+            "repo/src": "Sources",
+            "repo": "Repository summary",
+        }
+        text = get_hierarchy_summaries_text(
+            files_summaries, directories_summaries, token_budget=10_000
+        )
+        self.assertTrue(text.startswith("Project summary:\nRepository summary\n"))
+        self.assertLess(text.index("- Directory: repo\n"), text.index("repo/src\n"))
+        self.assertLess(text.index("- Directory: repo/src"), text.index("setup.py"))
+        self.assertLess(text.index("setup.py"), text.index("io.py"))
+
+        short_text = get_hierarchy_summaries_text(
+            files_summaries, directories_summaries, token_budget=len(text) - 1
+        )
+        self.assertLessEqual(len(short_text), len(text) - 1)
+        self.assertNotIn("io.py", short_text)
+
+    def test_overview_summaries_text(self):
+        directories_summaries = {
+            "": "Repository summary",
+            "repo": "Repository summary",
+            "repo/src": "Sources",
+            "repo/src/utils": "Helpers",
+        }
+        text = get_overview_summaries_text(directories_summaries, token_budget=10_000)
+        self.assertTrue(text.startswith("Project summary:\nRepository summary\n"))
+        self.assertIn("- Directory: repo/src\n", text)
+        self.assertNotIn("repo/src/utils", text)
+        self.assertNotIn("- File:", text)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,95 @@
+import unittest
+
+from src.utils.ingestion import (
+    DEFAULT_DENY_PATTERNS,
+    get_file_priority,
+    get_unique_contents,
+    select_files,
+)
+
+
+class TestIngestion(unittest.TestCase):
+    def setUp(self):
+        self.files_sizes = {
+            "README.md": 100,
+            "package-lock.json": 5_000,
+            "pyproject.toml": 200,
+            "src/app.py": 300,
+            "src/utils/helpers.py": 400,
+            "src/vendor/lib.py": 600,
+            "static/bundle.min.js": 10_000,
+            "tests/test_app.py": 500,
+        }
+
+    def test_priority(self):
+        files = sorted(self.files_sizes, key=get_file_priority)
+        self.assertListEqual(
+            files[:4],
+            ["pyproject.toml", "src/app.py", "README.md", "package-lock.json"],
+        )
+        self.assertEqual(files[-1], "tests/test_app.py")
+
+    def test_default_deny_patterns(self):
+        self.assertListEqual(
+            select_files(self.files_sizes, exclude_patterns=DEFAULT_DENY_PATTERNS),
+            [
+                "pyproject.toml",
+                "src/app.py",
+                "README.md",
+                "src/utils/helpers.py",
+                "tests/test_app.py",
+            ],
+        )
+        denied_dirs = [
+            "vendor",
+            "third_party",
+            "node_modules",
+            "dist",
+            "build",
+            "fixtures",
+            "__snapshots__",
+        ]
+        for directory in denied_dirs:
+            for path in (f"{directory}/file.js", f"web/{directory}/file.js"):
+                self.assertListEqual(
+                    select_files({path: 1}, exclude_patterns=DEFAULT_DENY_PATTERNS),
+                    [],
+                    path,
+                )
+        for path in ("package-lock.json", "web/package-lock.json"):
+            self.assertListEqual(
+                select_files({path: 1}, exclude_patterns=DEFAULT_DENY_PATTERNS), []
+            )
+
+    def test_include_and_exclude_patterns(self):
+        self.assertListEqual(
+            select_files(
+                self.files_sizes,
+                include_patterns=["src/*"],
+                exclude_patterns=["*/vendor/*"],
+            ),
+            ["src/app.py", "src/utils/helpers.py"],
+        )
+
+    def test_size_and_count_limits(self):
+        self.assertListEqual(
+            select_files(self.files_sizes, max_file_size=450, max_total_bytes=600),
+            ["pyproject.toml", "src/app.py", "README.md"],
+        )
+        self.assertListEqual(
+            select_files(self.files_sizes, max_files=2),
+            ["pyproject.toml", "src/app.py"],
+        )
+
+    def test_unique_contents(self):
+        unique_contents, duplicates = get_unique_contents(
+            {"a/LICENSE": "MIT", "main.py": "print()", "b/LICENSE": "MIT"}
+        )
+        self.assertDictEqual(
+            unique_contents, {"a/LICENSE": "MIT", "main.py": "print()"}
+        )
+        self.assertDictEqual(duplicates, {"b/LICENSE": "a/LICENSE"})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,80 @@
+import time
+import unittest
+
+from src.utils.jobs import JobManager
+
+
+def _echo_job(context, text, events_count):
+    for i in range(events_count):
+        context.emit(f"{text} {i}")
+    return text.upper()
+
+
+def _slow_job(context, seconds):
+    deadline = time.time() + seconds
+    while time.time() < deadline:
+        context.emit("tick")
+        time.sleep(0.05)
+    return "finished"
+
+
+def _failing_job(context):
+    raise ValueError("Broken repository")
+
+
+def _wait_for(manager, job_id, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = manager.get(job_id)
+        if job.finished:
+            return job
+        time.sleep(0.05)
+    raise TimeoutError(f"Job {job_id} did not finish")
+
+
+class TestJobManager(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.manager = JobManager(max_workers=2)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.manager.shutdown()
+
+    def test_job_result_and_events(self):
+        job_id = self.manager.submit(_echo_job, "repo", 3)
+        job = _wait_for(self.manager, job_id)
+        self.assertEqual(job.status, "done")
+        self.assertEqual(job.result, "REPO")
+        deadline = time.time() + 5
+        while len(job.events) < 3 and time.time() < deadline:
+            time.sleep(0.05)
+        self.assertListEqual(job.events, ["repo 0", "repo 1", "repo 2"])
+
+    def test_jobs_with_same_key_are_shared(self):
+        first = self.manager.submit(_slow_job, 0.5, key="repo@abc", subscriber="a")
+        second = self.manager.submit(_slow_job, 0.5, key="repo@abc", subscriber="b")
+        other = self.manager.submit(_slow_job, 0.1, key="repo@def", subscriber="a")
+        self.assertEqual(first, second)
+        self.assertNotEqual(first, other)
+        self.assertSetEqual(self.manager.get(first).subscribers, {"a", "b"})
+
+        _wait_for(self.manager, first)
+        # Finished jobs are not reused
+        third = self.manager.submit(_slow_job, 0.1, key="repo@abc")
+        self.assertNotEqual(first, third)
+        _wait_for(self.manager, third)
+
+    def test_cancel_waits_for_every_subscriber(self):
+        job_id = self.manager.submit(_slow_job, 10, key="cancel", subscriber="a")
+        self.manager.submit(_slow_job, 10, key="cancel", subscriber="b")
+
+        self.assertFalse(self.manager.cancel(job_id, subscriber="a"))
+        self.assertFalse(self.manager.get(job_id).finished)
+        self.assertTrue(self.manager.cancel(job_id, subscriber="b"))
+        self.assertEqual(_wait_for(self.manager, job_id).status, "cancelled")
+
+    def test_failed_job(self):
+        job = _wait_for(self.manager, self.manager.submit(_failing_job))
+        self.assertEqual(job.status, "failed")
+        self.assertIn("Broken repository", job.error)
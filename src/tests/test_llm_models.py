@@ -1,10 +1,27 @@
+import os
+import tempfile
 import unittest
-from unittest.mock import patch
+from unittest.mock import MagicMock, patch
 
+from langchain.schema.runnable import RunnableLambda
+from langchain_core.runnables.base import RunnableGenerator
+
+from src.benchmarks.fakes import FakeChatModel
+from src.configs.llmmodels.defaultllmmodel import (
+    DefaultLLMModelConfig,
+    load_prompt_templates,
+)
+from src.llmmodels.basellmmodel import ReadmeEvent
 from src.llmmodels.defaultllmmodel import DefaultLLMModel
+from src.pipeline import get_llm_config
 from src.repositoryadapters.defaultadapter import DefaultRepositoryAdapter
 from src.tests.utils import get_resource_path, get_text_resource
-from src.utils.prompt import get_files_structure_text, get_files_summaries_text
+from src.utils.prompt import (
+    get_files_structure_text,
+    get_files_summaries_text,
+    get_request_scheduler,
+    set_request_scheduler,
+)
 
 
 class TestDefaultLLMModel(unittest.TestCase):
@@ -19,27 +36,52 @@ class TestDefaultLLMModel(unittest.TestCase):
             "TestRepo/file2.py": "File 2 contents",
         }
 
+        self.config = DefaultLLMModelConfig.get_default_config()
+        self.config.summary_cache_path = None
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        self.config.batch_token_budget = None
+
+        # Chains that tests don't replace must not reach the OpenAI API
+        llm_patcher = patch.object(
+            DefaultLLMModel, "_get_llm", side_effect=lambda: FakeChatModel()
+        )
+        llm_patcher.start()
+        self.addCleanup(llm_patcher.stop)
+        # Models install the request scheduler of their config
+        self.addCleanup(set_request_scheduler, get_request_scheduler())
+
+    def get_mock_adapter(self) -> MagicMock:
+        adapter = MagicMock()
+        adapter.repo_url = "https://git-provider/owner/TestRepo"
+        adapter.repo_list.return_value = self.sample_file_structure
+        adapter.ingested_files.side_effect = lambda files=None: [
+            f for f in self.sample_files_contents if files is None or f in files
+        ]
+        adapter.iter_files_contents.side_effect = lambda files=None: (
+            (f, c)
+            for f, c in self.sample_files_contents.items()
+            if files is None or f in files
+        )
+        adapter.repo_structure.return_value = "TestRepo"
+        adapter.license.return_value = ("MIT", "LICENSE")
+        return adapter
+
     def mock_get_file_content(self, file: str) -> str:
         return self.sample_files_contents.get(file, "")
 
     @patch("src.repositoryadapters.defaultadapter.get_repo")
-    @patch("src.repositoryadapters.defaultadapter.get_files_list")
-    @patch("src.repositoryadapters.defaultadapter.get_file_contents")
-    @patch("src.utils.repository.get_repo_ignored")
+    @patch("src.repositoryadapters.defaultadapter.load_text_file")
     def test_get_prompt(
         self,
-        mock_get_repo_ignored,
-        mock_get_file_contents,
-        mock_get_files_list,
+        mock_load_text_file,
         mock_get_repo,
     ):
         expected_prompt_path = get_resource_path("expected_prompt.txt")
         expected_prompt = get_text_resource(expected_prompt_path)
 
         mock_get_repo.return_value = "mocked repo"
-        mock_get_files_list.return_value = self.sample_file_structure
-        mock_get_file_contents.side_effect = self.mock_get_file_content
-        mock_get_repo_ignored.return_value = []
+        mock_load_text_file.side_effect = self.mock_get_file_content
 
         file_structure_text = get_files_structure_text(self.sample_file_structure)
         files_summaries_text = get_files_summaries_text(self.sample_files_contents)
@@ -48,7 +90,12 @@ class TestDefaultLLMModel(unittest.TestCase):
             "https://git-provider/owner/TestRepo", "/home/workspace"
         )
 
-        llm_model = DefaultLLMModel(adapter)
+        # The default config, with its summary cache out of the repository
+        default_config = DefaultLLMModelConfig.get_default_config()
+        default_config.summary_cache_path = os.path.join(
+            self.tmp_dir.name, "summaries.sqlite3"
+        )
+        llm_model = DefaultLLMModel(adapter, default_config)
         prompt_text = (
             llm_model._get_introduction_prompt()
             .format(
@@ -59,6 +106,508 @@ class TestDefaultLLMModel(unittest.TestCase):
         )
         self.assertEqual(prompt_text, expected_prompt)
 
+    def test_request_scheduler_from_config(self):
+        self.config.model_name = "gpt-4"
+        self.config.requests_per_minute = 60
+        llm_model = DefaultLLMModel(self.get_mock_adapter(), self.config)
+
+        scheduler = get_request_scheduler()
+        self.assertIs(scheduler, self.config.get_request_scheduler())
+        self.assertEqual(scheduler.model_name, "gpt-4")
+        self.assertEqual(scheduler.requests_bucket.capacity, 60)
+        # Models sharing a config share its quotas
+        DefaultLLMModel(self.get_mock_adapter(), self.config)
+        self.assertIs(get_request_scheduler(), scheduler)
+        self.assertIs(llm_model.config.get_request_scheduler(), scheduler)
+
+    def test_llm_config_quotas_split_across_workers(self):
+        default_config = DefaultLLMModelConfig.get_default_config()
+        llm_config = get_llm_config(2)
+        self.assertIs(get_llm_config(2), llm_config)
+        self.assertEqual(
+            llm_config.requests_per_minute, default_config.requests_per_minute / 2
+        )
+        self.assertEqual(
+            llm_config.tokens_per_minute, default_config.tokens_per_minute / 2
+        )
+
+    def test_files_structure_text_bounded(self):
+        adapter = self.get_mock_adapter()
+        adapter.repo_structure.return_value = "TestRepo\n└── ...\n\n0 directories"
+        llm_model = DefaultLLMModel(adapter, self.config)
+
+        self.assertEqual(
+            llm_model._get_files_structure_text(self.sample_file_structure),
+            get_files_structure_text(self.sample_file_structure),
+        )
+        adapter.repo_structure.assert_not_called()
+
+        self.config.file_structure_max_depth = 3
+        self.config.file_structure_max_entries = 1
+        text = llm_model._get_files_structure_text(self.sample_file_structure)
+        self.assertEqual(
+            text, "Project file structure:\nTestRepo\n└── ...\n\n0 directories"
+        )
+        adapter.repo_structure.assert_called_once_with(
+            directories_only=False, max_depth=3, max_entries=1
+        )
+
+    @patch("src.repositoryadapters.defaultadapter.get_repo")
+    def test_get_files_summaries(self, mock_get_repo):
+        mock_get_repo.return_value = "mocked repo"
+
+        def summarize(inputs):
+            if inputs["file_contents"] == "File 1 contents":
+                raise ValueError("Failed summary")
+            return f"Summary of {inputs['file_contents']}"
+
+        adapter = DefaultRepositoryAdapter(
+            "https://git-provider/owner/TestRepo", "/home/workspace"
+        )
+        llm_model = DefaultLLMModel(adapter, self.config)
+        llm_model.file_summary_chain = RunnableLambda(summarize)
+
+        files_summaries = llm_model._get_files_summaries(self.sample_files_contents)
+
+        self.assertDictEqual(
+            files_summaries, {"TestRepo/file2.py": "Summary of File 2 contents"}
+        )
+        self.assertListEqual(
+            list(llm_model.files_summaries_errors), ["TestRepo/file1.py"]
+        )
+
+    @patch("src.repositoryadapters.defaultadapter.get_repo")
+    def test_get_files_summaries_cached(self, mock_get_repo):
+        mock_get_repo.return_value = "mocked repo"
+        summarized = []
+
+        def summarize(inputs):
+            summarized.append(inputs["file_contents"])
+            return f"Summary of {inputs['file_contents']}"
+
+        adapter = DefaultRepositoryAdapter(
+            "https://git-provider/owner/TestRepo", "/home/workspace"
+        )
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            self.config.summary_cache_path = os.path.join(tmp_dir, "cache.sqlite3")
+            llm_model = DefaultLLMModel(adapter, self.config)
+            llm_model.file_summary_chain = RunnableLambda(summarize)
+
+            first_summaries = llm_model._get_files_summaries(self.sample_files_contents)
+            changed_contents = dict(self.sample_files_contents)
+            changed_contents["TestRepo/file2.py"] = "File 2 new contents"
+            second_summaries = llm_model._get_files_summaries(changed_contents)
+            llm_model.summary_cache.close()
+
+        self.assertCountEqual(
+            summarized, ["File 1 contents", "File 2 contents", "File 2 new contents"]
+        )
+        self.assertEqual(
+            first_summaries["TestRepo/file1.py"], second_summaries["TestRepo/file1.py"]
+        )
+        self.assertListEqual(list(second_summaries), list(changed_contents))
+
+    @patch("src.repositoryadapters.defaultadapter.get_repo")
+    def test_get_files_summaries_deduplicated(self, mock_get_repo):
+        mock_get_repo.return_value = "mocked repo"
+        summarized = []
+
+        def summarize(inputs):
+            summarized.append(inputs["file_contents"])
+            return f"Summary of {inputs['file_contents']}"
+
+        adapter = DefaultRepositoryAdapter(
+            "https://git-provider/owner/TestRepo", "/home/workspace"
+        )
+        llm_model = DefaultLLMModel(adapter, self.config)
+        llm_model.file_summary_chain = RunnableLambda(summarize)
+        files_contents = {
+            "TestRepo/a/LICENSE": "License text",
+            "TestRepo/file1.py": "File 1 contents",
+            "TestRepo/b/LICENSE": "License text",
+        }
+
+        files_summaries = llm_model._get_files_summaries(files_contents)
+
+        self.assertCountEqual(summarized, ["License text", "File 1 contents"])
+        self.assertListEqual(list(files_summaries), list(files_contents))
+        self.assertEqual(
+            files_summaries["TestRepo/b/LICENSE"], "Summary of License text"
+        )
+
+        self.assertNotIn(
+            "- Files:", llm_model._get_files_summaries_text(files_summaries)
+        )
+        self.config.collapse_duplicate_summaries = True
+        self.assertIn(
+            "- Files: TestRepo/a/LICENSE, TestRepo/b/LICENSE\n",
+            llm_model._get_files_summaries_text(files_summaries),
+        )
+
+    def test_static_summaries(self):
+        summarized = []
+
+        def summarize(inputs):
+            summarized.append(inputs["file_contents"])
+            return f"Summary of {inputs['file_contents']}"
+
+        self.config.static_summary_min_words = 12
+        llm_model = DefaultLLMModel(self.get_mock_adapter(), self.config)
+        llm_model.file_summary_chain = RunnableLambda(summarize)
+        files_contents = {
+            "TestRepo/LICENSE": "MIT License\n\nCopyright (c) 2024",
+            "TestRepo/requirements.txt": "numpy\n",
+            "TestRepo/file1.py": "def main():\n    pass\n",
+        }
+
+        files_summaries = llm_model._get_files_summaries(files_contents)
+
+        # The requirements summary is too short to skip the LLM
+        self.assertCountEqual(summarized, ["numpy\n", "def main():\n    pass\n"])
+        self.assertEqual(
+            files_summaries["TestRepo/LICENSE"],
+            "License file of the project, which is distributed under the "
+            "MIT License.",
+        )
+
+        summarized.clear()
+        self.config.static_summary_min_words = None
+        llm_model._get_files_summaries(files_contents)
+        self.assertEqual(len(summarized), 3)
+
+    def test_hierarchical_summaries(self):
+        summarized_directories = []
+
+        def summarize_directory(inputs):
+            summarized_directories.append(inputs["directory_path"])
+            return f"Summary of {inputs['directory_path']}"
+
+        self.sample_files_contents = {
+            "TestRepo/setup.py": "Setup",
+            "TestRepo/src/app.py": "App",
+            "TestRepo/src/utils.py": "Utils",
+        }
+        self.sample_file_structure = list(self.sample_files_contents)
+        self.config.summaries_token_budget = 100
+        llm_model = DefaultLLMModel(self.get_mock_adapter(), self.config)
+        llm_model.directory_summary_chain = RunnableLambda(summarize_directory)
+        files_summaries = {
+            file: f"Summary of {contents}. " * 10
+            for file, contents in self.sample_files_contents.items()
+        }
+
+        text = llm_model._get_files_summaries_text(files_summaries)
+
+        # The root only holds TestRepo, so it reuses its summary
+        self.assertCountEqual(summarized_directories, ["TestRepo/src", "TestRepo"])
+        self.assertTrue(text.startswith("Project summary:\nSummary of TestRepo\n"))
+        self.assertLessEqual(llm_model._count_tokens(text), 100)
+
+        self.config.summaries_token_budget = None
+        self.assertEqual(
+            llm_model._get_files_summaries_text(files_summaries),
+            get_files_summaries_text(files_summaries),
+        )
+
+    def test_retrieval_sections_summaries(self):
+        self.sample_files_contents = {
+            "TestRepo/setup.py": "setup(install_requires=['numpy'])",
+            "TestRepo/src/app.py": "def main(): ...",
+            "TestRepo/src/utils.py": "def helper(): ...",
+        }
+        self.sample_file_structure = list(self.sample_files_contents)
+        files_summaries = {
+            "TestRepo/setup.py": "Packaging script with the dependencies. " * 10,
+            "TestRepo/src/app.py": "Command line entry point. " * 10,
+            "TestRepo/src/utils.py": "String helpers. " * 10,
+        }
+        adapter = self.get_mock_adapter()
+        adapter.head_commit.return_value = "abc123"
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            self.config.retrieval_token_budget = 100
+            self.config.retrieval_index_dir = tmp_dir
+            self.config.retrieval_queries = {"installation": "install dependencies"}
+            llm_model = DefaultLLMModel(adapter, self.config)
+
+            texts = llm_model._get_sections_summaries_texts(files_summaries)
+            self.assertIn("TestRepo/setup.py", texts["installation"])
+            self.assertNotIn("TestRepo/src/utils.py", texts["installation"])
+            self.assertLessEqual(llm_model._count_tokens(texts["installation"]), 100)
+            self.assertEqual(
+                texts["introduction"],
+                llm_model._get_files_summaries_text(files_summaries),
+            )
+
+            # The index of this commit is reused without reading files again
+            adapter.iter_files_contents.reset_mock()
+            self.assertDictEqual(
+                llm_model._get_sections_summaries_texts(files_summaries), texts
+            )
+            adapter.iter_files_contents.assert_not_called()
+
+            self.config.retrieval_token_budget = None
+            texts = llm_model._get_sections_summaries_texts(files_summaries)
+            self.assertEqual(
+                texts["installation"], get_files_summaries_text(files_summaries)
+            )
+
+    def test_retrieval_sections_summaries_with_hierarchy(self):
+        summarized_directories = []
+
+        def summarize_directory(inputs):
+            summarized_directories.append(inputs["directory_path"])
+            return f"Summary of {inputs['directory_path']}"
+
+        self.sample_files_contents = {
+            "TestRepo/setup.py": "setup(install_requires=['numpy'])",
+            "TestRepo/src/app.py": "def main(): ...",
+            "TestRepo/src/utils.py": "def helper(): ...",
+        }
+        self.sample_file_structure = list(self.sample_files_contents)
+        files_summaries = {
+            "TestRepo/setup.py": "Packaging script with the dependencies. " * 10,
+            "TestRepo/src/app.py": "Command line entry point. " * 10,
+            "TestRepo/src/utils.py": "String helpers. " * 10,
+        }
+        self.config.summaries_token_budget = 100
+        self.config.retrieval_token_budget = 150
+        self.config.retrieval_index_dir = None
+        self.config.retrieval_queries = {"installation": "install dependencies"}
+        llm_model = DefaultLLMModel(self.get_mock_adapter(), self.config)
+        llm_model.directory_summary_chain = RunnableLambda(summarize_directory)
+
+        texts = llm_model._get_sections_summaries_texts(files_summaries)
+
+        # Directories are summarized once for every section
+        self.assertCountEqual(summarized_directories, ["TestRepo/src", "TestRepo"])
+        self.assertTrue(
+            texts["installation"].startswith("Project summary:\nSummary of TestRepo\n")
+        )
+        self.assertIn("- Directory: TestRepo/src", texts["installation"])
+        self.assertIn("TestRepo/setup.py", texts["installation"])
+        self.assertLessEqual(llm_model._count_tokens(texts["installation"]), 150)
+        self.assertTrue(
+            texts["introduction"].startswith("Project summary:\nSummary of TestRepo\n")
+        )
+
+    def test_incremental_generation(self):
+        calls = []
+
+        def fake_chain(name):
+            def invoke(inputs):
+                calls.append((name, inputs.get("file_contents")))
+                return f"{name}: {inputs.get('file_contents', '')}"
+
+            return RunnableLambda(invoke)
+
+        adapter = self.get_mock_adapter()
+        adapter.head_commit.return_value = "first"
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            self.config.incremental_generation = True
+            self.config.readme_state_dir = tmp_dir
+            llm_model = DefaultLLMModel(adapter, self.config)
+            for chain in (
+                "file_summary",
+                "introduction",
+                "installation",
+                "repository_overview",
+            ):
+                setattr(llm_model, f"{chain}_chain", fake_chain(chain))
+
+            first_readme = llm_model.generate_readme()
+            self.assertEqual(len(calls), 5)
+
+            calls.clear()
+            adapter.head_commit.return_value = "second"
+            adapter.changed_files.return_value = ([], [])
+            self.assertEqual(llm_model.generate_readme(), first_readme)
+            self.assertListEqual(calls, [])
+            adapter.changed_files.assert_called_with("first")
+
+            self.sample_files_contents["TestRepo/file2.py"] = "File 2 new contents"
+            adapter.head_commit.return_value = "third"
+            adapter.changed_files.return_value = (["TestRepo/file2.py"], [])
+            llm_model.generate_readme()
+            self.assertEqual(calls[0], ("file_summary", "File 2 new contents"))
+            self.assertCountEqual(
+                [name for name, _ in calls[1:]],
+                ["introduction", "installation", "repository_overview"],
+            )
+
+    @patch("src.llmmodels.defaultllmmodel.count_tokens")
+    @patch("src.repositoryadapters.defaultadapter.get_repo")
+    def test_get_files_summaries_batched(self, mock_get_repo, mock_count_tokens):
+        mock_get_repo.return_value = "mocked repo"
+        mock_count_tokens.side_effect = lambda text, model_name: len(text.split())
+        files_contents = {
+            "TestRepo/small1.py": "small 1",
+            "TestRepo/small2.py": "small 2",
+            "TestRepo/small3.py": "small 3",
+            "TestRepo/large.py": " ".join(["large"] * 50),
+        }
+        batches = []
+
+        def summarize_batch(inputs):
+            batches.append(inputs["files_contents"])
+            # The model skips the last file, which is then summarized alone
+            return "### File: TestRepo/small1.py\nSummary 1\n\n" + (
+                "### File: `TestRepo/small2.py`\nSummary 2\n"
+            )
+
+        adapter = DefaultRepositoryAdapter(
+            "https://git-provider/owner/TestRepo", "/home/workspace"
+        )
+        self.config.batch_token_budget = 20
+        self.config.batch_small_file_tokens = 10
+        llm_model = DefaultLLMModel(adapter, self.config)
+        llm_model.files_batch_summary_chain = RunnableLambda(summarize_batch)
+        llm_model.file_summary_chain = RunnableLambda(
+            lambda inputs: f"Summary of {inputs['file_contents'][:7]}"
+        )
+
+        files_summaries = llm_model._get_files_summaries(files_contents)
+
+        self.assertEqual(len(batches), 1)
+        self.assertDictEqual(
+            files_summaries,
+            {
+                "TestRepo/small1.py": "Summary 1",
+                "TestRepo/small2.py": "Summary 2",
+                "TestRepo/small3.py": "Summary of small 3",
+                "TestRepo/large.py": "Summary of large l",
+            },
+        )
+
+    @patch("src.llmmodels.defaultllmmodel.count_tokens")
+    @patch("src.repositoryadapters.defaultadapter.get_repo")
+    def test_get_files_summaries_chunked(self, mock_get_repo, mock_count_tokens):
+        mock_get_repo.return_value = "mocked repo"
+        mock_count_tokens.side_effect = lambda text, model_name: len(text.split())
+        large_contents = "\n".join(
+            f"def function_{i}():\n    return {i}\n" for i in range(8)
+        )
+        reduced = []
+
+        def reduce_summaries(inputs):
+            reduced.append(inputs["chunks_summaries"])
+            return f"{len(inputs['chunks_summaries'].split())} summaries"
+
+        adapter = DefaultRepositoryAdapter(
+            "https://git-provider/owner/TestRepo", "/home/workspace"
+        )
+        self.config.chunk_threshold_tokens = 20
+        self.config.chunk_size_tokens = 4
+        self.config.chunk_overlap_tokens = 0
+        llm_model = DefaultLLMModel(adapter, self.config)
+        llm_model.file_summary_chain = RunnableLambda(lambda inputs: "Small file")
+        llm_model.file_chunk_summary_chain = RunnableLambda(
+            lambda inputs: inputs["chunk_contents"].split("(")[0].split()[-1]
+        )
+        llm_model.file_chunks_reduce_chain = RunnableLambda(reduce_summaries)
+
+        files_summaries = llm_model._get_files_summaries(
+            {"TestRepo/small.py": "x = 1", "TestRepo/large.py": large_contents}
+        )
+
+        self.assertDictEqual(
+            files_summaries,
+            {"TestRepo/small.py": "Small file", "TestRepo/large.py": "4 summaries"},
+        )
+        # Two groups of chunk summaries fit the token budget, then a final reduce
+        self.assertCountEqual(
+            reduced,
+            [
+                "\n\n".join(f"function_{i}" for i in range(4)),
+                "\n\n".join(f"function_{i}" for i in range(4, 8)),
+                "4 summaries\n\n4 summaries",
+            ],
+        )
+
+    @patch("src.repositoryadapters.defaultadapter.get_repo")
+    def test_stream_files_summaries(self, mock_get_repo):
+        mock_get_repo.return_value = "mocked repo"
+        consumed = []
+
+        def files_contents():
+            for file, contents in self.sample_files_contents.items():
+                consumed.append(file)
+                yield file, contents
+
+        def summarize(inputs):
+            if inputs["file_contents"] == "File 2 contents":
+                raise ValueError("Failed summary")
+            # Files are summarized before the next one is read
+            self.assertEqual(len(consumed), 1)
+            return "Summary"
+
+        adapter = DefaultRepositoryAdapter(
+            "https://git-provider/owner/TestRepo", "/home/workspace"
+        )
+        self.config.summary_window_files = 1
+        llm_model = DefaultLLMModel(adapter, self.config)
+        llm_model.file_summary_chain = RunnableLambda(summarize)
+
+        files_summaries = llm_model._stream_files_summaries(files_contents())
+
+        self.assertDictEqual(files_summaries, {"TestRepo/file1.py": "Summary"})
+        self.assertListEqual(
+            list(llm_model.files_summaries_errors), ["TestRepo/file2.py"]
+        )
+
+    def test_stream_readme(self):
+        def section_tokens(inputs):
+            for _ in inputs:
+                yield from ["# Section", "\n\n", "Text"]
+
+        llm_model = DefaultLLMModel(self.get_mock_adapter(), self.config)
+        llm_model.file_summary_chain = RunnableLambda(lambda inputs: "Summary")
+        for chain in ("introduction", "installation", "repository_overview"):
+            setattr(llm_model, f"{chain}_chain", RunnableGenerator(section_tokens))
+
+        events = list(llm_model.stream_readme())
+
+        self.assertIn(
+            ReadmeEvent("progress", "Summarizing files", completed=2, total=2), events
+        )
+        tokens = [
+            e.text for e in events if e.type == "token" and e.section == "installation"
+        ]
+        self.assertListEqual(tokens, ["# Section", "\n\n", "Text"])
+        self.assertEqual(events[-1].type, "done")
+        self.assertEqual(events[-1].text, llm_model.generate_readme())
+
+    def test_stream_readme_errors(self):
+        llm_model = DefaultLLMModel(self.get_mock_adapter(), self.config)
+        llm_model.repo.scan.side_effect = RuntimeError("Scan failed")
+
+        with self.assertRaises(RuntimeError):
+            list(llm_model.stream_readme())
+
+
+class TestPromptTemplates(unittest.TestCase):
+    def test_load_prompt_templates_cache(self):
+        with tempfile.TemporaryDirectory() as folder_path:
+            template_path = os.path.join(folder_path, "summary.txt")
+            with open(template_path, "w") as f:
+                f.write("Summarize {file}")
+
+            templates = load_prompt_templates(folder_path)
+            self.assertDictEqual(templates, {"summary": "Summarize {file}"})
+            self.assertIs(load_prompt_templates(folder_path), templates)
+
+            with open(template_path, "w") as f:
+                f.write("Summarize the file {file}")
+            self.assertDictEqual(
+                load_prompt_templates(folder_path),
+                {"summary": "Summarize the file {file}"},
+            )
+
+    def test_load_prompt_templates_missing_folder(self):
+        with self.assertRaises(ValueError):
+            load_prompt_templates("/nonexistent/prompts")
+
 
 if __name__ == "__main__":
     unittest.main()
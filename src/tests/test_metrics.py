@@ -0,0 +1,79 @@
+import json
+import os
+import tempfile
+import unittest
+
+from src.utils.metrics import (
+    Metrics,
+    format_prometheus,
+    get_metrics,
+    get_run_summary,
+    set_metrics,
+    timed,
+)
+
+
+class TestMetrics(unittest.TestCase):
+    def setUp(self):
+        self.metrics = Metrics(max_slowest=2)
+
+    def test_spans_keep_slowest_items(self):
+        for file, duration in [("a.py", 0.1), ("b.py", 0.3), ("c.py", 0.2)]:
+            self.metrics.record_span("load_file", duration, item=file)
+
+        (span,) = self.metrics.report()["spans"]
+        self.assertEqual(span["count"], 3)
+        self.assertAlmostEqual(span["total_seconds"], 0.6)
+        self.assertEqual(span["max_seconds"], 0.3)
+        self.assertListEqual(
+            [slow["item"] for slow in span["slowest"]], ["b.py", "c.py"]
+        )
+
+    def test_counters_by_labels(self):
+        self.metrics.increment("llm_prompt_tokens_total", 10, chain="introduction")
+        self.metrics.increment("llm_prompt_tokens_total", 5, chain="introduction")
+        self.metrics.increment("llm_prompt_tokens_total", 7, chain="installation")
+
+        self.assertEqual(
+            self.metrics.counter("llm_prompt_tokens_total", chain="introduction"), 15
+        )
+        self.assertEqual(get_run_summary(self.metrics.report())["prompt_tokens"], 22)
+
+    def test_timed_uses_active_metrics(self):
+        @timed("stage")
+        def stage():
+            return "done"
+
+        previous_metrics = set_metrics(self.metrics)
+        try:
+            self.assertEqual(stage(), "done")
+            self.assertIs(get_metrics(), self.metrics)
+        finally:
+            set_metrics(previous_metrics)
+
+        (span,) = self.metrics.report()["spans"]
+        self.assertEqual((span["name"], span["count"]), ("stage", 1))
+
+    def test_prometheus_format(self):
+        self.metrics.increment("llm_requests_total", chain='say "hi"')
+        self.metrics.record_span("scan", 1.5)
+
+        text = format_prometheus(self.metrics.report())
+
+        self.assertIn("# TYPE readmaker_llm_requests_total counter\n", text)
+        self.assertIn('readmaker_llm_requests_total{chain="say \\"hi\\""} 1\n', text)
+        self.assertIn('readmaker_span_seconds_sum{span="scan"} 1.5\n', text)
+        self.assertIn('readmaker_span_seconds_count{span="scan"} 1\n', text)
+
+    def test_save_report(self):
+        self.metrics.increment("files_loaded_total", 3)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            report_path = os.path.join(tmp_dir, "reports", "run.json")
+            self.metrics.save_report(report_path)
+            with open(report_path) as f:
+                report = json.load(f)
+        self.assertEqual(report["counters"][0]["value"], 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,82 @@
+import os
+import tempfile
+import time
+import unittest
+from unittest.mock import patch
+
+from src.tests.utils import create_git_repo, write_files
+from src.utils.mirrors import MirrorPool
+from src.utils.repository import get_head_commit
+
+
+class TestMirrorPool(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.origins = {}
+        for name in ("first", "second"):
+            origin_path = os.path.join(self.tmp_dir.name, "origin", name)
+            self.origins[name] = create_git_repo(
+                origin_path, {"main.py": f"print('{name}')\n"}
+            )
+        self.pool = MirrorPool(os.path.join(self.tmp_dir.name, "cache"))
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def _worktree_path(self, session, name):
+        return os.path.join(self.tmp_dir.name, "sessions", session, name)
+
+    def test_sessions_share_one_mirror(self):
+        origin = self.origins["first"]
+        first = self.pool.add_worktree(
+            origin.working_dir, self._worktree_path("a", "first")
+        )
+        write_files(origin.working_dir, {"main.py": "print('updated')\n"})
+        origin.index.add(["main.py"])
+        new_commit = origin.index.commit("Update").hexsha
+
+        with patch("src.utils.repository._clone_repo") as mock_clone:
+            second = self.pool.add_worktree(
+                origin.working_dir, self._worktree_path("b", "first")
+            )
+        mock_clone.assert_not_called()
+        self.assertEqual(len(self.pool.mirrors()), 1)
+        self.assertEqual(get_head_commit(second), new_commit)
+        self.assertNotEqual(get_head_commit(first), new_commit)
+        self.assertTrue(first.head.is_detached)
+
+    def test_existing_worktree_is_updated(self):
+        origin = self.origins["first"]
+        worktree_path = self._worktree_path("a", "first")
+        self.pool.add_worktree(origin.working_dir, worktree_path)
+        write_files(origin.working_dir, {"main.py": "print('updated')\n"})
+        origin.index.add(["main.py"])
+        new_commit = origin.index.commit("Update").hexsha
+
+        worktree = self.pool.add_worktree(origin.working_dir, worktree_path)
+        self.assertEqual(get_head_commit(worktree), new_commit)
+        with open(os.path.join(worktree_path, "main.py")) as f:
+            self.assertEqual(f.read(), "print('updated')\n")
+
+    def test_evicts_least_recently_used_unused_mirrors(self):
+        first_path = self._worktree_path("a", "first")
+        self.pool.add_worktree(self.origins["first"].working_dir, first_path)
+        self.pool.get_mirror(self.origins["second"].working_dir)
+        old_time = time.time() - 60
+        for mirror_path in self.pool.mirrors():
+            os.utime(mirror_path, (old_time, old_time))
+
+        self.pool.max_bytes = 0
+        # The first mirror is in use by a worktree
+        self.assertListEqual(
+            self.pool.evict(),
+            [self.pool.mirror_path(self.origins["second"].working_dir)],
+        )
+
+        self.pool.remove_worktree(self.origins["first"].working_dir, first_path)
+        self.assertFalse(os.path.exists(first_path))
+        self.assertListEqual(
+            self.pool.evict(),
+            [self.pool.mirror_path(self.origins["first"].working_dir)],
+        )
+        self.assertListEqual(self.pool.mirrors(), [])
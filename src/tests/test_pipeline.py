@@ -0,0 +1,36 @@
+import os
+import tempfile
+import threading
+import unittest
+from queue import Queue
+from unittest.mock import patch
+
+from src.llmmodels.basellmmodel import ReadmeEvent
+from src.pipeline import generate_readme_job
+from src.tests.utils import create_git_repo
+from src.utils.jobs import JobContext
+
+
+class TestGenerateReadmeJob(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        self.origin_path = os.path.join(self.tmp_dir.name, "origin", "TestRepo")
+        self.origin = create_git_repo(self.origin_path, {"main.py": "print(1)\n"})
+
+    @patch("src.llmmodels.defaultllmmodel.DefaultLLMModel")
+    def test_result_has_source_commit(self, mock_llm_model):
+        mock_llm_model.return_value.stream_readme.return_value = [
+            ReadmeEvent("done", "# TestRepo")
+        ]
+        context = JobContext("job", Queue(), threading.Event())
+
+        with patch("src.config.CACHE_DIR", os.path.join(self.tmp_dir.name, "cache")):
+            result = generate_readme_job(context, self.origin_path)
+
+        self.assertEqual(result["readme_text"], "# TestRepo")
+        self.assertEqual(result["source_commit"], self.origin.head.commit.hexsha)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,162 @@
+import threading
+import time
+import unittest
+
+from langchain.schema.runnable import RunnableLambda
+
+from src.configs.llmmodels.defaultllmmodel import DefaultLLMModelConfig
+from src.utils.metrics import Metrics, set_metrics
+from src.utils.prompt import (
+    execute_prompts,
+    execute_prompts_parallel,
+    get_files_batch_text,
+    get_files_summaries_text,
+    get_request_scheduler,
+    pack_files,
+    parse_files_batch_summaries,
+    set_request_scheduler,
+)
+from src.utils.ratelimit import RequestScheduler
+
+
+def _slow_upper(inputs):
+    time.sleep(0.01 * len(inputs["text"]))
+    if inputs["text"] == "fail":
+        raise ValueError("Failed prompt")
+    return inputs["text"].upper()
+
+
+class TestExecutePrompts(unittest.TestCase):
+    def setUp(self):
+        self.chain = RunnableLambda(_slow_upper)
+
+    def test_deterministic_order(self):
+        texts = ["aaaaa", "b", "ccc", "dd"]
+        outputs = execute_prompts(
+            self.chain, [{"text": t} for t in texts], max_concurrency=4
+        )
+        self.assertListEqual(outputs, ["AAAAA", "B", "CCC", "DD"])
+
+    def test_token_accounting_per_chain(self):
+        metrics = Metrics()
+        previous_metrics = set_metrics(metrics)
+        try:
+            execute_prompts(
+                self.chain.with_config(run_name="upper"),
+                [{"text": "hello"}, {"text": "world"}],
+            )
+        finally:
+            set_metrics(previous_metrics)
+
+        self.assertEqual(metrics.counter("llm_requests_total", chain="upper"), 2)
+        self.assertGreater(metrics.counter("llm_prompt_tokens_total", chain="upper"), 0)
+        self.assertGreater(
+            metrics.counter("llm_completion_tokens_total", chain="upper"), 0
+        )
+
+    def test_failures_are_isolated(self):
+        outputs = execute_prompts(
+            self.chain, [{"text": "ok"}, {"text": "fail"}], max_concurrency=2
+        )
+        self.assertEqual(outputs[0], "OK")
+        self.assertIsInstance(outputs[1], ValueError)
+
+    def test_execute_prompts_parallel(self):
+        outputs = execute_prompts_parallel(
+            {
+                "first": (self.chain, {"text": "first"}),
+                "second": (self.chain, {"text": "second"}),
+            },
+            max_concurrency=2,
+        )
+        self.assertDictEqual(outputs, {"first": "FIRST", "second": "SECOND"})
+
+    def test_scheduler_limits_concurrency(self):
+        lock = threading.Lock()
+        in_flight = [0, 0]
+
+        def track(inputs):
+            with lock:
+                in_flight[0] += 1
+                in_flight[1] = max(in_flight)
+            time.sleep(0.02)
+            with lock:
+                in_flight[0] -= 1
+            return inputs["text"]
+
+        previous_scheduler = set_request_scheduler(RequestScheduler(max_concurrency=2))
+        try:
+            execute_prompts(
+                RunnableLambda(track),
+                [{"text": str(i)} for i in range(8)],
+                max_concurrency=8,
+            )
+        finally:
+            set_request_scheduler(previous_scheduler)
+        self.assertEqual(in_flight[1], 2)
+
+    def test_default_request_scheduler(self):
+        llm_config = DefaultLLMModelConfig.get_default_config()
+        previous_scheduler = set_request_scheduler(None)
+        try:
+            scheduler = get_request_scheduler()
+            self.assertIs(get_request_scheduler(), scheduler)
+        finally:
+            set_request_scheduler(previous_scheduler)
+        self.assertEqual(scheduler.model_name, llm_config.model_name)
+        self.assertEqual(
+            scheduler.requests_bucket.capacity, llm_config.requests_per_minute
+        )
+        self.assertEqual(scheduler.tokens_bucket.capacity, llm_config.tokens_per_minute)
+
+
+class TestFilesBatches(unittest.TestCase):
+    def test_pack_files(self):
+        files_tokens = {"a": 3, "b": 4, "big": 50, "c": 4, "d": 1, "e": 1}
+        self.assertListEqual(
+            pack_files(files_tokens, token_budget=8, small_file_tokens=5),
+            [["big"], ["a", "b"], ["c", "d", "e"]],
+        )
+        self.assertListEqual(
+            pack_files(files_tokens, token_budget=8, small_file_tokens=5, max_files=2),
+            [["big"], ["a", "b"], ["c", "d"], ["e"]],
+        )
+
+    def test_batch_text_round_trip(self):
+        files = ["src/a.py", "src/b.py"]
+        text = get_files_batch_text({"src/a.py": "a = 1", "src/b.py": "b = 2"})
+        self.assertEqual(text, "### File: src/a.py\na = 1\n\n### File: src/b.py\nb = 2")
+        self.assertDictEqual(
+            parse_files_batch_summaries(text, files),
+            {"src/a.py": "a = 1", "src/b.py": "b = 2"},
+        )
+
+    def test_parse_ignores_unknown_files(self):
+        text = "### File: src/a.py\nSummary\n### File: src/unknown.py\nOther"
+        self.assertDictEqual(
+            parse_files_batch_summaries(text, ["src/a.py"]), {"src/a.py": "Summary"}
+        )
+
+
+class TestFilesSummariesText(unittest.TestCase):
+    def test_collapse_duplicates(self):
+        files_summaries = {
+            "a/LICENSE": "MIT",
+            "main.py": "Main",
+            "b/LICENSE": "MIT",
+            "c/LICENSE": "MIT",
+        }
+        # c/LICENSE has the same summary but different contents
+        duplicates = {"b/LICENSE": "a/LICENSE"}
+        self.assertEqual(
+            get_files_summaries_text(files_summaries, duplicates=duplicates),
+            "Projects files contents summaries:\n"
+            "- Files: a/LICENSE, b/LICENSE\n- Contents: MIT\n\n"
+            "- File: main.py\n- Contents: Main\n\n"
+            "- File: c/LICENSE\n- Contents: MIT",
+        )
+        self.assertEqual(get_files_summaries_text(files_summaries).count("- File:"), 4)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,117 @@
+import unittest
+
+from langchain.prompts import ChatPromptTemplate
+from langchain.schema import StrOutputParser
+
+from src.benchmarks.fakes import FakeChatModel, FakeRateLimitError
+from src.utils.prompt import execute_prompts, set_request_scheduler
+from src.utils.ratelimit import (
+    AdaptiveConcurrencyLimiter,
+    RequestScheduler,
+    TokenBucket,
+    is_retryable_error,
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+class TestTokenBucket(unittest.TestCase):
+    def test_waits_for_refill(self):
+        clock = FakeClock()
+        bucket = TokenBucket.per_minute(60, clock=clock, sleep=clock.sleep)
+        self.assertEqual(bucket.acquire(60), 0)
+        self.assertAlmostEqual(bucket.acquire(30), 30)
+        self.assertAlmostEqual(clock.now, 30)
+
+    def test_oversized_requests_wait_for_full_bucket(self):
+        clock = FakeClock()
+        bucket = TokenBucket.per_minute(60, clock=clock, sleep=clock.sleep)
+        bucket.acquire(60)
+        self.assertAlmostEqual(bucket.acquire(1_000), 60)
+
+
+class TestAdaptiveConcurrencyLimiter(unittest.TestCase):
+    def test_backs_off_and_recovers(self):
+        limiter = AdaptiveConcurrencyLimiter(8)
+        limiter.on_throttled()
+        limiter.on_throttled()
+        self.assertEqual(limiter.limit, 2)
+        for _ in range(100):
+            limiter.on_success()
+        self.assertEqual(limiter.limit, 8)
+        for _ in range(10):
+            limiter.on_throttled()
+        self.assertEqual(limiter.limit, 1)
+
+
+class TestRequestScheduler(unittest.TestCase):
+    def setUp(self):
+        self.sleeps = []
+        self.scheduler = RequestScheduler(
+            max_concurrency=4, max_retries=3, sleep=self.sleeps.append
+        )
+
+    def test_retries_throttled_requests(self):
+        outcomes = [FakeRateLimitError("429"), FakeRateLimitError("429"), "ok"]
+
+        def call():
+            outcome = outcomes.pop(0)
+            if isinstance(outcome, Exception):
+                raise outcome
+            return outcome
+
+        self.assertEqual(self.scheduler.run(call), "ok")
+        self.assertEqual(len(self.sleeps), 2)
+        self.assertTrue(all(0 <= s <= 2 for s in self.sleeps))
+        self.assertDictEqual(
+            self.scheduler.stats(),
+            {"requests": 3, "retries": 2, "throttled": 2, "concurrency_limit": 2},
+        )
+
+    def test_gives_up_after_max_retries(self):
+        def call():
+            raise FakeRateLimitError("429")
+
+        with self.assertRaises(FakeRateLimitError):
+            self.scheduler.run(call)
+        self.assertEqual(len(self.sleeps), 3)
+
+    def test_does_not_retry_other_errors(self):
+        def call():
+            raise ValueError("Bad request")
+
+        self.assertFalse(is_retryable_error(ValueError()))
+        with self.assertRaises(ValueError):
+            self.scheduler.run(call)
+        self.assertListEqual(self.sleeps, [])
+
+
+class TestScheduledPrompts(unittest.TestCase):
+    def setUp(self):
+        self.previous_scheduler = set_request_scheduler(
+            RequestScheduler(max_concurrency=8, initial_backoff=0.01, max_backoff=0.05)
+        )
+
+    def tearDown(self):
+        set_request_scheduler(self.previous_scheduler)
+
+    def test_fake_model_with_throttling(self):
+        llm = FakeChatModel(latency=0.01, rate_limited_calls=3, max_concurrency=2)
+        chain = ChatPromptTemplate.from_template("{text}") | llm | StrOutputParser()
+
+        outputs = execute_prompts(
+            chain, [{"text": str(i)} for i in range(12)], max_concurrency=8
+        )
+
+        self.assertListEqual(outputs, [f"Echo: {i}" for i in range(12)])
+        self.assertGreaterEqual(llm.calls["rate_limited"], 3)
+        self.assertLessEqual(llm.calls["max_in_flight"], 2)
@@ -0,0 +1,212 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from git import Repo
+
+from src.tests.utils import create_git_repo, write_files
+from src.utils.repository import (
+    UNPUSHED_REFS_PREFIX,
+    commit_file_to_branch,
+    get_head_commit,
+    get_repo,
+    get_repo_slug,
+    push_branch,
+    update_repo,
+)
+
+
+class TestRepoSlug(unittest.TestCase):
+    def test_repo_slug_is_unique_per_url(self):
+        first = get_repo_slug("https://github.com/first/project")
+        second = get_repo_slug("https://github.com/second/project")
+        self.assertTrue(first.startswith("project-"))
+        self.assertNotEqual(first, second)
+
+
+class TestGetRepo(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.work_repo = create_git_repo(
+            os.path.join(self.tmp_dir.name, "work"),
+            {"README.md": "# Project\n", "src/main.py": "print('hello')\n"},
+        )
+        self._commit({"src/utils.py": "VALUE = 1\n"}, "Add utils")
+        self.origin_path = os.path.join(self.tmp_dir.name, "origin.git")
+        origin = Repo.clone_from(
+            self.work_repo.working_dir, self.origin_path, bare=True
+        )
+        with origin.config_writer() as writer:
+            writer.set_value("uploadpack", "allowFilter", "true")
+        self.work_repo.create_remote("upstream", self.origin_path)
+        self.origin_url = f"file://{self.origin_path}"
+        self.clone_path = os.path.join(self.tmp_dir.name, "clones", "project")
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def _commit(self, files, message):
+        write_files(self.work_repo.working_dir, files)
+        self.work_repo.index.add(list(files))
+        return self.work_repo.index.commit(message).hexsha
+
+    def _push(self):
+        branch = self.work_repo.active_branch.name
+        self.work_repo.remote("upstream").push(f"{branch}:{branch}")
+
+    def test_full_clone(self):
+        repo = get_repo(self.origin_url, self.clone_path)
+        self.assertEqual(repo.git.rev_list("--count", "HEAD"), "2")
+        self.assertTrue(os.path.isfile(os.path.join(self.clone_path, "src/main.py")))
+
+    def test_shallow_clone(self):
+        repo = get_repo(self.origin_url, self.clone_path, depth=1, single_branch=True)
+        self.assertEqual(repo.git.rev_list("--count", "HEAD"), "1")
+        self.assertTrue(os.path.isfile(os.path.join(repo.git_dir, "shallow")))
+
+    def test_blobless_clone(self):
+        repo = get_repo(self.origin_url, self.clone_path, filter_spec="blob:none")
+        self.assertEqual(
+            repo.git.config("remote.origin.partialclonefilter"), "blob:none"
+        )
+        self.assertEqual(repo.git.rev_list("--count", "HEAD"), "2")
+        self.assertTrue(os.path.isfile(os.path.join(self.clone_path, "src/utils.py")))
+
+    def test_sparse_clone(self):
+        get_repo(
+            self.origin_url,
+            self.clone_path,
+            filter_spec="blob:none",
+            sparse_patterns=["/src/"],
+        )
+        self.assertTrue(os.path.isfile(os.path.join(self.clone_path, "src/main.py")))
+        self.assertFalse(os.path.exists(os.path.join(self.clone_path, "README.md")))
+
+    def test_existing_clone_is_fast_forwarded(self):
+        get_repo(self.origin_url, self.clone_path, depth=1)
+        new_commit = self._commit({"src/main.py": "print('bye')\n"}, "Update main")
+        self._push()
+
+        repo = get_repo(self.origin_url, self.clone_path)
+        self.assertNotEqual(get_head_commit(repo), new_commit)
+
+        repo = get_repo(self.origin_url, self.clone_path, depth=1, update=True)
+        self.assertEqual(get_head_commit(repo), new_commit)
+        with open(os.path.join(self.clone_path, "src/main.py")) as f:
+            self.assertEqual(f.read(), "print('bye')\n")
+
+    def test_diverged_clone_is_kept(self):
+        repo = get_repo(self.origin_url, self.clone_path)
+        with repo.config_writer() as writer:
+            writer.set_value("user", "name", "Test")
+            writer.set_value("user", "email", "test@example.com")
+        write_files(self.clone_path, {"local.txt": "local\n"})
+        repo.index.add(["local.txt"])
+        local_commit = repo.index.commit("Local change").hexsha
+        self._commit({"src/main.py": "print('bye')\n"}, "Update main")
+        self._push()
+
+        self.assertFalse(update_repo(repo))
+        self.assertEqual(get_head_commit(repo), local_commit)
+
+
+class TestCommitFileToBranch(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        origin_path = os.path.join(self.tmp_dir.name, "origin.git")
+        Repo.init(origin_path, bare=True)
+        self.repo = create_git_repo(
+            os.path.join(self.tmp_dir.name, "work"),
+            {"README.md": "# Old\n", "main.py": "print('hello')\n"},
+        )
+        self.repo.create_remote("origin", origin_path)
+        write_files(self.repo.working_dir, {"main.py": "print('local change')\n"})
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_commit_does_not_touch_working_tree(self):
+        head_commit = get_head_commit(self.repo)
+        branch = self.repo.active_branch.name
+
+        commit = commit_file_to_branch(
+            self.repo, "readme", "README.md", "# New\n", "Update README"
+        )
+
+        self.assertEqual(self.repo.active_branch.name, branch)
+        self.assertEqual(get_head_commit(self.repo), head_commit)
+        self.assertListEqual(
+            [diff.a_path for diff in self.repo.index.diff(None)], ["main.py"]
+        )
+        new_commit = self.repo.commit("readme")
+        self.assertEqual(new_commit.hexsha, commit)
+        self.assertEqual(new_commit.parents[0].hexsha, head_commit)
+        self.assertEqual((new_commit.tree / "README.md").data_stream.read(), b"# New\n")
+        self.assertEqual(
+            (new_commit.tree / "main.py").data_stream.read(), b"print('hello')\n"
+        )
+
+    def test_commit_without_configured_identity(self):
+        with self.repo.config_writer() as writer:
+            writer.remove_section("user")
+            # Makes git fail instead of guessing an identity from the host
+            writer.set_value("user", "useConfigOnly", "true")
+        environ = {
+            key: value
+            for key, value in os.environ.items()
+            if not key.startswith(("GIT_AUTHOR_", "GIT_COMMITTER_")) and key != "EMAIL"
+        }
+        environ.update(HOME=self.tmp_dir.name, GIT_CONFIG_NOSYSTEM="1")
+
+        with patch.dict(os.environ, environ, clear=True):
+            commit = commit_file_to_branch(
+                self.repo, "readme", "README.md", "# New\n", "Update README"
+            )
+
+        self.assertIn("@", self.repo.commit(commit).author.email)
+
+    def test_existing_file_requires_force(self):
+        with self.assertRaises(ValueError):
+            commit_file_to_branch(
+                self.repo, "readme", "README.md", "# New\n", "Update", force=False
+            )
+        commit_file_to_branch(
+            self.repo, "docs", "docs/usage.md", "# Usage\n", "Add docs", force=False
+        )
+        self.assertIn("docs", [head.name for head in self.repo.heads])
+
+    def test_push_branch(self):
+        commit = commit_file_to_branch(
+            self.repo, "readme", "README.md", "# New\n", "Update README"
+        )
+        push_branch(self.repo, "readme")
+        origin = Repo(self.repo.remote("origin").url)
+        self.assertEqual(origin.commit("readme").hexsha, commit)
+
+        with self.assertRaises(RuntimeError):
+            push_branch(self.repo, "missing")
+
+    def test_unpushed_branch_survives_mirror_fetch(self):
+        branch = self.repo.active_branch.name
+        self.repo.remote("origin").push(f"{branch}:{branch}")
+        mirror = get_repo(
+            self.repo.remote("origin").url,
+            os.path.join(self.tmp_dir.name, "mirror.git"),
+            bare=True,
+        )
+        commit = commit_file_to_branch(
+            mirror,
+            "readme",
+            "README.md",
+            "# New\n",
+            "Update README",
+            refs_prefix=UNPUSHED_REFS_PREFIX,
+        )
+
+        # Other sessions update the shared mirror with a pruning fetch
+        self.assertTrue(update_repo(mirror))
+        push_branch(mirror, "readme", refs_prefix=UNPUSHED_REFS_PREFIX)
+
+        origin = Repo(self.repo.remote("origin").url)
+        self.assertEqual(origin.commit("readme").hexsha, commit)
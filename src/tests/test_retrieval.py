@@ -0,0 +1,77 @@
+import os
+import tempfile
+import unittest
+
+from src.utils.retrieval import (
+    RetrievalDocument,
+    RetrievalIndex,
+    get_retrieval_index_path,
+    get_retrieved_summaries_text,
+    tokenize,
+)
+
+
+class TestRetrieval(unittest.TestCase):
+    def setUp(self):
+        self.documents = [
+            RetrievalDocument("repo/setup.py", "Packaging script with dependencies"),
+            RetrievalDocument("repo/src/app.py", "Streamlit user interface"),
+            RetrievalDocument("repo/requirements.txt", "numpy==1.26.2", "chunk"),
+            RetrievalDocument("repo/empty.txt", ""),
+        ]
+        self.index = RetrievalIndex.build(self.documents)
+
+    def test_tokenize(self):
+        self.assertListEqual(
+            tokenize("setup.py setupTools setup_tools HTTPServer v2"),
+            ["setup", "py", "setup", "tools", "setup", "tools", "http", "server"],
+        )
+
+    def test_search(self):
+        results = self.index.search("install the dependencies and requirements", 10)
+        self.assertListEqual(
+            [document.path for document, _ in results],
+            ["repo/requirements.txt", "repo/setup.py"],
+        )
+        self.assertGreater(results[0][1], results[1][1])
+        self.assertListEqual(self.index.search("unrelated query", 10), [])
+        self.assertEqual(len(self.index.search("repo", 1)), 1)
+
+    def test_save_load(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            index_path = get_retrieval_index_path(
+                tmp_dir, "https://git-provider/owner/repo", "abc123", "f" * 64
+            )
+            self.index.save(index_path)
+            loaded = RetrievalIndex.load(index_path)
+
+            self.assertListEqual(loaded.documents, self.documents)
+            self.assertListEqual(
+                loaded.search("streamlit interface", 10),
+                self.index.search("streamlit interface", 10),
+            )
+
+            with open(index_path, "wb") as f:
+                f.write(b"corrupted")
+            self.assertIsNone(RetrievalIndex.load(index_path))
+            self.assertIsNone(RetrievalIndex.load(os.path.join(tmp_dir, "missing")))
+
+    def test_retrieved_summaries_text(self):
+        results = self.index.search("dependencies requirements streamlit", 10)
+        text = get_retrieved_summaries_text(results, token_budget=1_000)
+        self.assertIn("- File: repo/setup.py\n- Contents: Packaging", text)
+        self.assertIn("- File: repo/requirements.txt (excerpt)\n", text)
+
+        text = get_retrieved_summaries_text(results, token_budget=150)
+        self.assertLessEqual(len(text), 150)
+        self.assertEqual(text.count("- File:"), 1)
+
+        text = get_retrieved_summaries_text(
+            results, token_budget=1_000, overview_text="Project summary:\nA demo"
+        )
+        self.assertTrue(text.startswith("Project summary:\nA demo\n\nProjects files"))
+        self.assertLessEqual(len(text), 1_000)
+
+
+if __name__ == "__main__":
+    unittest.main()
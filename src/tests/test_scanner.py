@@ -0,0 +1,69 @@
+import os
+import tempfile
+import unittest
+
+from src.tests.utils import create_git_repo, write_files
+from src.utils.scanner import scan_repository
+
+
+class TestScanRepository(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.repo_path = self.tmp_dir.name
+        self.files = {
+            ".gitignore": "node_modules/\n",
+            "README.md": "# Test\n",
+            "src/module.py": "print('module')\n",
+            "src/.gitignore": "*.log\n",
+            "src/package/__init__.py": "",
+        }
+        self.ignored_files = {
+            "node_modules/package/index.js": "module.exports = {};\n",
+            "src/debug.log": "debug\n",
+            ".hidden/config": "hidden\n",
+        }
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_scan_git_repository(self):
+        repo = create_git_repo(self.repo_path, self.files)
+        write_files(
+            self.repo_path, {**self.ignored_files, "src/untracked.py": "pass\n"}
+        )
+        os.remove(os.path.join(self.repo_path, "README.md"))
+
+        snapshot = scan_repository(self.repo_path, repo)
+
+        self.assertListEqual(
+            snapshot.files,
+            ["src/module.py", "src/package/__init__.py", "src/untracked.py"],
+        )
+        self.assertEqual(snapshot.files_sizes["src/module.py"], 16)
+        self.assertEqual(
+            snapshot.absolute_paths()[0], os.path.join(self.repo_path, "src/module.py")
+        )
+
+    def test_scan_directory(self):
+        write_files(self.repo_path, {**self.files, **self.ignored_files})
+
+        snapshot = scan_repository(self.repo_path)
+
+        self.assertListEqual(
+            snapshot.files,
+            [
+                "README.md",
+                "node_modules/package/index.js",
+                "src/debug.log",
+                "src/module.py",
+                "src/package/__init__.py",
+            ],
+        )
+
+    def test_invalid_path(self):
+        with self.assertRaises(ValueError):
+            scan_repository(os.path.join(self.repo_path, "missing"))
+
+
+if __name__ == "__main__":
+    unittest.main()
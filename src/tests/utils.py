@@ -1,6 +1,9 @@
 import inspect
 import os
 import re
+from typing import Dict, Optional
+
+from git import Repo
 
 _tests_folder = os.path.split(__file__)[0]
 
@@ -50,3 +53,23 @@ def get_text_resource(resource_path: str) -> str:
     with open(resource_path, "r") as f:
         resource = f.read()
     return resource
+
+
+def write_files(root_dir: str, files: Dict[str, str]) -> None:
+    for file, contents in files.items():
+        file_path = os.path.join(root_dir, file)
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        with open(file_path, "w") as f:
+            f.write(contents)
+
+
+def create_git_repo(repo_path: str, files: Optional[Dict[str, str]] = None) -> Repo:
+    repo = Repo.init(repo_path)
+    with repo.config_writer() as writer:
+        writer.set_value("user", "name", "Test")
+        writer.set_value("user", "email", "test@example.com")
+    if files:
+        write_files(repo_path, files)
+        repo.index.add(list(files))
+        repo.index.commit("Initial commit")
+    return repo
@@ -0,0 +1,67 @@
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional, Set
+
+from .repository import get_repo, get_repo_name_from_url
+
+
+def read_manifest(manifest_path: str) -> List[str]:
+    repo_urls = []
+    with open(manifest_path, "r") as f:
+        for line in f:
+            repo_url = line.split("#", 1)[0].strip()
+            if repo_url and repo_url not in repo_urls:
+                repo_urls.append(repo_url)
+    return repo_urls
+
+
+def clone_repository(repo_url: str, base_dir: str, **clone_options: Any) -> str:
+    repo_path = os.path.join(base_dir, get_repo_name_from_url(repo_url))
+    get_repo(repo_url, repo_path, **clone_options)
+    return repo_path
+
+
+class BatchJournal:
+    def __init__(self, journal_path: str) -> None:
+        os.makedirs(os.path.dirname(journal_path) or ".", exist_ok=True)
+        self.journal_path = journal_path
+        self._lock = threading.Lock()
+
+    def entries(self) -> List[Dict[str, Any]]:
+        if not os.path.exists(self.journal_path):
+            return []
+        entries = []
+        with open(self.journal_path, "r") as f:
+            for line in f:
+                try:
+                    entries.append(json.loads(line))
+                except json.JSONDecodeError:
+                    # A crash can leave the last line half written
+                    continue
+        return entries
+
+    def completed(self) -> Set[str]:
+        statuses = {entry["repo_url"]: entry["status"] for entry in self.entries()}
+        return {repo_url for repo_url, status in statuses.items() if status == "done"}
+
+    def record(
+        self,
+        repo_url: str,
+        status: str,
+        readme_path: Optional[str] = None,
+        error: Optional[str] = None,
+    ) -> None:
+        entry = {
+            "repo_url": repo_url,
+            "status": status,
+            "readme_path": readme_path,
+            "error": error,
+            "time": time.time(),
+        }
+        with self._lock:
+            with open(self.journal_path, "a") as f:
+                f.write(json.dumps(entry) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
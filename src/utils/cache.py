@@ -0,0 +1,103 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional
+
+from .metrics import get_metrics
+
+
+def get_blob_sha(contents: str) -> str:
+    data = contents.encode("utf-8")
+    header = f"blob {len(data)}\0".encode("utf-8")
+    return hashlib.sha1(header + data).hexdigest()
+
+
+class SummaryCache:
+    def __init__(
+        self,
+        cache_path: str,
+        max_entries: Optional[int] = None,
+        max_age: Optional[float] = None,
+    ) -> None:
+        os.makedirs(os.path.dirname(cache_path) or ".", exist_ok=True)
+        self.cache_path = cache_path
+        self.max_entries = max_entries
+        self.max_age = max_age
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(cache_path, check_same_thread=False)
+        with self._connection:
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS summaries ("
+                "key TEXT PRIMARY KEY, "
+                "summary TEXT NOT NULL, "
+                "created_at REAL NOT NULL, "
+                "accessed_at REAL NOT NULL)"
+            )
+
+    @staticmethod
+    def make_key(contents: str, prompt_template: str, model_name: str) -> str:
+        key_parts = (get_blob_sha(contents), prompt_template, model_name)
+        return hashlib.sha256("\0".join(key_parts).encode("utf-8")).hexdigest()
+
+    def _is_expired(self, created_at: float) -> bool:
+        return self.max_age is not None and time.time() - created_at > self.max_age
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT summary, created_at FROM summaries WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or self._is_expired(row[1]):
+                self.misses += 1
+                get_metrics().increment("summary_cache_misses_total")
+                return None
+            with self._connection:
+                self._connection.execute(
+                    "UPDATE summaries SET accessed_at = ? WHERE key = ?",
+                    (time.time(), key),
+                )
+            self.hits += 1
+            get_metrics().increment("summary_cache_hits_total")
+            return row[0]
+
+    def set(self, key: str, summary: str) -> None:
+        now = time.time()
+        with self._lock, self._connection:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO summaries VALUES (?, ?, ?, ?)",
+                (key, summary, now, now),
+            )
+
+    def evict(self) -> int:
+        with self._lock, self._connection:
+            evicted = 0
+            if self.max_age is not None:
+                evicted += self._connection.execute(
+                    "DELETE FROM summaries WHERE created_at < ?",
+                    (time.time() - self.max_age,),
+                ).rowcount
+            if self.max_entries is not None:
+                evicted += self._connection.execute(
+                    "DELETE FROM summaries WHERE key IN ("
+                    "SELECT key FROM summaries ORDER BY accessed_at DESC "
+                    "LIMIT -1 OFFSET ?)",
+                    (self.max_entries,),
+                ).rowcount
+            return evicted
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._connection.execute(
+                "SELECT COUNT(*) FROM summaries"
+            ).fetchone()[0]
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "entries": len(self)}
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
@@ -0,0 +1,98 @@
+import io
+import os
+from itertools import islice
+from typing import Callable, Iterable, Iterator, List, Optional, TypeVar
+
+from langchain.text_splitter import (
+    Language,
+    RecursiveCharacterTextSplitter,
+    TextSplitter,
+)
+
+T = TypeVar("T")
+
+_NOTEBOOK_CELL_SEPARATORS = [
+    r"\n(?='(?:code|markdown|raw)' cell: )",
+    r"\n\n",
+    r"\n",
+    r" ",
+    r"",
+]
+
+_language_splitters = {
+    "py": Language.PYTHON,
+    "js": Language.JS,
+    "ts": Language.TS,
+    "java": Language.JAVA,
+    "go": Language.GO,
+    "rs": Language.RUST,
+    "cpp": Language.CPP,
+    "c": Language.CPP,
+    "md": Language.MARKDOWN,
+}
+
+
+def get_text_splitter(
+    file_path: str,
+    chunk_size: int,
+    chunk_overlap: int,
+    length_function: Callable[[str], int] = len,
+) -> TextSplitter:
+    ext = os.path.splitext(file_path)[-1].replace(".", "").lower()
+    kwargs = dict(
+        chunk_size=chunk_size,
+        chunk_overlap=chunk_overlap,
+        length_function=length_function,
+    )
+    if ext == "ipynb":
+        return RecursiveCharacterTextSplitter(
+            separators=_NOTEBOOK_CELL_SEPARATORS, is_separator_regex=True, **kwargs
+        )
+    if ext in _language_splitters:
+        return RecursiveCharacterTextSplitter.from_language(
+            _language_splitters[ext], **kwargs
+        )
+    return RecursiveCharacterTextSplitter(**kwargs)
+
+
+def iter_file_chunks(
+    file_path: str,
+    contents: str,
+    chunk_size: int,
+    chunk_overlap: int,
+    length_function: Callable[[str], int] = len,
+    max_chunks: Optional[int] = None,
+) -> Iterator[str]:
+    splitter = get_text_splitter(file_path, chunk_size, chunk_overlap, length_function)
+    # Split by blocks of lines so the whole list of chunks is never built at once
+    block_size = chunk_size * 16
+    lines = io.StringIO(contents)
+    chunks_count = 0
+    while block := "".join(islice(lines, block_size)):
+        for chunk in splitter.split_text(block):
+            if max_chunks is not None and chunks_count >= max_chunks:
+                return
+            chunks_count += 1
+            yield chunk
+
+
+def group_texts(
+    texts: List[str], token_budget: int, length_function: Callable[[str], int] = len
+) -> List[List[str]]:
+    groups, group, group_length = [], [], 0
+    for text in texts:
+        length = length_function(text)
+        if group and group_length + length > token_budget:
+            groups.append(group)
+            group, group_length = [], 0
+        group.append(text)
+        group_length += length
+    if group:
+        groups.append(group)
+    return groups
+
+
+def iter_batches(items: Iterable[T], batch_size: int) -> Iterator[List[T]]:
+    items = iter(items)
+    while batch := list(islice(items, batch_size)):
+        yield batch
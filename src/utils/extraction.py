@@ -0,0 +1,240 @@
+import ast
+import fnmatch
+import json
+import re
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+try:
+    import tomllib
+except ImportError:  # Python < 3.11
+    import toml as tomllib
+
+# Takes a file path and its contents, returns None when it can't describe it
+StaticExtractor = Callable[[str, str], Optional[str]]
+
+_MAX_LISTED_ITEMS = 20
+
+_REQUIREMENT_NAME_PATTERN = re.compile(r"^\s*([A-Za-z0-9][A-Za-z0-9._-]*)")
+
+
+def _format_items(items: List[str]) -> str:
+    text = ", ".join(items[:_MAX_LISTED_ITEMS])
+    if len(items) > _MAX_LISTED_ITEMS:
+        text += f" and {len(items) - _MAX_LISTED_ITEMS} more"
+    return text
+
+
+def _get_first_paragraph(text: Optional[str]) -> str:
+    if not text:
+        return ""
+    return " ".join(text.strip().split("\n\n")[0].split())
+
+
+def _get_sentence(text: str) -> str:
+    return text if text.endswith(".") else f"{text}."
+
+
+def _get_definition_description(node: ast.AST) -> str:
+    return _get_first_paragraph(ast.get_docstring(node)).split(". ")[0].rstrip(".")
+
+
+def _describe_definition(node: ast.AST) -> str:
+    description = _get_definition_description(node)
+    return f"{node.name} ({description})" if description else node.name
+
+
+def _is_main_guard(node: ast.stmt) -> bool:
+    return (
+        isinstance(node, ast.If)
+        and isinstance(node.test, ast.Compare)
+        and isinstance(node.test.left, ast.Name)
+        and node.test.left.id == "__name__"
+    )
+
+
+def get_python_summary(file: str, contents: str) -> Optional[str]:
+    try:
+        tree = ast.parse(contents)
+    except (SyntaxError, ValueError):
+        return None
+
+    classes, functions, imports = [], [], set()
+    for node in tree.body:
+        if isinstance(node, ast.ClassDef) and not node.name.startswith("_"):
+            classes.append(_describe_definition(node))
+        elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            if not node.name.startswith("_"):
+                functions.append(_describe_definition(node))
+        elif isinstance(node, ast.Import):
+            imports.update(alias.name.split(".")[0] for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            imports.add(node.module.split(".")[0])
+
+    imports.discard("__future__")
+    docstring = _get_first_paragraph(ast.get_docstring(tree))
+    # Names alone say little about what undocumented code does
+    if not docstring and not any(
+        _get_definition_description(node)
+        for node in tree.body
+        if isinstance(node, (ast.ClassDef, ast.FunctionDef, ast.AsyncFunctionDef))
+    ):
+        return None
+
+    lines = []
+    if docstring:
+        lines.append(_get_sentence(docstring))
+    if classes:
+        lines.append(f"Classes: {_format_items(classes)}.")
+    if functions:
+        lines.append(f"Functions: {_format_items(functions)}.")
+    if imports:
+        lines.append(f"Imports: {_format_items(sorted(imports))}.")
+    if any(_is_main_guard(node) for node in tree.body):
+        lines.append("Runs as a script.")
+    if not lines:
+        return None
+    return "Python module. " + " ".join(lines)
+
+
+def get_requirements_summary(file: str, contents: str) -> Optional[str]:
+    requirements = []
+    for line in contents.splitlines():
+        line = line.split("#")[0].strip()
+        # Skips options like -r other.txt, -e . or --index-url
+        if line.startswith("-"):
+            continue
+        if match := _REQUIREMENT_NAME_PATTERN.match(line):
+            requirements.append(match.group(1))
+    if not requirements:
+        return None
+    return (
+        "Requirements file listing the Python dependencies of the project: "
+        f"{_format_items(requirements)}."
+    )
+
+
+def _get_requirements_names(requirements: List[str]) -> List[str]:
+    names = []
+    for requirement in requirements:
+        if match := _REQUIREMENT_NAME_PATTERN.match(requirement):
+            names.append(match.group(1))
+    return names
+
+
+def get_pyproject_summary(file: str, contents: str) -> Optional[str]:
+    try:
+        pyproject = tomllib.loads(contents)
+    except ValueError:
+        return None
+
+    project: Dict[str, Any] = pyproject.get("project", {})
+    poetry: Dict[str, Any] = pyproject.get("tool", {}).get("poetry", {})
+    name = project.get("name") or poetry.get("name")
+    description = project.get("description") or poetry.get("description")
+    dependencies = _get_requirements_names(project.get("dependencies", []))
+    dependencies += [
+        dependency
+        for dependency in poetry.get("dependencies", {})
+        if dependency != "python"
+    ]
+    python_version = project.get("requires-python") or poetry.get(
+        "dependencies", {}
+    ).get("python")
+    scripts = list(project.get("scripts", {}) or poetry.get("scripts", {}))
+    build_backend = pyproject.get("build-system", {}).get("build-backend")
+
+    lines = []
+    if name:
+        lines.append(
+            f"Python project {name}"
+            + (f": {_get_sentence(description)}" if description else ".")
+        )
+    elif description:
+        lines.append(_get_sentence(description))
+    if python_version:
+        lines.append(f"Requires Python {python_version}.")
+    if dependencies:
+        lines.append(f"Dependencies: {_format_items(dependencies)}.")
+    if extras := list(project.get("optional-dependencies", {})):
+        lines.append(f"Optional dependencies groups: {_format_items(extras)}.")
+    if scripts:
+        lines.append(f"Command line scripts: {_format_items(scripts)}.")
+    if build_backend:
+        lines.append(f"Built with {build_backend}.")
+    tools = [tool for tool in pyproject.get("tool", {}) if tool != "poetry"]
+    if tools:
+        lines.append(f"Configures the tools: {_format_items(tools)}.")
+    if not lines:
+        return None
+    return "Python project configuration (pyproject.toml). " + " ".join(lines)
+
+
+def get_package_json_summary(file: str, contents: str) -> Optional[str]:
+    try:
+        package = json.loads(contents)
+    except ValueError:
+        return None
+    if not isinstance(package, dict):
+        return None
+
+    lines = []
+    if name := package.get("name"):
+        description = package.get("description")
+        lines.append(
+            f"Node.js package {name}"
+            + (f": {_get_sentence(description)}" if description else ".")
+        )
+    if entry_point := package.get("main"):
+        lines.append(f"Entry point: {entry_point}.")
+    for key, label in (
+        ("dependencies", "Dependencies"),
+        ("devDependencies", "Development dependencies"),
+        ("scripts", "npm scripts"),
+    ):
+        if items := list(package.get(key) or {}):
+            lines.append(f"{label}: {_format_items(items)}.")
+    if not lines:
+        return None
+    return "Node.js package manifest (package.json). " + " ".join(lines)
+
+
+def get_license_summary(file: str, contents: str) -> Optional[str]:
+    # Like get_license_type_from_file, the first line names the license
+    license_type = next(
+        (line.strip() for line in contents.splitlines() if line.strip()), None
+    )
+    if license_type is None:
+        return None
+    return (
+        f"License file of the project, which is distributed under the {license_type}."
+    )
+
+
+_static_extractors: List[Tuple[str, StaticExtractor]] = [
+    ("*.py", get_python_summary),
+    ("requirements*.txt", get_requirements_summary),
+    ("pyproject.toml", get_pyproject_summary),
+    ("package.json", get_package_json_summary),
+    ("LICENSE*", get_license_summary),
+    ("LICENCE*", get_license_summary),
+    ("COPYING*", get_license_summary),
+]
+
+
+def register_static_extractor(pattern: str, extractor: StaticExtractor) -> None:
+    """Registers an extractor for the files whose name matches the pattern.
+    Extractors registered later take precedence."""
+    _static_extractors.insert(0, (pattern, extractor))
+
+
+def get_static_summary(file: str, contents: str) -> Optional[str]:
+    name = file.rsplit("/", 1)[-1]
+    for pattern, extractor in _static_extractors:
+        if fnmatch.fnmatchcase(name, pattern):
+            return extractor(file, contents)
+    return None
+
+
+def get_summary_information(summary: str) -> int:
+    """Measures how much a summary says, in words."""
+    return len(summary.split())
@@ -1,22 +1,32 @@
 import ctypes
+import fnmatch
+import io
+import json
 import os
 import platform
-from typing import List, Optional
-
-import magic
-from langchain.document_loaders import (
-    JSONLoader,
-    NotebookLoader,
-    PythonLoader,
-    TextLoader,
+import threading
+import tokenize
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from git import Repo
+
+from .metrics import get_metrics
+
+# libmagic is slow to import, so it is only imported when the first file
+# without a known extension is sniffed
+_TEXT_FILE_SNIFF_SIZE = 8192
+
+_text_extensions = set(
+    "c cfg cpp cs css csv go h hpp html ini ipynb java js json jsx kt md php py rb "
+    "rs rst scss sh sql toml ts tsx txt xml yaml yml".split()
+)
+
+_binary_extensions = set(
+    "7z a bin bmp class dll dylib eot exe gif gz ico jar jpeg jpg mp3 mp4 o otf pdf "
+    "png pyc pyd pyo so tar ttf wav webp whl woff woff2 xz zip".split()
 )
-from langchain.document_loaders.base import BaseLoader
 
-_document_loaders = {
-    "py": PythonLoader,
-    "ipynb": NotebookLoader,
-    "json": JSONLoader,
-}
+_magic_local = threading.local()
 
 
 def _is_hidden_unix(path: str) -> bool:
@@ -38,45 +48,197 @@ def is_hidden(path: str) -> bool:
         raise RuntimeError("Unknown operating system.")
 
 
+def _get_mime_detector() -> Any:
+    if not hasattr(_magic_local, "detector"):
+        import magic
+
+        _magic_local.detector = magic.Magic(mime=True)
+    return _magic_local.detector
+
+
+def _get_extension(file_path: str) -> str:
+    return os.path.splitext(file_path)[-1].replace(".", "").lower()
+
+
 def is_text_file(path: str) -> bool:
-    mime = magic.Magic(mime=True)
-    mime_type = mime.from_file(path)
-    return mime_type.startswith("text/") or mime_type.endswith("json")
+    if _get_extension(path) in _binary_extensions:
+        return False
 
+    with open(path, "rb") as f:
+        head = f.read(_TEXT_FILE_SNIFF_SIZE)
+    return is_text_data(path, head)
 
-def get_files_list(root_dir: str, include_hidden: bool = False) -> List[str]:
-    if not os.path.isdir(root_dir):
-        raise ValueError(f"No such folder: {root_dir}")
-    files_paths_list = []
-    for root, dirs, files in os.walk(root_dir, topdown=True):
-        if not include_hidden:
-            dirs[:] = [d for d in dirs if not is_hidden(d)]
-        for file in files:
-            if not include_hidden:
-                if not include_hidden and is_hidden(file):
-                    continue
-                file_path = os.path.join(root, file)
-                files_paths_list.append(file_path)
-    return files_paths_list
 
+def is_text_data(path: str, data: bytes) -> bool:
+    ext = _get_extension(path)
+    if ext in _binary_extensions:
+        return False
 
-def get_file_contents(file_path: str) -> str:
-    if not (os.path.isfile(file_path) and is_text_file(file_path)):
-        raise ValueError(f"Not a valid text file: {file_path}")
-    ext = os.path.splitext(file_path)[-1].replace(".", "").lower()
-    LoaderClass: BaseLoader = _document_loaders.get(ext, TextLoader)
-    loader = LoaderClass(file_path)
-    content = loader.load()
-    return content
+    head = data[:_TEXT_FILE_SNIFF_SIZE]
+    if not head or b"\0" in head:
+        return False
+    if ext in _text_extensions:
+        return True
+
+    with get_metrics().span("libmagic"):
+        mime_type = _get_mime_detector().from_buffer(head)
+    return mime_type.startswith("text/") or mime_type.endswith("json")
+
+
+def iter_files(
+    root_dir: str, include_hidden: bool = False
+) -> Iterator[Tuple[str, int]]:
+    dirs_stack = [root_dir]
+    while dirs_stack:
+        current_dir = dirs_stack.pop()
+        with os.scandir(current_dir) as entries:
+            entries = sorted(entries, key=lambda entry: entry.name)
+        sub_dirs = []
+        for entry in entries:
+            if not include_hidden and is_hidden(entry.path):
+                continue
+            if entry.is_dir(follow_symlinks=False):
+                sub_dirs.append(entry.path)
+            elif entry.is_file():
+                yield entry.path, entry.stat().st_size
+        dirs_stack.extend(reversed(sub_dirs))
 
 
 def get_relative_path(file_path: str, root_dir: str) -> str:
     return file_path.replace(root_dir, "").removeprefix("/")
 
 
+def _get_notebook_text(text: str) -> str:
+    # Same layout as LangChain's NotebookLoader, one cell per paragraph so the
+    # notebook splitter chunks on cells
+    notebook = json.loads(text)
+    cells_texts = []
+    for cell in notebook["cells"]:
+        source = cell.get("source", "")
+        if isinstance(source, list):
+            source = "".join(source)
+        cells_texts.append(f"'{cell.get('cell_type', 'code')}' cell: '{source}'\n\n")
+    return "".join(cells_texts)
+
+
+def decode_text_data(file_path: str, data: bytes) -> str:
+    ext = _get_extension(file_path)
+    try:
+        if ext == "py":
+            encoding, _ = tokenize.detect_encoding(io.BytesIO(data).readline)
+        else:
+            encoding = "utf-8"
+        text = data.decode(encoding)
+    except (LookupError, SyntaxError, UnicodeDecodeError) as e:
+        raise ValueError(f"Not a valid text file: {file_path}") from e
+    text = text.replace("\r\n", "\n").replace("\r", "\n")
+    if ext == "ipynb":
+        try:
+            return _get_notebook_text(text)
+        except (ValueError, KeyError, AttributeError, TypeError):
+            pass
+    return text
+
+
 def load_text_file(file_path: str) -> str:
-    contents = "\n".join(d.page_content for d in get_file_contents(file_path))
-    return contents
+    if not (os.path.isfile(file_path) and is_text_file(file_path)):
+        raise ValueError(f"Not a valid text file: {file_path}")
+    with open(file_path, "rb") as f:
+        data = f.read()
+    return decode_text_data(file_path, data)
+
+
+def load_text_data(file_path: str, data: bytes) -> Optional[str]:
+    if not is_text_data(file_path, data):
+        return None
+    try:
+        return decode_text_data(file_path, data)
+    except ValueError:
+        return None
+
+
+def _is_excluded(name: str, exclude_patterns: Optional[List[str]]) -> bool:
+    if not exclude_patterns:
+        return False
+    return any(
+        fnmatch.fnmatch(name, pattern)
+        for patterns in exclude_patterns
+        for pattern in patterns.split("|")
+    )
+
+
+def _build_tree(
+    files: List[str], directories_only: bool, exclude_patterns: Optional[List[str]]
+) -> Dict[str, Any]:
+    tree = {}
+    for file in files:
+        parts = file.split("/")
+        if any(_is_excluded(part, exclude_patterns) for part in parts):
+            continue
+        node = tree
+        for part in parts[:-1]:
+            node = node.setdefault(part, {})
+        if not directories_only:
+            node.setdefault(parts[-1], None)
+    return tree
+
+
+def _pluralize(count: int, singular: str, plural: str) -> str:
+    return f"{count} {singular if count == 1 else plural}"
+
+
+def render_tree(
+    root: str,
+    files: List[str],
+    directories_only: bool = False,
+    exclude_patterns: Optional[List[str]] = None,
+    max_depth: Optional[int] = None,
+    max_entries: Optional[int] = None,
+) -> str:
+    tree = _build_tree(files, directories_only, exclude_patterns)
+    lines = [root]
+    counts = {"directories": 0, "files": 0}
+
+    def render_node(node: Dict[str, Any], prefix: str, depth: int) -> bool:
+        entries = sorted(node.items(), key=lambda entry: (entry[0].lower(), entry[0]))
+        for i, (name, child) in enumerate(entries):
+            if max_entries is not None and sum(counts.values()) >= max_entries:
+                lines.append(f"{prefix}└── ...")
+                return False
+            is_last = i == len(entries) - 1
+            lines.append(f"{prefix}{'└── ' if is_last else '├── '}{name}")
+            if child is None:
+                counts["files"] += 1
+                continue
+            counts["directories"] += 1
+            if max_depth is not None and depth >= max_depth:
+                continue
+            child_prefix = prefix + ("    " if is_last else "│   ")
+            if not render_node(child, child_prefix, depth + 1):
+                return False
+        return True
+
+    render_node(tree, "", 1)
+
+    summary = _pluralize(counts["directories"], "directory", "directories")
+    if not directories_only:
+        summary += ", " + _pluralize(counts["files"], "file", "files")
+    return "\n".join(lines) + "\n\n" + summary
+
+
+def _get_folder_files(path: str, use_gitignore: bool) -> List[str]:
+    files = [
+        os.path.relpath(file_path, path).replace(os.sep, "/")
+        for file_path, _ in iter_files(path)
+    ]
+    if not (use_gitignore and os.path.isdir(os.path.join(path, ".git"))):
+        return files
+
+    # Imported here because the repository utilities depend on this module
+    from .repository import get_repo_files
+
+    non_ignored = set(get_repo_files(Repo(path)))
+    return [file for file in files if file in non_ignored]
 
 
 def get_folder_structure_str(
@@ -84,27 +246,24 @@ def get_folder_structure_str(
     directories_only: bool = False,
     use_gitignore: bool = False,
     exclude_patterns: Optional[List[str]] = None,
+    files: Optional[List[str]] = None,
+    max_depth: Optional[int] = None,
+    max_entries: Optional[int] = None,
 ) -> str:
     if not (os.path.exists(path) and os.path.isdir(path)):
         raise ValueError(f"Invalid path: {path}")
 
-    options = []
-
-    if directories_only:
-        options.append("-d")
-
-    if use_gitignore:
-        options.append("--gitignore")
-
-    if exclude_patterns is not None and exclude_patterns:
-        options.append("-I")
-        for pattern in exclude_patterns:
-            options.append(pattern)
-
-    cmd = "tree " + " ".join(options) + " " + path
-    tree_cmd_output = os.popen(cmd).read().strip()
+    if files is None:
+        files = _get_folder_files(path, use_gitignore)
 
-    return tree_cmd_output
+    return render_tree(
+        path,
+        files,
+        directories_only=directories_only,
+        exclude_patterns=exclude_patterns,
+        max_depth=max_depth,
+        max_entries=max_entries,
+    )
 
 
 def create_local_file(file_path: str, file_content: str, force: bool = False) -> None:
@@ -0,0 +1,95 @@
+import posixpath
+from typing import Callable, Dict, List
+
+ROOT_DIRECTORY = ""
+
+
+def get_directory_depth(directory: str) -> int:
+    return directory.count("/") + 1 if directory else 0
+
+
+def get_directories_entries(files: List[str]) -> Dict[str, List[str]]:
+    """Maps every directory, the repository root included, to its direct
+    children (files and subdirectories) in the order they first appear."""
+    entries: Dict[str, Dict[str, None]] = {ROOT_DIRECTORY: {}}
+    for file in files:
+        path = file
+        while path:
+            parent = posixpath.dirname(path)
+            children = entries.setdefault(parent, {})
+            if path in children:
+                # Every ancestor was already recorded by a previous file
+                break
+            children[path] = None
+            path = parent
+    return {directory: list(children) for directory, children in entries.items()}
+
+
+def get_directories_levels(directories: List[str]) -> List[List[str]]:
+    """Groups directories by depth, deepest first, so every directory comes
+    after all of its subdirectories."""
+    levels: Dict[int, List[str]] = {}
+    for directory in directories:
+        levels.setdefault(get_directory_depth(directory), []).append(directory)
+    return [levels[depth] for depth in sorted(levels, reverse=True)]
+
+
+def get_summary_entry(path: str, summary: str, is_directory: bool = False) -> str:
+    kind = "Directory" if is_directory else "File"
+    return f"- {kind}: {path}\n- Contents: {summary}"
+
+
+def get_hierarchy_summaries_text(
+    files_summaries: Dict[str, str],
+    directories_summaries: Dict[str, str],
+    token_budget: int,
+    length_function: Callable[[str], int] = len,
+) -> str:
+    """Renders the repository summary followed by the directories and then the
+    files summaries, shallowest first, for as long as they fit the budget."""
+    text = "Project summary:\n"
+    text += directories_summaries.get(ROOT_DIRECTORY, "")
+    text += "\n\nProjects directories and files contents summaries:\n"
+    remaining_tokens = token_budget - length_function(text)
+
+    candidates = [
+        get_summary_entry(directory, summary, is_directory=True)
+        for directory, summary in sorted(
+            directories_summaries.items(),
+            key=lambda item: get_directory_depth(item[0]),
+        )
+        if directory != ROOT_DIRECTORY
+    ]
+    candidates += [
+        get_summary_entry(file, summary)
+        for file, summary in sorted(
+            files_summaries.items(), key=lambda item: get_directory_depth(item[0])
+        )
+    ]
+
+    entries = []
+    for entry in candidates:
+        tokens = length_function("\n\n" + entry)
+        if tokens > remaining_tokens:
+            continue
+        entries.append(entry)
+        remaining_tokens -= tokens
+    return text + "\n\n".join(entries)
+
+
+def get_overview_summaries_text(
+    directories_summaries: Dict[str, str],
+    token_budget: int,
+    length_function: Callable[[str], int] = len,
+    max_depth: int = 2,
+) -> str:
+    """Renders the repository summary followed by the summaries of its
+    shallowest directories, for as long as they fit the budget."""
+    top_directories_summaries = {
+        directory: summary
+        for directory, summary in directories_summaries.items()
+        if get_directory_depth(directory) <= max_depth
+    }
+    return get_hierarchy_summaries_text(
+        {}, top_directories_summaries, token_budget, length_function
+    )
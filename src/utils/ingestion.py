@@ -0,0 +1,137 @@
+import fnmatch
+from typing import Dict, List, Optional, Tuple
+
+from .cache import get_blob_sha
+
+DEFAULT_DENY_PATTERNS = [
+    # Lockfiles
+    "*.lock",
+    "package-lock.json",
+    "*/package-lock.json",
+    "pnpm-lock.yaml",
+    "*/pnpm-lock.yaml",
+    "go.sum",
+    "*/go.sum",
+    # Minified, compiled and generated code
+    "*.min.js",
+    "*.min.css",
+    "*.map",
+    "*_pb2.py",
+    "*_pb2_grpc.py",
+    "*.pb.go",
+    "*.generated.*",
+    # Vendored dependencies and build outputs
+    "vendor/*",
+    "*/vendor/*",
+    "third_party/*",
+    "*/third_party/*",
+    "node_modules/*",
+    "*/node_modules/*",
+    "dist/*",
+    "*/dist/*",
+    "build/*",
+    "*/build/*",
+    # Test fixtures and snapshots
+    "fixtures/*",
+    "*/fixtures/*",
+    "__snapshots__/*",
+    "*/__snapshots__/*",
+]
+
+_manifest_files = {
+    "Cargo.toml",
+    "Dockerfile",
+    "Makefile",
+    "Pipfile",
+    "build.gradle",
+    "docker-compose.yml",
+    "environment.yml",
+    "go.mod",
+    "package.json",
+    "pom.xml",
+    "pyproject.toml",
+    "requirements.txt",
+    "setup.cfg",
+    "setup.py",
+}
+
+_entry_point_files = {
+    "__main__.py",
+    "app.py",
+    "cli.py",
+    "index.js",
+    "index.ts",
+    "main.go",
+    "main.py",
+    "main.rs",
+    "manage.py",
+    "server.py",
+}
+
+_test_dirs = {"test", "tests", "testing", "spec", "__tests__"}
+
+
+def _matches_any(file: str, patterns: List[str]) -> bool:
+    return any(fnmatch.fnmatch(file, pattern) for pattern in patterns)
+
+
+def get_file_priority(file: str) -> Tuple[int, int, str]:
+    parts = file.split("/")
+    name = parts[-1]
+    if name in _manifest_files or fnmatch.fnmatch(name, "requirements*.txt"):
+        category = 0
+    elif name in _entry_point_files:
+        category = 1
+    elif any(part in _test_dirs for part in parts[:-1]) or name.startswith("test_"):
+        category = 3
+    else:
+        category = 2
+    return category, len(parts), file
+
+
+def select_files(
+    files_sizes: Dict[str, int],
+    max_file_size: Optional[int] = None,
+    max_total_bytes: Optional[int] = None,
+    max_files: Optional[int] = None,
+    include_patterns: Optional[List[str]] = None,
+    exclude_patterns: Optional[List[str]] = None,
+) -> List[str]:
+    candidates = [
+        file
+        for file, size in files_sizes.items()
+        if (not include_patterns or _matches_any(file, include_patterns))
+        and not (exclude_patterns and _matches_any(file, exclude_patterns))
+        and (max_file_size is None or size <= max_file_size)
+    ]
+
+    selected, total_bytes = [], 0
+    for file in sorted(candidates, key=get_file_priority):
+        if max_files is not None and len(selected) >= max_files:
+            break
+        size = files_sizes[file]
+        if max_total_bytes is not None and total_bytes + size > max_total_bytes:
+            continue
+        selected.append(file)
+        total_bytes += size
+    return selected
+
+
+def get_unique_contents(
+    files_contents: Dict[str, str],
+) -> Tuple[Dict[str, str], Dict[str, str]]:
+    """Splits files contents into the first file of each distinct content and
+    a mapping from every duplicate file to the file it duplicates."""
+    unique_contents: Dict[str, str] = {}
+    duplicates: Dict[str, str] = {}
+    first_files: Dict[str, str] = {}
+    for file, contents in files_contents.items():
+        blob_sha = get_blob_sha(contents)
+        if blob_sha in first_files:
+            duplicates[file] = first_files[blob_sha]
+        else:
+            first_files[blob_sha] = file
+            unique_contents[file] = contents
+    if duplicates:
+        print(f"Skipping {len(duplicates)} files with duplicated contents")
+    return unique_contents, duplicates
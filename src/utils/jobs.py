@@ -0,0 +1,191 @@
+import multiprocessing
+import threading
+import time
+import traceback
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Any, Callable, Dict, Hashable, List, Optional, Set
+from uuid import uuid4
+
+_FINISHED_STATUSES = ("done", "failed", "cancelled")
+
+
+class JobCancelled(Exception):
+    pass
+
+
+class JobContext:
+    def __init__(self, job_id: str, events: Any, cancel_event: Any) -> None:
+        self.job_id = job_id
+        self._events = events
+        self._cancel_event = cancel_event
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel_event.is_set()
+
+    def check_cancelled(self) -> None:
+        if self.cancelled:
+            raise JobCancelled(f"Job {self.job_id} cancelled")
+
+    def emit(self, event: Any) -> None:
+        self.check_cancelled()
+        self._events.put((self.job_id, event))
+
+
+class Job:
+    def __init__(self, job_id: str, key: Optional[Hashable]) -> None:
+        self.job_id = job_id
+        self.key = key
+        self.status = "queued"
+        self.events: List[Any] = []
+        self.result: Any = None
+        self.error: Optional[str] = None
+        self.subscribers: Set[str] = set()
+        self.created_at = time.time()
+        self.finished_at: Optional[float] = None
+
+    @property
+    def finished(self) -> bool:
+        return self.status in _FINISHED_STATUSES
+
+
+class _JobStarted:
+    pass
+
+
+def _run_job(
+    func: Callable[..., Any],
+    job_id: str,
+    events: Any,
+    cancel_event: Any,
+    args: tuple,
+) -> Any:
+    context = JobContext(job_id, events, cancel_event)
+    context.check_cancelled()
+    events.put((job_id, _JobStarted()))
+    return func(context, *args)
+
+
+class JobManager:
+    """Runs jobs in worker processes and tracks their events. Jobs submitted
+    with the same key while one is still active share that job."""
+
+    def __init__(self, max_workers: int = 2, max_finished_jobs: int = 100) -> None:
+        self.max_finished_jobs = max_finished_jobs
+        self._sync_manager = multiprocessing.Manager()
+        self._events = self._sync_manager.Queue()
+        self._executor = ProcessPoolExecutor(max_workers=max(1, max_workers))
+        self._jobs: Dict[str, Job] = {}
+        self._active_keys: Dict[Hashable, str] = {}
+        self._cancel_events: Dict[str, Any] = {}
+        self._futures: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self._collector = threading.Thread(target=self._collect_events, daemon=True)
+        self._collector.start()
+
+    def _collect_events(self) -> None:
+        while True:
+            try:
+                item = self._events.get()
+            except (EOFError, OSError):
+                return
+            if item is None:
+                return
+            job_id, event = item
+            with self._lock:
+                job = self._jobs.get(job_id)
+                if job is None:
+                    continue
+                if not isinstance(event, _JobStarted):
+                    job.events.append(event)
+                elif not job.finished:
+                    job.status = "running"
+
+    def submit(
+        self,
+        func: Callable[..., Any],
+        *args: Any,
+        key: Optional[Hashable] = None,
+        subscriber: Optional[str] = None,
+    ) -> str:
+        with self._lock:
+            if key is not None and key in self._active_keys:
+                job = self._jobs[self._active_keys[key]]
+                if subscriber is not None:
+                    job.subscribers.add(subscriber)
+                return job.job_id
+
+            job = Job(uuid4().hex, key)
+            if subscriber is not None:
+                job.subscribers.add(subscriber)
+            cancel_event = self._sync_manager.Event()
+            self._jobs[job.job_id] = job
+            self._cancel_events[job.job_id] = cancel_event
+            if key is not None:
+                self._active_keys[key] = job.job_id
+            future = self._executor.submit(
+                _run_job, func, job.job_id, self._events, cancel_event, args
+            )
+            self._futures[job.job_id] = future
+        future.add_done_callback(lambda f: self._on_job_done(job.job_id, f))
+        return job.job_id
+
+    def _on_job_done(self, job_id: str, future: Future) -> None:
+        with self._lock:
+            job = self._jobs[job_id]
+            if future.cancelled() or self._cancel_events[job_id].is_set():
+                job.status = "cancelled"
+            elif future.exception() is not None:
+                error = future.exception()
+                job.status = "failed"
+                job.error = "".join(
+                    traceback.format_exception_only(type(error), error)
+                ).strip()
+            else:
+                job.status = "done"
+                job.result = future.result()
+            job.finished_at = time.time()
+            if self._active_keys.get(job.key) == job_id:
+                del self._active_keys[job.key]
+            del self._cancel_events[job_id]
+            del self._futures[job_id]
+            self._prune_finished_jobs()
+
+    def _prune_finished_jobs(self) -> None:
+        finished = sorted(
+            (job for job in self._jobs.values() if job.finished),
+            key=lambda job: job.finished_at,
+        )
+        for job in finished[: max(0, len(finished) - self.max_finished_jobs)]:
+            del self._jobs[job.job_id]
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def cancel(self, job_id: str, subscriber: Optional[str] = None) -> bool:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job.finished:
+                return False
+            job.subscribers.discard(subscriber)
+            # Jobs shared with other sessions keep running for them
+            if job.subscribers:
+                return False
+            self._cancel_events[job_id].set()
+            future = self._futures[job_id]
+        future.cancel()
+        return True
+
+    def jobs(self) -> List[Job]:
+        with self._lock:
+            return list(self._jobs.values())
+
+    def shutdown(self) -> None:
+        with self._lock:
+            for cancel_event in self._cancel_events.values():
+                cancel_event.set()
+        self._executor.shutdown(wait=True, cancel_futures=True)
+        self._events.put(None)
+        self._collector.join()
+        self._sync_manager.shutdown()
@@ -0,0 +1,192 @@
+from __future__ import annotations
+
+import heapq
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, TypeVar
+
+LabelsKey = Tuple[Tuple[str, str], ...]
+F = TypeVar("F", bound=Callable[..., Any])
+
+
+def _get_labels_key(labels: Dict[str, Any]) -> LabelsKey:
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+
+class SpanStats:
+    def __init__(self, max_slowest: int) -> None:
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.max_slowest = max_slowest
+        self._slowest: List[Tuple[float, str]] = []
+
+    def add(self, duration: float, item: Optional[str] = None) -> None:
+        self.count += 1
+        self.total += duration
+        self.max = max(self.max, duration)
+        if item is None or not self.max_slowest:
+            return
+        if len(self._slowest) < self.max_slowest:
+            heapq.heappush(self._slowest, (duration, item))
+        else:
+            heapq.heappushpop(self._slowest, (duration, item))
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "total_seconds": self.total,
+            "max_seconds": self.max,
+            "slowest": [
+                {"item": item, "seconds": duration}
+                for duration, item in sorted(self._slowest, reverse=True)
+            ],
+        }
+
+
+class Metrics:
+    """Collects timed spans and counters for a pipeline run. Spans with an item
+    (a file, a section) also keep the slowest items seen."""
+
+    def __init__(self, max_slowest: int = 10) -> None:
+        self.max_slowest = max_slowest
+        self.started_at = time.time()
+        self._started = time.perf_counter()
+        self._spans: Dict[Tuple[str, LabelsKey], SpanStats] = {}
+        self._counters: Dict[Tuple[str, LabelsKey], float] = {}
+        self._lock = threading.Lock()
+
+    def record_span(
+        self, name: str, duration: float, item: Optional[str] = None, **labels: Any
+    ) -> None:
+        key = (name, _get_labels_key(labels))
+        with self._lock:
+            if key not in self._spans:
+                self._spans[key] = SpanStats(self.max_slowest)
+            self._spans[key].add(duration, item)
+
+    @contextmanager
+    def span(self, name: str, item: Optional[str] = None, **labels: Any) -> Iterator:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record_span(name, time.perf_counter() - started, item, **labels)
+
+    def increment(self, name: str, value: float = 1, **labels: Any) -> None:
+        key = (name, _get_labels_key(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def counter(self, name: str, **labels: Any) -> float:
+        with self._lock:
+            return self._counters.get((name, _get_labels_key(labels)), 0)
+
+    def report(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "started_at": self.started_at,
+                "wall_seconds": time.perf_counter() - self._started,
+                "spans": [
+                    {"name": name, "labels": dict(labels), **stats.to_dict()}
+                    for (name, labels), stats in self._spans.items()
+                ],
+                "counters": [
+                    {"name": name, "labels": dict(labels), "value": value}
+                    for (name, labels), value in self._counters.items()
+                ],
+            }
+
+    def save_report(self, report_path: str) -> None:
+        os.makedirs(os.path.dirname(report_path) or ".", exist_ok=True)
+        with open(report_path, "w") as f:
+            json.dump(self.report(), f, indent=2)
+
+    def to_prometheus(self, prefix: str = "readmaker") -> str:
+        return format_prometheus(self.report(), prefix)
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    escaped = (
+        (name, value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for name, value in labels.items()
+    )
+    return "{" + ",".join(f'{name}="{value}"' for name, value in escaped) + "}"
+
+
+def format_prometheus(report: Dict[str, Any], prefix: str = "readmaker") -> str:
+    lines = []
+    counters: Dict[str, List[Dict[str, Any]]] = {}
+    for counter in report["counters"]:
+        counters.setdefault(counter["name"], []).append(counter)
+    for name, samples in sorted(counters.items()):
+        lines.append(f"# TYPE {prefix}_{name} counter")
+        lines.extend(
+            f"{prefix}_{name}{_format_labels(sample['labels'])} {sample['value']}"
+            for sample in samples
+        )
+
+    if report["spans"]:
+        metric = f"{prefix}_span_seconds"
+        lines.append(f"# TYPE {metric} summary")
+        for span in report["spans"]:
+            labels = _format_labels({"span": span["name"], **span["labels"]})
+            lines.append(f"{metric}_sum{labels} {span['total_seconds']}")
+            lines.append(f"{metric}_count{labels} {span['count']}")
+    lines.append(f"# TYPE {prefix}_wall_seconds gauge")
+    lines.append(f"{prefix}_wall_seconds {report['wall_seconds']}")
+    return "\n".join(lines) + "\n"
+
+
+def get_run_summary(report: Dict[str, Any]) -> Dict[str, float]:
+    def total(name: str) -> float:
+        return sum(c["value"] for c in report["counters"] if c["name"] == name)
+
+    cache_lookups = total("summary_cache_hits_total") + total(
+        "summary_cache_misses_total"
+    )
+    return {
+        "wall_seconds": report["wall_seconds"],
+        "llm_requests": total("llm_requests_total"),
+        "llm_retries": total("llm_retries_total"),
+        "llm_throttled": total("llm_throttled_total"),
+        "prompt_tokens": total("llm_prompt_tokens_total"),
+        "completion_tokens": total("llm_completion_tokens_total"),
+        "cache_hit_rate": (
+            total("summary_cache_hits_total") / cache_lookups if cache_lookups else 0.0
+        ),
+    }
+
+
+_metrics = Metrics()
+
+
+def get_metrics() -> Metrics:
+    return _metrics
+
+
+def set_metrics(metrics: Metrics) -> Metrics:
+    global _metrics
+    previous_metrics, _metrics = _metrics, metrics
+    return previous_metrics
+
+
+def timed(name: str) -> Callable[[F], F]:
+    """Records every call of the decorated function as a span of the metrics
+    active at call time."""
+
+    def decorator(func: F) -> F:
+        @wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            with get_metrics().span(name):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
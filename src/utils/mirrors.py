@@ -0,0 +1,167 @@
+import os
+import shutil
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+from git import GitCommandError, Repo
+
+from .repository import get_repo, get_repo_slug
+
+try:
+    import fcntl
+except ImportError:  # Windows: mirrors are only locked within the process
+    fcntl = None
+
+_locks_guard = threading.Lock()
+_mirror_locks: Dict[str, threading.RLock] = {}
+
+
+def _get_thread_lock(lock_path: str) -> threading.RLock:
+    with _locks_guard:
+        return _mirror_locks.setdefault(lock_path, threading.RLock())
+
+
+def get_dir_size(path: str) -> int:
+    size = 0
+    for root, _, files in os.walk(path):
+        for file in files:
+            try:
+                size += os.lstat(os.path.join(root, file)).st_size
+            except FileNotFoundError:
+                continue
+    return size
+
+
+class MirrorPool:
+    def __init__(
+        self,
+        cache_dir: str,
+        max_bytes: Optional[int] = None,
+        **clone_options: Any,
+    ) -> None:
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.clone_options = clone_options
+        self.mirrors_dir = os.path.join(cache_dir, "mirrors")
+        self.locks_dir = os.path.join(cache_dir, "locks")
+        os.makedirs(self.mirrors_dir, exist_ok=True)
+        os.makedirs(self.locks_dir, exist_ok=True)
+
+    def mirror_path(self, repo_url: str) -> str:
+        return os.path.join(self.mirrors_dir, f"{get_repo_slug(repo_url)}.git")
+
+    def _lock_path(self, mirror_name: str) -> str:
+        return os.path.join(self.locks_dir, f"{mirror_name}.lock")
+
+    @contextmanager
+    def _lock(self, mirror_name: str, blocking: bool = True) -> Iterator[bool]:
+        lock_path = self._lock_path(mirror_name)
+        thread_lock = _get_thread_lock(lock_path)
+        if not thread_lock.acquire(blocking=blocking):
+            yield False
+            return
+        try:
+            if fcntl is None:
+                yield True
+                return
+            with open(lock_path, "a") as lock_file:
+                flags = fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB)
+                try:
+                    fcntl.flock(lock_file, flags)
+                except BlockingIOError:
+                    yield False
+                    return
+                try:
+                    yield True
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+        finally:
+            thread_lock.release()
+
+    def _touch(self, mirror_path: str) -> None:
+        os.utime(mirror_path)
+
+    def _get_mirror(self, repo_url: str) -> Repo:
+        mirror_path = self.mirror_path(repo_url)
+        clone_options = {
+            **self.clone_options,
+            "sparse_patterns": None,
+            "update": True,
+            "bare": True,
+        }
+        mirror = get_repo(repo_url, mirror_path, **clone_options)
+        self._touch(mirror_path)
+        return mirror
+
+    def get_mirror(self, repo_url: str) -> Repo:
+        with self._lock(os.path.basename(self.mirror_path(repo_url))):
+            return self._get_mirror(repo_url)
+
+    def add_worktree(
+        self, repo_url: str, worktree_path: str, ref: str = "HEAD"
+    ) -> Repo:
+        mirror_name = os.path.basename(self.mirror_path(repo_url))
+        with self._lock(mirror_name):
+            mirror = self._get_mirror(repo_url)
+            commit = mirror.commit(ref).hexsha
+            try:
+                if os.path.exists(worktree_path):
+                    worktree = Repo(worktree_path)
+                    worktree.git.checkout("--detach", commit)
+                else:
+                    mirror.git.worktree("prune")
+                    mirror.git.worktree("add", "--detach", worktree_path, commit)
+                    worktree = Repo(worktree_path)
+            except GitCommandError as e:
+                raise RuntimeError(
+                    f"Failed to check out {repo_url} in {worktree_path}\nError:\n{e}"
+                )
+        print(f"Repository {repo_url} checked out at {commit} in {worktree_path}.")
+        self.evict()
+        return worktree
+
+    def remove_worktree(self, repo_url: str, worktree_path: str) -> None:
+        mirror_path = self.mirror_path(repo_url)
+        with self._lock(os.path.basename(mirror_path)):
+            if not os.path.isdir(mirror_path):
+                return
+            mirror = Repo(mirror_path)
+            if os.path.exists(worktree_path):
+                mirror.git.worktree("remove", "--force", worktree_path)
+            mirror.git.worktree("prune")
+
+    def _has_worktrees(self, mirror_path: str) -> bool:
+        mirror = Repo(mirror_path)
+        mirror.git.worktree("prune")
+        output = mirror.git.worktree("list", "--porcelain")
+        # The bare mirror itself is always listed first
+        return output.count("worktree ") > 1
+
+    def mirrors(self) -> List[str]:
+        return sorted(
+            (
+                os.path.join(self.mirrors_dir, name)
+                for name in os.listdir(self.mirrors_dir)
+            ),
+            key=os.path.getmtime,
+        )
+
+    def evict(self) -> List[str]:
+        if self.max_bytes is None:
+            return []
+        mirrors_sizes = {path: get_dir_size(path) for path in self.mirrors()}
+        total_size = sum(mirrors_sizes.values())
+        evicted = []
+        # Least recently used mirrors go first
+        for mirror_path, size in mirrors_sizes.items():
+            if total_size <= self.max_bytes:
+                break
+            with self._lock(os.path.basename(mirror_path), blocking=False) as locked:
+                if not locked or self._has_worktrees(mirror_path):
+                    continue
+                shutil.rmtree(mirror_path)
+            total_size -= size
+            evicted.append(mirror_path)
+            print(f"Evicted mirror {mirror_path} ({size} bytes)")
+        return evicted
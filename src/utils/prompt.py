@@ -1,6 +1,24 @@
-from typing import Any, Dict, List
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
 
+import tiktoken
 from langchain.chains.base import Chain
+from langchain.prompts import BasePromptTemplate, ChatPromptTemplate
+
+from .metrics import get_metrics
+from .ratelimit import RequestScheduler, is_retryable_error
+
+_FILE_HEADER_PREFIX = "### File: "
+_file_header_regex = re.compile(
+    rf"^\s*{re.escape(_FILE_HEADER_PREFIX.strip())}\s*`?(.+?)`?\s*$",
+    re.MULTILINE,
+)
+
+_request_scheduler: Optional[RequestScheduler] = None
+_request_scheduler_lock = threading.Lock()
 
 
 def get_files_structure_text(files_list: List[str]) -> str:
@@ -9,15 +27,230 @@ def get_files_structure_text(files_list: List[str]) -> str:
     return text
 
 
-def get_files_summaries_text(files_summaries: Dict[str, str]) -> str:
+def get_files_summaries_text(
+    files_summaries: Dict[str, str], duplicates: Optional[Dict[str, str]] = None
+) -> str:
+    """Lists the files summaries. Files that `duplicates` maps to a file with
+    the same contents share the entry of that file."""
+    files_groups: Dict[str, List[str]] = {}
+    for file in files_summaries:
+        original = (duplicates or {}).get(file, file)
+        if original not in files_summaries:
+            original = file
+        files_groups.setdefault(original, []).append(file)
+    entries = [
+        (
+            f"- File: {files[0]}\n- Contents: {files_summaries[original]}"
+            if len(files) == 1
+            else f"- Files: {', '.join(files)}\n- Contents: {files_summaries[original]}"
+        )
+        for original, files in files_groups.items()
+    ]
     text = "Projects files contents summaries:\n"
-    text += "\n\n".join(
-        f"- File: {file}\n- Contents: {summary}"
-        for file, summary in files_summaries.items()
-    )
+    text += "\n\n".join(entries)
     return text
 
 
+@lru_cache(maxsize=64)
+def get_chat_prompt_template(template: str) -> ChatPromptTemplate:
+    # Templates are immutable, so models built from the same text share them
+    return ChatPromptTemplate.from_template(template)
+
+
+@lru_cache(maxsize=None)
+def _get_encoding(model_name: str) -> Optional[tiktoken.Encoding]:
+    try:
+        return tiktoken.encoding_for_model(model_name)
+    except Exception as e:
+        print(f"Could not load the tokenizer for {model_name}.\nError:\n{e}")
+        return None
+
+
+def count_tokens(text: str, model_name: str) -> int:
+    encoding = _get_encoding(model_name)
+    if encoding is None:
+        return len(text) // 4 + 1
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def get_file_batch_entry(file: str, contents: str) -> str:
+    return f"{_FILE_HEADER_PREFIX}{file}\n{contents}"
+
+
+def get_files_batch_text(files_contents: Dict[str, str]) -> str:
+    return "\n\n".join(
+        get_file_batch_entry(file, contents)
+        for file, contents in files_contents.items()
+    )
+
+
+def parse_files_batch_summaries(text: str, files: List[str]) -> Dict[str, str]:
+    headers = list(_file_header_regex.finditer(text))
+    summaries = {}
+    for header, next_header in zip(headers, headers[1:] + [None]):
+        file = header.group(1).strip()
+        end = next_header.start() if next_header else len(text)
+        summary = text[header.end() : end].strip()
+        if file in files and summary:
+            summaries[file] = summary
+    return summaries
+
+
+def pack_files(
+    files_tokens: Dict[str, int],
+    token_budget: int,
+    small_file_tokens: int,
+    max_files: Optional[int] = None,
+) -> List[List[str]]:
+    batches, batch, batch_tokens = [], [], 0
+    for file, tokens in files_tokens.items():
+        if tokens > small_file_tokens:
+            batches.append([file])
+            continue
+        if batch and (
+            batch_tokens + tokens > token_budget
+            or (max_files is not None and len(batch) >= max_files)
+        ):
+            batches.append(batch)
+            batch, batch_tokens = [], 0
+        batch.append(file)
+        batch_tokens += tokens
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+def get_request_scheduler() -> RequestScheduler:
+    """Returns the scheduler shared by every LLM request of the process, built
+    from the default LLM model config unless one was set."""
+    global _request_scheduler
+    with _request_scheduler_lock:
+        if _request_scheduler is None:
+            # Imported here because the configs depend on the utilities
+            from src.configs.llmmodels.defaultllmmodel import DefaultLLMModelConfig
+
+            llm_config = DefaultLLMModelConfig.get_default_config()
+            _request_scheduler = llm_config.get_request_scheduler()
+        return _request_scheduler
+
+
+def set_request_scheduler(
+    scheduler: Optional[RequestScheduler],
+) -> Optional[RequestScheduler]:
+    global _request_scheduler
+    previous_scheduler, _request_scheduler = _request_scheduler, scheduler
+    return previous_scheduler
+
+
+def get_chain_name(chain: Chain) -> str:
+    config = getattr(chain, "config", None) or {}
+    return config.get("run_name") or type(chain).__name__
+
+
+def _get_prompt_text(chain: Chain, kwargs: Dict[str, Any]) -> str:
+    # Named chains are bindings around the prompt | llm | parser sequence
+    prompt = getattr(getattr(chain, "bound", chain), "first", None)
+    if isinstance(prompt, BasePromptTemplate):
+        try:
+            return prompt.format(**kwargs)
+        except (KeyError, ValueError):
+            pass
+    return "\n".join(str(value) for value in kwargs.values())
+
+
+def _get_prompt_tokens(
+    chain: Chain, kwargs: Dict[str, Any], scheduler: RequestScheduler
+) -> int:
+    return count_tokens(_get_prompt_text(chain, kwargs), scheduler.model_name)
+
+
+def _run_prompt(
+    chain: Chain,
+    kwargs: Dict[str, Any],
+    func: Callable[[], Any],
+    retryable: Callable[[Exception], bool] = is_retryable_error,
+) -> Any:
+    scheduler, metrics = get_request_scheduler(), get_metrics()
+    chain_name = get_chain_name(chain)
+    tokens = _get_prompt_tokens(chain, kwargs, scheduler)
+    with metrics.span("llm_request", chain=chain_name):
+        try:
+            output = scheduler.run(func, tokens=tokens, retryable=retryable)
+        except Exception:
+            metrics.increment("llm_errors_total", chain=chain_name)
+            raise
+    metrics.increment("llm_requests_total", chain=chain_name)
+    metrics.increment("llm_prompt_tokens_total", tokens, chain=chain_name)
+    metrics.increment(
+        "llm_completion_tokens_total",
+        count_tokens(str(output), scheduler.model_name),
+        chain=chain_name,
+    )
+    return output
+
+
 def execute_prompt(chain: Chain, **kwargs: Dict[str, Any]):
-    output = chain.invoke(kwargs)
+    output = _run_prompt(chain, kwargs, lambda: chain.invoke(kwargs))
     return output
+
+
+def stream_prompt(
+    chain: Chain, on_token: Callable[[str], None], **kwargs: Dict[str, Any]
+) -> str:
+    tokens = []
+
+    def stream() -> str:
+        for token in chain.stream(kwargs):
+            on_token(token)
+            tokens.append(token)
+        return "".join(tokens)
+
+    # Tokens already shown to the consumer can't be taken back, so only
+    # failures before the first token are retried
+    return _run_prompt(
+        chain,
+        kwargs,
+        stream,
+        retryable=lambda e: not tokens and is_retryable_error(e),
+    )
+
+
+def _execute_prompt_safe(chain: Chain, kwargs: Dict[str, Any]) -> Any:
+    try:
+        return execute_prompt(chain, **kwargs)
+    except Exception as e:
+        return e
+
+
+def execute_prompts_list(
+    prompts: List[Tuple[Chain, Dict[str, Any]]], max_concurrency: int = 1
+) -> List[Union[Any, Exception]]:
+    with ThreadPoolExecutor(max_workers=max(1, max_concurrency)) as executor:
+        outputs = executor.map(lambda prompt: _execute_prompt_safe(*prompt), prompts)
+        return list(outputs)
+
+
+def execute_prompts(
+    chain: Chain, inputs: List[Dict[str, Any]], max_concurrency: int = 1
+) -> List[Union[Any, Exception]]:
+    return execute_prompts_list(
+        [(chain, kwargs) for kwargs in inputs], max_concurrency=max_concurrency
+    )
+
+
+def execute_prompts_parallel(
+    prompts: Dict[str, Tuple[Chain, Dict[str, Any]]],
+    max_concurrency: int = 1,
+    on_token: Optional[Callable[[str, str], None]] = None,
+) -> Dict[str, Any]:
+    def execute(name: str, chain: Chain, kwargs: Dict[str, Any]) -> Any:
+        if on_token is None:
+            return execute_prompt(chain, **kwargs)
+        return stream_prompt(chain, lambda token: on_token(name, token), **kwargs)
+
+    with ThreadPoolExecutor(max_workers=max(1, max_concurrency)) as executor:
+        futures = {
+            name: executor.submit(execute, name, chain, kwargs)
+            for name, (chain, kwargs) in prompts.items()
+        }
+        return {name: future.result() for name, future in futures.items()}
@@ -0,0 +1,215 @@
+from __future__ import annotations
+
+import random
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+from .metrics import get_metrics
+
+_RETRYABLE_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+_THROTTLING_STATUS_CODES = {429}
+
+
+def _get_status_code(error: Exception) -> Optional[int]:
+    return getattr(error, "status_code", None)
+
+
+def is_throttling_error(error: Exception) -> bool:
+    return _get_status_code(error) in _THROTTLING_STATUS_CODES
+
+
+def is_retryable_error(error: Exception) -> bool:
+    # Imported here to keep the OpenAI client out of the import time
+    import openai
+
+    if isinstance(error, (openai.APIConnectionError, TimeoutError, ConnectionError)):
+        return True
+    return _get_status_code(error) in _RETRYABLE_STATUS_CODES
+
+
+def get_retry_after(error: Exception) -> Optional[float]:
+    headers = getattr(getattr(error, "response", None), "headers", None)
+    if not headers:
+        return None
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+class TokenBucket:
+    def __init__(
+        self,
+        capacity: float,
+        refill_per_second: float,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ) -> None:
+        self.capacity = capacity
+        self.refill_per_second = refill_per_second
+        self._clock = clock
+        self._sleep = sleep
+        self._tokens = capacity
+        self._updated_at = clock()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def per_minute(cls, limit: float, **kwargs: Any) -> TokenBucket:
+        return cls(limit, limit / 60, **kwargs)
+
+    def _refill(self) -> None:
+        now = self._clock()
+        elapsed = now - self._updated_at
+        self._tokens = min(
+            self.capacity, self._tokens + elapsed * self.refill_per_second
+        )
+        self._updated_at = now
+
+    def acquire(self, amount: float = 1) -> float:
+        # Requests bigger than the bucket would wait forever, so they wait for a
+        # full bucket instead
+        amount = min(amount, self.capacity)
+        waited = 0.0
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= amount:
+                    self._tokens -= amount
+                    return waited
+                wait_time = (amount - self._tokens) / self.refill_per_second
+            self._sleep(wait_time)
+            waited += wait_time
+
+
+class AdaptiveConcurrencyLimiter:
+    def __init__(self, max_concurrency: int, min_concurrency: int = 1) -> None:
+        self.max_concurrency = max(1, max_concurrency)
+        self.min_concurrency = max(1, min(min_concurrency, self.max_concurrency))
+        self._limit = float(self.max_concurrency)
+        self._in_flight = 0
+        self._condition = threading.Condition()
+
+    @property
+    def limit(self) -> int:
+        return int(self._limit)
+
+    def acquire(self) -> None:
+        with self._condition:
+            self._condition.wait_for(lambda: self._in_flight < self.limit)
+            self._in_flight += 1
+
+    def release(self) -> None:
+        with self._condition:
+            self._in_flight -= 1
+            self._condition.notify_all()
+
+    def on_success(self) -> None:
+        with self._condition:
+            self._limit = min(self.max_concurrency, self._limit + 1 / self._limit)
+            self._condition.notify_all()
+
+    def on_throttled(self) -> None:
+        with self._condition:
+            self._limit = max(self.min_concurrency, self._limit / 2)
+
+
+class RequestScheduler:
+    def __init__(
+        self,
+        requests_per_minute: Optional[float] = None,
+        tokens_per_minute: Optional[float] = None,
+        max_concurrency: int = 16,
+        min_concurrency: int = 1,
+        max_retries: int = 6,
+        initial_backoff: float = 1.0,
+        max_backoff: float = 60.0,
+        model_name: str = "gpt-3.5-turbo",
+        sleep: Callable[[float], None] = time.sleep,
+    ) -> None:
+        self.requests_bucket = (
+            TokenBucket.per_minute(requests_per_minute, sleep=sleep)
+            if requests_per_minute
+            else None
+        )
+        self.tokens_bucket = (
+            TokenBucket.per_minute(tokens_per_minute, sleep=sleep)
+            if tokens_per_minute
+            else None
+        )
+        self.concurrency = AdaptiveConcurrencyLimiter(max_concurrency, min_concurrency)
+        self.max_retries = max_retries
+        self.initial_backoff = initial_backoff
+        self.max_backoff = max_backoff
+        self.model_name = model_name
+        self._sleep = sleep
+        self._stats_lock = threading.Lock()
+        self.requests = 0
+        self.retries = 0
+        self.throttled = 0
+
+    def get_backoff(self, attempt: int, error: Optional[Exception] = None) -> float:
+        retry_after = None if error is None else get_retry_after(error)
+        if retry_after is not None:
+            return min(self.max_backoff, retry_after)
+        backoff = min(self.max_backoff, self.initial_backoff * 2**attempt)
+        # Full jitter keeps throttled workers from retrying in lockstep
+        return random.uniform(0, backoff)
+
+    def _wait_for_quota(self, tokens: int) -> None:
+        waited = 0.0
+        if self.requests_bucket is not None:
+            waited += self.requests_bucket.acquire(1)
+        if self.tokens_bucket is not None and tokens:
+            waited += self.tokens_bucket.acquire(tokens)
+        if waited:
+            get_metrics().record_span("rate_limit_wait", waited)
+
+    def run(
+        self,
+        func: Callable[[], Any],
+        tokens: int = 0,
+        retryable: Callable[[Exception], bool] = is_retryable_error,
+    ) -> Any:
+        attempt = 0
+        while True:
+            self.concurrency.acquire()
+            try:
+                self._wait_for_quota(tokens)
+                with self._stats_lock:
+                    self.requests += 1
+                output = func()
+            except Exception as e:
+                if attempt >= self.max_retries or not retryable(e):
+                    raise
+                if is_throttling_error(e):
+                    self.concurrency.on_throttled()
+                    with self._stats_lock:
+                        self.throttled += 1
+                    get_metrics().increment("llm_throttled_total")
+                error = e
+            else:
+                self.concurrency.on_success()
+                return output
+            finally:
+                self.concurrency.release()
+
+            backoff = self.get_backoff(attempt, error)
+            print(
+                f"Retrying LLM request in {backoff:.1f}s "
+                f"(attempt {attempt + 1}/{self.max_retries})\nError:\n{error}"
+            )
+            with self._stats_lock:
+                self.retries += 1
+            get_metrics().increment("llm_retries_total")
+            self._sleep(backoff)
+            attempt += 1
+
+    def stats(self) -> Dict[str, int]:
+        with self._stats_lock:
+            return {
+                "requests": self.requests,
+                "retries": self.retries,
+                "throttled": self.throttled,
+                "concurrency_limit": self.concurrency.limit,
+            }
@@ -1,11 +1,10 @@
+import hashlib
 import os
-from contextlib import contextmanager
-from typing import List, Optional
+import tempfile
+from typing import Dict, List, Optional, Tuple
 from uuid import uuid4
 
-from git import GitCommandError, Repo
-
-from .files import create_local_file
+from git import Actor, BadName, Git, GitCommandError, Repo
 
 
 def _get_repo_from_dir(repo_path: str) -> Repo:
@@ -17,21 +16,99 @@ def _get_repo_from_dir(repo_path: str) -> Repo:
         )
 
 
-def _clone_repo(repo_url: str, repo_path: str) -> Repo:
+def _clone_repo(
+    repo_url: str,
+    repo_path: str,
+    depth: Optional[int] = None,
+    single_branch: bool = False,
+    filter_spec: Optional[str] = None,
+    sparse_patterns: Optional[List[str]] = None,
+    bare: bool = False,
+) -> Repo:
+    clone_kwargs = {}
+    if bare:
+        clone_kwargs["bare"] = True
+    if depth:
+        clone_kwargs["depth"] = depth
+    if single_branch:
+        clone_kwargs["single_branch"] = True
+    if filter_spec:
+        clone_kwargs["filter"] = filter_spec
+    if sparse_patterns and not bare:
+        clone_kwargs["no_checkout"] = True
     try:
-        return Repo.clone_from(repo_url, repo_path)
+        repo = Repo.clone_from(repo_url, repo_path, **clone_kwargs)
+        if sparse_patterns and not bare:
+            repo.git.sparse_checkout("set", "--no-cone", *sparse_patterns)
+            repo.git.checkout(repo.active_branch.name)
+        return repo
     except Exception as e:
         raise RuntimeError(
             f"Failed to clone repository {repo_url} to {repo_path}\nError:\n{e}"
         )
 
 
-def get_repo(repo_url: str, repo_path: str) -> Repo:
+# Commits waiting to be pushed live outside refs/heads, so the pruning fetch
+# of shared mirrors in _update_bare_repo can't delete them
+UNPUSHED_REFS_PREFIX = "refs/readmaker/"
+
+
+def _update_bare_repo(repo: Repo) -> bool:
+    try:
+        repo.git.fetch("origin", "+refs/heads/*:refs/heads/*", "--prune")
+    except GitCommandError as e:
+        print(f"Could not fetch {repo.git_dir}.\nError:\n{e}")
+        return False
+    return True
+
+
+def update_repo(repo: Repo) -> bool:
+    if not repo.remotes:
+        return False
+    if repo.bare:
+        return _update_bare_repo(repo)
+    if repo.head.is_detached:
+        return False
+    tracking_branch = repo.active_branch.tracking_branch()
+    if tracking_branch is None:
+        return False
+
+    # A plain fetch stops at commits already present, so shallow clones stay
+    # connected to their history and can still be fast-forwarded
+    try:
+        repo.remote(tracking_branch.remote_name).fetch(tracking_branch.remote_head)
+        repo.git.merge("--ff-only", tracking_branch.name)
+    except GitCommandError as e:
+        print(f"Could not fast-forward {repo.working_dir}.\nError:\n{e}")
+        return False
+    return True
+
+
+def get_repo(
+    repo_url: str,
+    repo_path: str,
+    depth: Optional[int] = None,
+    single_branch: bool = False,
+    filter_spec: Optional[str] = None,
+    sparse_patterns: Optional[List[str]] = None,
+    update: bool = False,
+    bare: bool = False,
+) -> Repo:
     if os.path.exists(repo_path):
         repo = _get_repo_from_dir(repo_path)
         print(f"Repository {repo_url} already exists in {repo_path}.")
+        if update and update_repo(repo):
+            print(f"Repository {repo_url} updated to {get_head_commit(repo)}.")
         return repo
-    repo = _clone_repo(repo_url, repo_path)
+    repo = _clone_repo(
+        repo_url,
+        repo_path,
+        depth=depth,
+        single_branch=single_branch,
+        filter_spec=filter_spec,
+        sparse_patterns=sparse_patterns,
+        bare=bare,
+    )
     print(f"Repository {repo_url} cloned to {repo_path}.")
     return repo
 
@@ -40,13 +117,64 @@ def get_repo_name_from_url(repo_url: str) -> str:
     return os.path.basename(repo_url)
 
 
-def get_repo_ignored(repo: Repo, files_list: List[str]) -> List[str]:
-    return repo.ignored(*files_list)
+def get_remote_head(repo_url: str) -> Optional[str]:
+    try:
+        output = Git().ls_remote(repo_url, "HEAD")
+    except GitCommandError as e:
+        print(f"Could not resolve HEAD of {repo_url}.\nError:\n{e}")
+        return None
+    return output.split("\t", 1)[0] or None
+
+
+def get_repo_slug(repo_url: str) -> str:
+    url_hash = hashlib.sha256(repo_url.encode("utf-8")).hexdigest()[:8]
+    return f"{get_repo_name_from_url(repo_url)}-{url_hash}"
+
+
+def get_repo_files(repo: Repo) -> List[str]:
+    output = repo.git.ls_files("--cached", "--others", "--exclude-standard", "-z")
+    return [p for p in output.split("\0") if p]
+
+
+def get_tree_files_sizes(repo: Repo, ref: str = "HEAD") -> Dict[str, int]:
+    output = repo.git.ls_tree("-r", "-l", "-z", ref)
+    files_sizes = {}
+    for entry in output.split("\0"):
+        if not entry:
+            continue
+        info, path = entry.split("\t", 1)
+        mode, object_type, _, size = info.split()
+        # Symlinks and submodules have no contents worth reading
+        if object_type == "blob" and mode in ("100644", "100755"):
+            files_sizes[path] = int(size)
+    return files_sizes
 
 
-def get_repo_non_ignored(repo: Repo, files_list: List[str]) -> List[str]:
-    ignored = get_repo_ignored(repo, files_list)
-    return [p for p in files_list if p not in ignored]
+def read_blob(repo: Repo, path: str, ref: str = "HEAD") -> bytes:
+    return (repo.commit(ref).tree / path).data_stream.read()
+
+
+def get_head_commit(repo: Repo, ref: str = "HEAD") -> str:
+    return repo.commit(ref).hexsha
+
+
+def get_changed_files(
+    repo: Repo, since_commit: str, ref: str = "HEAD"
+) -> Tuple[List[str], List[str]]:
+    try:
+        diffs = repo.commit(since_commit).diff(repo.commit(ref))
+    except (BadName, GitCommandError, ValueError) as e:
+        raise ValueError(f"Unknown commit: {since_commit}\nError:\n{e}")
+
+    changed, deleted = [], []
+    for diff in diffs:
+        if diff.change_type == "D":
+            deleted.append(diff.a_path)
+            continue
+        if diff.change_type == "R":
+            deleted.append(diff.a_path)
+        changed.append(diff.b_path)
+    return changed, deleted
 
 
 def search_file_in_repo_root(repo: Repo, filename: str) -> Optional[str]:
@@ -82,36 +210,91 @@ def create_random_branch_name(
     return prefix + rnd_str + suffix
 
 
-@contextmanager
-def git_local_branch(repo: Repo, new_branch: str) -> None:
-    original_branch = repo.active_branch
+def _file_exists_in_commit(repo: Repo, file_path: str, ref: str) -> bool:
     try:
-        repo.git.checkout("HEAD", b=new_branch)
-        yield
-    except Exception as e:
-        raise RuntimeError(f"Could not create branch: {new_branch}\nError: {e}")
-    finally:
-        repo.git.checkout(original_branch)
+        repo.commit(ref).tree / file_path
+    except KeyError:
+        return False
+    return True
+
+
+def get_commit_identity_env(repo: Repo) -> Dict[str, str]:
+    """Resolves the author and committer like `repo.index.commit` does,
+    falling back to user@hostname when no identity is configured."""
+    config_reader = repo.config_reader()
+    author = Actor.author(config_reader)
+    committer = Actor.committer(config_reader)
+    return {
+        "GIT_AUTHOR_NAME": author.name,
+        "GIT_AUTHOR_EMAIL": author.email,
+        "GIT_COMMITTER_NAME": committer.name,
+        "GIT_COMMITTER_EMAIL": committer.email,
+    }
 
 
-def create_local_branch_commit_push(
+def commit_file_to_branch(
     repo: Repo,
     new_branch: str,
     file_path: str,
     file_content: str,
     commit_message: str,
     force: bool = True,
+    parent: str = "HEAD",
+    refs_prefix: str = "refs/heads/",
+) -> str:
+    if not force and _file_exists_in_commit(repo, file_path, parent):
+        raise ValueError(
+            f"File {file_path} already exists. Set force to true to overwrite this behavior."
+        )
+
+    # The tree is built in a throwaway index so neither the working tree nor
+    # the real index are touched
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        env = {"GIT_INDEX_FILE": os.path.join(tmp_dir, "index")}
+        try:
+            parent_commit = repo.commit(parent).hexsha
+            content_path = os.path.join(tmp_dir, "content")
+            with open(content_path, "w") as f:
+                f.write(file_content)
+            blob_sha = repo.git.hash_object("-w", "--path", file_path, content_path)
+            repo.git.read_tree(parent_commit, env=env)
+            repo.git.update_index(
+                "--add", "--cacheinfo", f"100644,{blob_sha},{file_path}", env=env
+            )
+            tree_sha = repo.git.write_tree(env=env)
+            commit_sha = repo.git.commit_tree(
+                tree_sha,
+                "-p",
+                parent_commit,
+                "-m",
+                commit_message,
+                env=get_commit_identity_env(repo),
+            )
+            repo.git.update_ref(f"{refs_prefix}{new_branch}", commit_sha, "")
+        except (GitCommandError, ValueError) as e:
+            raise RuntimeError(
+                f"Not possible to commit file {file_path} to branch: {new_branch}\nError: {e}"
+            )
+    return commit_sha
+
+
+def push_branch(
+    repo: Repo,
+    branch: str,
+    remote_name: str = "origin",
+    refs_prefix: str = "refs/heads/",
 ) -> None:
     try:
-        repo_path = repo._working_tree_dir
-        full_file_path = os.path.join(repo_path, file_path)
-        with git_local_branch(repo, new_branch):
-            create_local_file(full_file_path, file_content, force=force)
-            repo.index.add([full_file_path])
-            repo.index.commit(commit_message)
-            origin = repo.remote(name="origin")
-            origin.push(new_branch)
-    except GitCommandError as e:
-        raise RuntimeError(
-            f"Not possible to commit file {file_path} to branch: {new_branch}\nError: {e}"
+        push_infos = repo.remote(name=remote_name).push(
+            f"{refs_prefix}{branch}:refs/heads/{branch}"
         )
+        push_infos.raise_if_error()
+    except (GitCommandError, ValueError) as e:
+        raise RuntimeError(f"Could not push branch: {branch}\nError: {e}")
+
+
+def delete_ref(repo: Repo, ref: str) -> None:
+    try:
+        repo.git.update_ref("-d", ref)
+    except GitCommandError as e:
+        print(f"Could not delete {ref}.\nError:\n{e}")
@@ -0,0 +1,200 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import re
+import zlib
+from collections import Counter
+from functools import lru_cache
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from .hierarchy import get_summary_entry
+
+# Splits identifiers too, so "setup.py", "setupTools" and "setup_tools"
+# all produce the "setup" token. Numbers are left out, as they are mostly
+# unique and would only grow the index
+_TOKEN_PATTERN = re.compile(r"[A-Z]?[a-z]+|[A-Z]+(?![a-z])")
+
+DEFAULT_NUM_FEATURES = 2**18
+
+
+def tokenize(text: str) -> List[str]:
+    return [token.lower() for token in _TOKEN_PATTERN.findall(text) if len(token) > 1]
+
+
+@lru_cache(maxsize=2**16)
+def _get_token_hash(token: str) -> int:
+    return zlib.crc32(token.encode("utf-8"))
+
+
+def get_features_weights(
+    text: str, num_features: int, idf: Optional[np.ndarray] = None
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Returns the hashed features of a text and their L2 normalized
+    sublinear TF-IDF weights."""
+    features_counts: Dict[int, int] = {}
+    # Counting first hashes each distinct token once
+    for token, count in Counter(tokenize(text)).items():
+        feature = _get_token_hash(token) % num_features
+        features_counts[feature] = features_counts.get(feature, 0) + count
+    size = len(features_counts)
+    features = np.fromiter(features_counts.keys(), dtype=np.int32, count=size)
+    counts = np.fromiter(features_counts.values(), dtype=np.float32, count=size)
+    weights = 1.0 + np.log(counts)
+    if idf is not None:
+        weights *= idf[features]
+    norm = np.linalg.norm(weights)
+    if norm > 0:
+        weights /= norm
+    return features, weights
+
+
+class RetrievalDocument(NamedTuple):
+    path: str
+    text: str
+    # "summary" for a file summary, "chunk" for an excerpt of its contents
+    kind: str = "summary"
+
+    def entry(self) -> str:
+        if self.kind == "chunk":
+            return f"- File: {self.path} (excerpt)\n- Contents: {self.text}"
+        return get_summary_entry(self.path, self.text)
+
+
+class RetrievalIndex:
+    """Hashed TF-IDF index over file summaries and contents chunks, stored as
+    a sparse matrix in CSR layout."""
+
+    def __init__(
+        self,
+        documents: List[RetrievalDocument],
+        indptr: np.ndarray,
+        indices: np.ndarray,
+        data: np.ndarray,
+        idf: np.ndarray,
+    ) -> None:
+        self.documents = documents
+        self.indptr = indptr
+        self.indices = indices
+        self.data = data
+        self.idf = idf
+
+    @property
+    def num_features(self) -> int:
+        return len(self.idf)
+
+    @classmethod
+    def build(
+        cls,
+        documents: List[RetrievalDocument],
+        num_features: int = DEFAULT_NUM_FEATURES,
+    ) -> RetrievalIndex:
+        # Paths are part of the indexed text, as they name most build files
+        rows = [
+            get_features_weights(f"{document.path}\n{document.text}", num_features)
+            for document in documents
+        ]
+        lengths = np.array([len(features) for features, _ in rows], dtype=np.int64)
+        indptr = np.zeros(len(rows) + 1, dtype=np.int64)
+        indptr[1:] = np.cumsum(lengths)
+        indices = np.concatenate([features for features, _ in rows] or [[]])
+        indices = indices.astype(np.int32)
+        data = np.concatenate([weights for _, weights in rows] or [[]])
+        data = data.astype(np.float32)
+
+        document_frequency = np.bincount(indices, minlength=num_features)
+        idf = np.log((1 + len(documents)) / (1 + document_frequency)) + 1
+        data *= idf[indices]
+        rows_ids = np.repeat(np.arange(len(rows)), lengths)
+        norms = np.sqrt(np.bincount(rows_ids, weights=data**2, minlength=len(rows)))
+        data /= np.where(norms > 0, norms, 1)[rows_ids]
+        return cls(documents, indptr, indices, data, idf.astype(np.float32))
+
+    def search(self, query: str, top_k: int) -> List[Tuple[RetrievalDocument, float]]:
+        """Returns up to `top_k` documents sharing terms with the query, by
+        decreasing cosine similarity."""
+        if not self.documents:
+            return []
+        features, weights = get_features_weights(query, self.num_features, self.idf)
+        query_vector = np.zeros(self.num_features, dtype=np.float32)
+        query_vector[features] = weights
+        rows = np.repeat(np.arange(len(self.documents)), np.diff(self.indptr))
+        scores = np.bincount(
+            rows,
+            weights=self.data * query_vector[self.indices],
+            minlength=len(self.documents),
+        )
+        top_k = min(top_k, len(self.documents))
+        candidates = np.argpartition(-scores, top_k - 1)[:top_k]
+        return [
+            (self.documents[i], float(scores[i]))
+            for i in candidates[np.argsort(-scores[candidates], kind="stable")]
+            if scores[i] > 0
+        ]
+
+    def save(self, index_path: str) -> None:
+        os.makedirs(os.path.dirname(index_path) or ".", exist_ok=True)
+        documents = json.dumps([list(document) for document in self.documents])
+        tmp_path = f"{index_path}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez_compressed(
+                f,
+                documents=np.frombuffer(documents.encode("utf-8"), dtype=np.uint8),
+                indptr=self.indptr,
+                indices=self.indices,
+                data=self.data,
+                idf=self.idf,
+            )
+        os.replace(tmp_path, index_path)
+
+    @classmethod
+    def load(cls, index_path: str) -> Optional[RetrievalIndex]:
+        if not os.path.isfile(index_path):
+            return None
+        try:
+            with np.load(index_path, allow_pickle=False) as arrays:
+                documents = json.loads(arrays["documents"].tobytes().decode("utf-8"))
+                return cls(
+                    [RetrievalDocument(*document) for document in documents],
+                    arrays["indptr"],
+                    arrays["indices"],
+                    arrays["data"],
+                    arrays["idf"],
+                )
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Ignoring invalid retrieval index: {index_path}\nError:\n{e}")
+            return None
+
+
+def get_retrieval_index_path(
+    index_dir: str, repo_url: str, commit: str, inputs_hash: str
+) -> str:
+    repo_hash = hashlib.sha256(repo_url.encode("utf-8")).hexdigest()
+    return os.path.join(index_dir, repo_hash, f"{commit}-{inputs_hash[:16]}.npz")
+
+
+def get_retrieved_summaries_text(
+    results: List[Tuple[RetrievalDocument, float]],
+    token_budget: int,
+    length_function: Callable[[str], int] = len,
+    overview_text: str = "",
+) -> str:
+    """Renders the retrieved documents, most relevant first, for as long as
+    they fit the budget, after the overview text if any."""
+    text = f"{overview_text}\n\n" if overview_text else ""
+    text += "Projects files contents summaries relevant to this section:\n"
+    remaining_tokens = token_budget - length_function(text)
+    entries = []
+    seen = set()
+    for document, _ in results:
+        entry = document.entry()
+        tokens = length_function("\n\n" + entry)
+        if entry in seen or tokens > remaining_tokens:
+            continue
+        entries.append(entry)
+        seen.add(entry)
+        remaining_tokens -= tokens
+    return text + "\n\n".join(entries)
@@ -0,0 +1,64 @@
+from __future__ import annotations
+
+import os
+import stat
+from typing import Dict, List, Optional
+
+from git import Repo
+
+from .files import iter_files
+from .repository import get_repo_files
+
+
+class RepositorySnapshot:
+    def __init__(self, root_dir: str, files_sizes: Dict[str, int]) -> None:
+        self.root_dir = root_dir
+        self.files_sizes = dict(sorted(files_sizes.items()))
+        # Files selected by the ingestion policy, set once per scan by the
+        # adapter that applies it
+        self.selected_files: Optional[List[str]] = None
+
+    @property
+    def files(self) -> List[str]:
+        return list(self.files_sizes)
+
+    def absolute_path(self, file: str) -> str:
+        return os.path.join(self.root_dir, file)
+
+    def absolute_paths(self) -> List[str]:
+        return [self.absolute_path(file) for file in self.files_sizes]
+
+
+def _has_hidden_part(file: str) -> bool:
+    return any(part.startswith(".") for part in file.split("/"))
+
+
+def _scan_git_files(root_dir: str, repo: Repo, include_hidden: bool) -> Dict[str, int]:
+    files_sizes = {}
+    for file in get_repo_files(repo):
+        if not include_hidden and _has_hidden_part(file):
+            continue
+        try:
+            file_stat = os.stat(os.path.join(root_dir, file))
+        except FileNotFoundError:
+            # Tracked files deleted from the working tree
+            continue
+        if stat.S_ISREG(file_stat.st_mode):
+            files_sizes[file] = file_stat.st_size
+    return files_sizes
+
+
+def scan_repository(
+    root_dir: str, repo: Optional[Repo] = None, include_hidden: bool = False
+) -> RepositorySnapshot:
+    if not os.path.isdir(root_dir):
+        raise ValueError(f"No such folder: {root_dir}")
+
+    if repo is not None:
+        files_sizes = _scan_git_files(root_dir, repo, include_hidden)
+    else:
+        files_sizes = {
+            os.path.relpath(file_path, root_dir).replace(os.sep, "/"): size
+            for file_path, size in iter_files(root_dir, include_hidden)
+        }
+    return RepositorySnapshot(root_dir, files_sizes)
@@ -0,0 +1,63 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+from typing import Any, Dict, Optional
+
+
+def get_inputs_hash(inputs: Dict[str, Any]) -> str:
+    serialized = json.dumps(inputs, sort_keys=True, default=str)
+    return hashlib.sha256(serialized.encode("utf-8")).hexdigest()
+
+
+def get_readme_state_path(state_dir: str, repo_url: str) -> str:
+    repo_hash = hashlib.sha256(repo_url.encode("utf-8")).hexdigest()
+    return os.path.join(state_dir, f"{repo_hash}.json")
+
+
+class ReadmeState:
+    def __init__(
+        self,
+        commit: Optional[str] = None,
+        files_summaries: Optional[Dict[str, str]] = None,
+        sections: Optional[Dict[str, Dict[str, str]]] = None,
+    ) -> None:
+        self.commit = commit
+        self.files_summaries = files_summaries or {}
+        self.sections = sections or {}
+
+    def get_section(self, name: str, inputs_hash: str) -> Optional[str]:
+        section = self.sections.get(name)
+        if section is None or section["inputs_hash"] != inputs_hash:
+            return None
+        return section["text"]
+
+    def set_section(self, name: str, inputs_hash: str, text: str) -> None:
+        self.sections[name] = {"inputs_hash": inputs_hash, "text": text}
+
+    @classmethod
+    def load(cls, state_path: str) -> Optional[ReadmeState]:
+        if not os.path.isfile(state_path):
+            return None
+        try:
+            with open(state_path, "r") as f:
+                data = json.load(f)
+            return cls(data["commit"], data["files_summaries"], data["sections"])
+        except (ValueError, KeyError) as e:
+            print(f"Ignoring invalid README state file: {state_path}\nError:\n{e}")
+            return None
+
+    def save(self, state_path: str) -> None:
+        os.makedirs(os.path.dirname(state_path) or ".", exist_ok=True)
+        tmp_path = f"{state_path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(
+                {
+                    "commit": self.commit,
+                    "files_summaries": self.files_summaries,
+                    "sections": self.sections,
+                },
+                f,
+            )
+        os.replace(tmp_path, state_path)